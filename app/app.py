@@ -3,9 +3,12 @@ import streamlit as st
 from ui.settings import apply_theme
 from state.init import init_session_state
 from steps import STEP_REGISTRY
+from utils.embeddings import start_warm_up
 
 
 def main():
+    # Load the embedding model in the background as soon as the server runs (once per process)
+    start_warm_up()
     apply_theme()
     init_session_state()
 
@@ -0,0 +1,116 @@
+import csv
+import os
+
+import pandas as pd
+
+from data_access.postgres import append_rows
+from utils.file_lock import file_lock
+
+# -----------------------------
+# Configuration
+# -----------------------------
+
+DATA_DIR = os.path.join("..", "data")
+BATCH_MATCHES_DIR = os.path.join(DATA_DIR, "batch_matches")
+
+MATCHES_TABLE = "matches"
+
+# One row per user and rank within a run; re-inserting a shard skips them
+MATCHES_KEY = ["run_id", "username", "rank"]
+
+MATCHES_COLUMNS = [
+    "run_id",
+    "username",
+    "rank",
+    "match_username",
+    "match_name",
+    "practical_fit",
+    "lifestyle_fit",
+    "personality_similarity",
+    "values_similarity",
+    "compatibility_score",
+]
+
+# -----------------------------
+# Internal helpers
+# -----------------------------
+
+def _matches_path(run_id: str) -> str:
+    return os.path.join(BATCH_MATCHES_DIR, f"{run_id}.csv")
+
+def _checkpoint_path(run_id: str) -> str:
+    return os.path.join(BATCH_MATCHES_DIR, f"{run_id}.done")
+
+def _lock_path(run_id: str) -> str:
+    return os.path.join(BATCH_MATCHES_DIR, f"{run_id}.lock")
+
+# -----------------------------
+# Public API
+# -----------------------------
+
+def load_checkpoint(run_id: str) -> set[str]:
+    """
+    Usernames already matched in run `run_id`. Rows written for users that
+    never reached the checkpoint (the run stopped in between) are discarded,
+    so they are not duplicated when the run resumes.
+    """
+    os.makedirs(BATCH_MATCHES_DIR, exist_ok=True)
+    with file_lock(_lock_path(run_id)):
+        done = set()
+        if os.path.exists(_checkpoint_path(run_id)):
+            with open(_checkpoint_path(run_id), encoding="utf-8") as file:
+                done = {line.strip() for line in file if line.strip()}
+
+        path = _matches_path(run_id)
+        if os.path.exists(path):
+            df = pd.read_csv(path, dtype={"username": str})
+            complete = df[df["username"].isin(done)]
+            if len(complete) < len(df):
+                complete.to_csv(f"{path}.tmp", index=False)
+                os.replace(f"{path}.tmp", path)
+        return done
+
+
+def clear_run(run_id: str) -> None:
+    """Forget every result and checkpoint of run `run_id`."""
+    os.makedirs(BATCH_MATCHES_DIR, exist_ok=True)
+    with file_lock(_lock_path(run_id)):
+        for path in (_matches_path(run_id), _checkpoint_path(run_id)):
+            if os.path.exists(path):
+                os.remove(path)
+
+
+def save_batch(run_id: str, usernames: list[str], rows: list[dict]) -> None:
+    """
+    Append the matches of one shard to the run's CSV (and the Postgres
+    `matches` table when configured), then checkpoint its users. A shard
+    re-run after stopping before its checkpoint is dropped from the CSV by
+    load_checkpoint and skipped by the Postgres insert, which ignores rows
+    whose MATCHES_KEY is already stored.
+    """
+    os.makedirs(BATCH_MATCHES_DIR, exist_ok=True)
+    with file_lock(_lock_path(run_id)):
+        path = _matches_path(run_id)
+        file_exists = os.path.isfile(path)
+        with open(path, mode="a", newline="", encoding="utf-8") as file:
+            writer = csv.DictWriter(file, fieldnames=MATCHES_COLUMNS, extrasaction="ignore")
+            if not file_exists:
+                writer.writeheader()
+            writer.writerows(rows)
+            file.flush()
+            os.fsync(file.fileno())
+
+        append_rows(MATCHES_TABLE, rows, unique_columns=MATCHES_KEY)
+
+        with open(_checkpoint_path(run_id), mode="a", encoding="utf-8") as file:
+            file.write("".join(f"{username}\n" for username in usernames))
+            file.flush()
+            os.fsync(file.fileno())
+
+
+def load_run(run_id: str) -> pd.DataFrame:
+    """All matches computed so far in run `run_id`."""
+    path = _matches_path(run_id)
+    if not os.path.exists(path):
+        return pd.DataFrame(columns=MATCHES_COLUMNS)
+    return pd.read_csv(path)
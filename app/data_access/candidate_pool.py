@@ -0,0 +1,296 @@
+import logging
+import os
+import threading
+
+import numpy as np
+import pandas as pd
+
+from data_access.latest_answers import ROW_ID_COLUMN, SURVEY_TABLES, get_latest_table
+from data_access.values_index import get_values_indexes
+from utils.bitmask import encode_practical_masks
+from utils.budget import base_budgets
+from utils.candidate_store import CandidateStore, StoreView
+from utils.location_index import parse_location
+from utils.ranking import PERSONALITY_TRAITS
+
+
+LOGGER = logging.getLogger(__name__)
+
+# -----------------------------
+# Configuration
+# -----------------------------
+
+TABLE_PATHS = {name: SURVEY_TABLES[name] for name in ("practical", "lifestyle", "personality", "demographics")}
+
+# Candidates are partitioned by the country of their desired_location; those
+# without a location share one shard that every query reaches
+SHARD_COLUMN = "location_shard"
+NO_LOCATION_SHARD = ""
+
+# -----------------------------
+# Internal helpers
+# -----------------------------
+
+def _latest_frame(name: str, usernames: set[str] | None = None) -> pd.DataFrame:
+    """
+    One row per user of survey table `name` (only `usernames`, when given),
+    with normalised usernames.
+    """
+    frame = get_latest_table(name).frame
+    if frame.empty or "username" not in frame.columns:
+        return pd.DataFrame(columns=["username", ROW_ID_COLUMN])
+    if usernames is not None:
+        positions = frame.index.get_indexer(list(usernames))
+        frame = frame.iloc[positions[positions >= 0]]
+    return frame.reset_index(drop=True).assign(username=frame["username"].str.strip().str.lower().to_numpy())
+
+
+def location_shard(location) -> str:
+    """Shard of a desired_location answer: its country, or NO_LOCATION_SHARD."""
+    path = parse_location(location)
+    return path[0] if path else NO_LOCATION_SHARD
+
+
+def _candidate_rows(usernames: set[str] | None = None) -> pd.DataFrame:
+    """
+    Candidate rows (latest practical answers joined with the latest
+    personality, lifestyle and demographics answers) of `usernames`, or of
+    every user when None. Users who have not answered the personality step
+    are not candidates.
+    """
+    practical = _latest_frame("practical", usernames)
+    candidates = encode_practical_masks(practical)
+    candidates["practical_row_id"] = candidates[ROW_ID_COLUMN].astype(np.int64)
+    candidates = candidates.drop(columns=[ROW_ID_COLUMN])
+    budgets = base_budgets(candidates)
+    candidates[list(budgets.columns)] = budgets
+
+    # Join the latest personality, lifestyle and demographics answers of each candidate
+    personality = _latest_frame("personality", usernames).reindex(columns=["username", *PERSONALITY_TRAITS])
+    candidates = candidates.merge(personality, on="username", how="inner")
+
+    lifestyle = _latest_frame("lifestyle", usernames)
+    if not lifestyle.empty:
+        lifestyle = lifestyle.drop(columns=["timestamp", ROW_ID_COLUMN], errors="ignore")
+        candidates = candidates.merge(lifestyle, on="username", how="left")
+
+    demographics = _latest_frame("demographics", usernames)
+    names = pd.DataFrame(columns=["username", "name"])
+    if not demographics.empty:
+        name_column = "full_name" if "full_name" in demographics.columns else "fullname"
+        if name_column in demographics.columns:
+            names = demographics[["username", name_column]].rename(columns={name_column: "name"})
+    candidates = candidates.merge(names, on="username", how="left")
+    candidates["name"] = candidates["name"].fillna("")
+    candidates["email"] = candidates["username"]
+    locations = candidates.get("desired_location", pd.Series(NO_LOCATION_SHARD, index=candidates.index))
+    candidates[SHARD_COLUMN] = locations.map(location_shard)
+    return candidates
+
+
+class PoolSnapshot:
+    """
+    Immutable view of the candidate pool at one data version: one StoreView
+    per location shard. Readers keep using the snapshot they obtained even
+    while newer ones are published.
+
+    Each shard has its own rows, feature matrices and indexes, so it is
+    queried and scored on its own; positions are always local to a shard and
+    travel as {shard: positions} groups.
+    """
+
+    def __init__(self, version: int, shards: dict[str, StoreView]):
+        self.version = version
+        self.shards = shards
+        self._candidates = None
+
+    def __len__(self) -> int:
+        return sum(len(view) for view in self.shards.values())
+
+    @property
+    def candidates(self) -> pd.DataFrame:
+        """Every candidate row of every shard (built on first use; batch jobs only)."""
+        if self._candidates is None:
+            frames = [view.candidates for view in self.shards.values() if len(view)]
+            self._candidates = pd.concat(frames, ignore_index=True) if frames else pd.DataFrame(columns=["username"])
+        return self._candidates
+
+    def shards_for(self, location) -> list[str]:
+        """Shards a query for `location` reaches: its country and the no-location shard, or every shard."""
+        path = parse_location(location)
+        if not path:
+            return list(self.shards)
+        return [key for key in (path[0], NO_LOCATION_SHARD) if key in self.shards]
+
+    def query(self, requirements: dict) -> dict[str, np.ndarray]:
+        """
+        Positions of the candidates that pass the location, practical, budget
+        and lifestyle conflict hard filters, by shard (empty shards left out).
+        """
+        groups = {}
+        for key in self.shards_for(requirements.get("desired_location")):
+            positions = self.shards[key].query(requirements)
+            if len(positions):
+                groups[key] = positions
+        return groups
+
+    def positions_of(self, usernames: list[str]) -> dict[str, np.ndarray]:
+        """Positions of the given users by shard (unknown users are skipped)."""
+        groups = {}
+        for key, view in self.shards.items():
+            positions = view.positions_of(usernames)
+            if len(positions):
+                groups[key] = positions
+        return groups
+
+
+class CandidatePool:
+    """
+    Process-wide candidate pool shared by all Streamlit sessions. Candidates
+    come from the latest-row snapshots of the survey tables and live in one
+    append-only CandidateStore per location shard.
+
+    Requests never wait for a refresh: snapshot() returns the current snapshot
+    and leaves picking up new rows to a background refresh. A refresh only
+    builds the rows of the users whose answers changed, tombstones their
+    previous rows and publishes new views of the shards it touched; published
+    snapshots share the stores' arrays and indexes and never see later rows.
+
+    A pool limited to some `shards` (countries) keeps only their candidates
+    and those without a location, so a process can load and serve a subset
+    of the countries on its own.
+    """
+
+    def __init__(self, shards: list[str] | None = None):
+        self.shard_keys = None if shards is None else {key.strip().lower() for key in shards} | {NO_LOCATION_SHARD}
+        self._table_versions = {}
+        self._values_rows = {}
+        self._lock = threading.Lock()
+        self._stores = {}
+        # Shard holding each candidate's live row
+        self._shard_of = {}
+        self._snapshot = None
+        self.version = 0
+        self._refresher = None
+        self._refresh_pending = False
+        self._refresher_lock = threading.Lock()
+
+    def _changed_users(self) -> set[str] | None:
+        """Users whose answers changed since the last refresh, or None when everything must be rebuilt."""
+        changed = set()
+        rebuild = False
+        for name in TABLE_PATHS:
+            table = get_latest_table(name)
+            table.refresh()
+            usernames = table.changes_since(self._table_versions.get(name))
+            self._table_versions[name] = table.version
+            if usernames is None:
+                rebuild = True
+            else:
+                changed |= usernames
+
+        for field, index in get_values_indexes().items():
+            index.refresh()
+            first_row = self._values_rows.get(field, 0)
+            changed.update(index.ids[first_row:])
+            self._values_rows[field] = len(index.ids)
+        return None if rebuild else changed
+
+    def _append(self, usernames: set[str] | None) -> set[str]:
+        """Append the candidate rows of `usernames` (None: everyone) to their shards; returns the shards touched."""
+        candidates = _candidate_rows(usernames)
+        if self.shard_keys is not None:
+            candidates = candidates[candidates[SHARD_COLUMN].isin(self.shard_keys)]
+        indexes = list(get_values_indexes().values())
+        for key, rows in candidates.groupby(SHARD_COLUMN, sort=False):
+            users = rows["username"].tolist()
+            self._stores.setdefault(key, CandidateStore()).append(rows, [index.vectors_for(users) for index in indexes])
+            self._shard_of.update(dict.fromkeys(users, key))
+        return set(candidates[SHARD_COLUMN])
+
+    def refresh(self) -> PoolSnapshot:
+        """Fold in the answers changed since the last refresh, in the calling thread."""
+        with self._lock:
+            changed = self._changed_users()
+            if changed is not None and not changed and self._snapshot is not None:
+                return self._snapshot
+
+            self.version += 1
+            if changed is None or self._snapshot is None:
+                self._stores, self._shard_of = {}, {}
+                touched = self._append(None)
+                shards = {}
+            else:
+                touched = set()
+                for username in changed:
+                    key = self._shard_of.pop(username, None)
+                    if key is not None:
+                        self._stores[key].remove(username, self.version)
+                        touched.add(key)
+                touched |= self._append(changed)
+                shards = dict(self._snapshot.shards)
+
+            # Shards nothing happened to keep their published view
+            for key in touched:
+                shards[key] = self._stores[key].view(self.version)
+            self._snapshot = PoolSnapshot(self.version, shards)
+            return self._snapshot
+
+    def snapshot(self) -> PoolSnapshot:
+        """
+        The current snapshot, without waiting for newer rows. Only the first
+        snapshot of the process is built in the calling thread.
+        """
+        snapshot = self._snapshot
+        if snapshot is None:
+            return self.refresh()
+        self.refresh_in_background()
+        return snapshot
+
+    def refresh_in_background(self) -> None:
+        """Start a background refresh, or queue one more after the one running."""
+        with self._refresher_lock:
+            if self._refresher is not None:
+                self._refresh_pending = True
+                return
+            self._refresher = threading.Thread(target=self._refresh_loop, name="candidate-pool-refresh", daemon=True)
+            self._refresher.start()
+
+    def wait_for_refresh(self, timeout: float | None = None) -> None:
+        """Block until the background refresh (if any) has finished."""
+        with self._refresher_lock:
+            refresher = self._refresher
+        if refresher is not None:
+            refresher.join(timeout)
+
+    def _refresh_loop(self) -> None:
+        while True:
+            try:
+                self.refresh()
+            except Exception as error:
+                LOGGER.warning("Background candidate pool refresh failed: %s", error)
+            with self._refresher_lock:
+                if not self._refresh_pending:
+                    self._refresher = None
+                    return
+                self._refresh_pending = False
+
+# -----------------------------
+# Public API
+# -----------------------------
+
+_POOL = None
+_POOL_LOCK = threading.Lock()
+
+
+def get_candidate_pool() -> CandidatePool:
+    """
+    The process-wide candidate pool (created on first use), limited to the
+    countries listed in CANDIDATE_POOL_SHARDS (comma-separated) when set.
+    """
+    global _POOL
+    with _POOL_LOCK:
+        if _POOL is None:
+            shards = os.getenv("CANDIDATE_POOL_SHARDS")
+            _POOL = CandidatePool(shards.split(",") if shards else None)
+        return _POOL
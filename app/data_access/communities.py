@@ -0,0 +1,90 @@
+import os
+import threading
+
+import pandas as pd
+
+from utils.file_lock import file_lock
+
+# -----------------------------
+# Configuration
+# -----------------------------
+
+DATA_DIR = os.path.join("..", "data")
+COMMUNITIES_FILE = "communities.csv"
+
+COMMUNITIES_PATH = os.path.join(DATA_DIR, COMMUNITIES_FILE)
+
+COMMUNITIES_COLUMNS = [
+    "username",
+    "community_id",
+    "size_of_community",
+    "community_size",
+]
+
+# Members of every community keyed by username, loaded once per version of
+# communities.csv (identified by its inode, size and mtime)
+_COMMUNITIES = None
+_COMMUNITIES_STAMP = None
+_COMMUNITIES_LOCK = threading.Lock()
+
+# -----------------------------
+# Internal helpers
+# -----------------------------
+
+def _ensure_data_dir():
+    os.makedirs(DATA_DIR, exist_ok=True)
+
+def _load_df():
+    if not os.path.exists(COMMUNITIES_PATH):
+        return pd.DataFrame(columns=COMMUNITIES_COLUMNS)
+    return pd.read_csv(COMMUNITIES_PATH)
+
+
+def _file_stamp():
+    try:
+        stat = os.stat(COMMUNITIES_PATH)
+    except FileNotFoundError:
+        return None
+    return stat.st_ino, stat.st_size, stat.st_mtime_ns
+
+
+def _communities() -> dict[str, list[str]]:
+    """Normalised username -> members of their community, re-read only when the file changes."""
+    global _COMMUNITIES, _COMMUNITIES_STAMP
+    with _COMMUNITIES_LOCK:
+        stamp = _file_stamp()
+        if _COMMUNITIES is None or stamp != _COMMUNITIES_STAMP:
+            df = _load_df()
+            usernames = df["username"].astype(str).str.strip().str.lower()
+            members = usernames.groupby(df["community_id"].to_numpy()).agg(list)
+            _COMMUNITIES = {
+                username: members[community_id]
+                for username, community_id in zip(usernames, df["community_id"])
+            }
+            _COMMUNITIES_STAMP = stamp
+        return _COMMUNITIES
+
+# -----------------------------
+# Public API
+# -----------------------------
+
+def save_communities(rows: list[dict]) -> None:
+    """
+    Replace the stored community assignment with `rows`. The file is written
+    next to the old one and swapped in, so readers never see a partial file.
+    """
+    _ensure_data_dir()
+    tmp_path = f"{COMMUNITIES_PATH}.tmp"
+    with file_lock(f"{COMMUNITIES_PATH}.lock"):
+        pd.DataFrame(rows, columns=COMMUNITIES_COLUMNS).to_csv(tmp_path, index=False)
+        os.replace(tmp_path, COMMUNITIES_PATH)
+
+
+def load_community(username: str) -> list[str]:
+    """
+    Usernames of the members of `username`'s community (the user included),
+    or an empty list when the user has not been assigned one yet.
+    """
+    if not username:
+        return []
+    return list(_communities().get(username.strip().lower(), []))
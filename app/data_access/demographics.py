@@ -1,6 +1,7 @@
 import os
 import pandas as pd
 from datetime import datetime
+from data_access.latest_answers import latest_row, refresh_latest
 from data_access.postgres import append_row
 
 # -----------------------------
@@ -30,14 +31,6 @@ DEMOGRAPHICS_COLUMNS = [
 def _ensure_data_dir():
     os.makedirs(DATA_DIR, exist_ok=True)
 
-def _empty_df():
-    return pd.DataFrame(columns=DEMOGRAPHICS_COLUMNS)
-
-def _load_df():
-    if not os.path.exists(DEMOGRAPHICS_PATH):
-        return _empty_df()
-    return pd.read_csv(DEMOGRAPHICS_PATH)
-
 # -----------------------------
 # Public API
 # -----------------------------
@@ -50,13 +43,7 @@ def username_exists(username: str) -> bool:
     if not username:
         return False
 
-    df = _load_df()
-    if df.empty or "username" not in df.columns:
-        return False
-
-    return username.strip().lower() in (
-        df["username"].astype(str).str.lower().tolist()
-    )
+    return latest_row("demographics", username) is not None
 
 def save_demographics_from_state(session_state) -> None:
     """
@@ -82,6 +69,7 @@ def save_demographics_from_state(session_state) -> None:
     else:
         df_new.to_csv(DEMOGRAPHICS_PATH, index=False)
 
+    refresh_latest("demographics")
     append_row("saved_answers_demographics", row)
 
 def load_demographics(username: str) -> dict | None:
@@ -92,12 +80,4 @@ def load_demographics(username: str) -> dict | None:
     if not username:
         return None
 
-    df = _load_df()
-    if df.empty:
-        return None
-
-    row = df[df["username"].astype(str).str.lower() == username.lower()]
-    if row.empty:
-        return None
-
-    return row.iloc[0].to_dict()
+    return latest_row("demographics", username)
@@ -0,0 +1,209 @@
+"""
+Content-addressed cache of text embeddings. Entries are keyed by a hash of
+the model identifier and the normalised text, so demo answers, resubmitted
+answers and backfills are only encoded once per model.
+
+There are two tiers: an in-process LRU, then a SQLite database shared by
+every process. The database lives at data/embedding_cache.sqlite, or at
+EMBEDDING_CACHE_PATH when that is set. The app and the experiment
+notebooks (run from experiments/) resolve the default path to the same
+file.
+"""
+
+import hashlib
+import os
+import re
+import sqlite3
+import threading
+import time
+import unicodedata
+
+import numpy as np
+
+from utils.match_cache import LRUCache
+
+
+# -----------------------------
+# Configuration
+# -----------------------------
+
+CACHE_PATH = os.path.join("..", "data", "embedding_cache.sqlite")
+
+# Vectors kept in memory per process
+MEMORY_ENTRIES = 4096
+
+# Rows kept on disk; beyond this the least recently used are evicted, down
+# to EVICT_TO of the limit so eviction (and its exact row count) runs rarely
+DEFAULT_MAX_ROWS = 200_000
+EVICT_TO = 0.9
+
+# Other processes add rows too, so the running row count is also checked
+# against the table this often
+RECOUNT_SECONDS = 60
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS embeddings (
+    key TEXT PRIMARY KEY,
+    model TEXT NOT NULL,
+    dim INTEGER NOT NULL,
+    vector BLOB NOT NULL,
+    created REAL NOT NULL,
+    last_used REAL NOT NULL
+)
+"""
+
+# -----------------------------
+# Internal helpers
+# -----------------------------
+
+def normalize_text(text) -> str:
+    """Unicode-normalised text with surrounding and repeated whitespace collapsed."""
+    text = unicodedata.normalize("NFC", str(text or ""))
+    return re.sub(r"\s+", " ", text).strip()
+
+
+def cache_key(model_id: str, text) -> str:
+    return hashlib.sha256(f"{model_id}\0{normalize_text(text)}".encode("utf-8")).hexdigest()
+
+
+class EmbeddingCache:
+    """
+    Two-tier embedding cache (memory LRU, then SQLite). Every hit refreshes
+    the row's last_used time, and the disk tier evicts by it. The row count
+    is tracked as rows are added and recounted before evicting or once
+    RECOUNT_SECONDS have passed, since other processes add rows too.
+    """
+
+    def __init__(self, path: str = CACHE_PATH, memory_entries: int = MEMORY_ENTRIES,
+                 max_rows: int | None = None):
+        self.path = path
+        self.max_rows = max_rows or int(os.getenv("EMBEDDING_CACHE_MAX_ROWS", DEFAULT_MAX_ROWS))
+        self._memory = LRUCache(memory_entries)
+        self._lock = threading.Lock()
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._connection = sqlite3.connect(path, timeout=30, check_same_thread=False)
+        with self._lock, self._connection:
+            self._connection.execute("PRAGMA journal_mode=WAL")
+            self._connection.execute(_SCHEMA)
+            columns = [row[1] for row in self._connection.execute("PRAGMA table_info(embeddings)")]
+            if "last_used" not in columns:
+                # Caches written before rows were evicted by use
+                self._connection.execute("ALTER TABLE embeddings ADD COLUMN last_used REAL NOT NULL DEFAULT 0")
+                self._connection.execute("UPDATE embeddings SET last_used = created")
+                self._connection.execute("DROP INDEX IF EXISTS embeddings_created")
+            self._connection.execute("CREATE INDEX IF NOT EXISTS embeddings_last_used ON embeddings (last_used)")
+            self._count()
+
+    def _count(self) -> None:
+        self._rows = self._connection.execute("SELECT COUNT(*) FROM embeddings").fetchone()[0]
+        self._counted_at = time.monotonic()
+
+    def _touch(self, keys: list[str]) -> None:
+        """Mark the rows of `keys` as used now."""
+        now = time.time()
+        for start in range(0, len(keys), 500):
+            chunk = keys[start:start + 500]
+            with self._lock, self._connection:
+                self._connection.execute(
+                    f"UPDATE embeddings SET last_used = ? WHERE key IN ({','.join('?' * len(chunk))})", [now, *chunk]
+                )
+
+    def get_many(self, keys: list[str]) -> dict[str, np.ndarray]:
+        """Cached vectors of the given keys (missing keys are left out)."""
+        found = {}
+        for key in keys:
+            vector = self._memory.get(key)
+            if vector is not None:
+                found[key] = vector
+
+        missing = [key for key in dict.fromkeys(keys) if key not in found]
+        for start in range(0, len(missing), 500):
+            chunk = missing[start:start + 500]
+            with self._lock:
+                rows = self._connection.execute(
+                    f"SELECT key, vector FROM embeddings WHERE key IN ({','.join('?' * len(chunk))})", chunk
+                ).fetchall()
+            for key, blob in rows:
+                vector = np.frombuffer(blob, dtype=np.float32)
+                self._memory.put(key, vector)
+                found[key] = vector
+        # Hits served from memory count as uses too, or the disk tier would
+        # evict exactly the hottest rows
+        self._touch(list(found))
+        return found
+
+    def put_many(self, model_id: str, items: dict[str, np.ndarray]) -> None:
+        """Store vectors by key, then evict the least recently used rows beyond max_rows."""
+        rows = []
+        now = time.time()
+        for key, vector in items.items():
+            vector = np.ascontiguousarray(vector, dtype=np.float32).ravel()
+            self._memory.put(key, vector)
+            rows.append((key, model_id, len(vector), vector.tobytes(), now, now))
+
+        with self._lock, self._connection:
+            # A key another process stored meanwhile keeps its row (the
+            # vector is the same), so only inserted rows are counted
+            before = self._connection.total_changes
+            self._connection.executemany("INSERT OR IGNORE INTO embeddings VALUES (?, ?, ?, ?, ?, ?)", rows)
+            self._rows += self._connection.total_changes - before
+            if self._rows > self.max_rows or time.monotonic() - self._counted_at > RECOUNT_SECONDS:
+                self._count()
+                excess = self._rows - int(self.max_rows * EVICT_TO)
+                if self._rows > self.max_rows and excess > 0:
+                    self._connection.execute(
+                        "DELETE FROM embeddings WHERE key IN (SELECT key FROM embeddings ORDER BY last_used LIMIT ?)",
+                        (excess,),
+                    )
+                    self._rows -= excess
+
+    def clear(self) -> None:
+        self._memory.clear()
+        with self._lock, self._connection:
+            self._connection.execute("DELETE FROM embeddings")
+            self._rows = 0
+
+# -----------------------------
+# Public API
+# -----------------------------
+
+_CACHE = None
+_CACHE_LOCK = threading.Lock()
+
+
+def cache_enabled() -> bool:
+    return os.getenv("EMBEDDING_CACHE", "1").strip().lower() not in ("0", "false", "no")
+
+
+def get_embedding_cache() -> EmbeddingCache:
+    """The process-wide embedding cache (opened on first use)."""
+    global _CACHE
+    with _CACHE_LOCK:
+        if _CACHE is None:
+            _CACHE = EmbeddingCache(os.getenv("EMBEDDING_CACHE_PATH", CACHE_PATH))
+        return _CACHE
+
+
+def cached_embeddings(texts: list[str], model_id: str, encode) -> np.ndarray:
+    """
+    Embeddings of `texts` under `model_id`, in input order. Only the distinct
+    texts missing from the cache are passed to `encode` (a function mapping a
+    list of texts to a 2-D array), in a single call.
+    """
+    keys = [cache_key(model_id, text) for text in texts]
+    cache = get_embedding_cache()
+    found = cache.get_many(keys)
+
+    misses = {}
+    for key, text in zip(keys, texts):
+        if key not in found and key not in misses:
+            misses[key] = text
+    if misses:
+        encoded = np.asarray(encode(list(misses.values())), dtype=np.float32)
+        new = dict(zip(misses, encoded))
+        cache.put_many(model_id, new)
+        found.update(new)
+
+    return np.stack([found[key] for key in keys])
@@ -0,0 +1,380 @@
+import atexit
+import csv
+import io
+import json
+import os
+import threading
+
+import pandas as pd
+import pyarrow as pa
+# Table.from_pandas imports this lazily, and that import fails while the
+# interpreter shuts down, i.e. in the atexit flush of a process that never
+# wrote a snapshot before
+import pyarrow.pandas_compat
+import pyarrow.parquet as pq
+
+from utils.file_lock import file_lock
+
+
+# -----------------------------
+# Configuration
+# -----------------------------
+
+DATA_DIR = os.path.join("..", "data")
+LATEST_DIR = os.path.join(DATA_DIR, "latest")
+
+SURVEY_TABLES = {
+    "demographics": os.path.join(DATA_DIR, "saved_answers_demographics.csv"),
+    "practical": os.path.join(DATA_DIR, "saved_answers_practical.csv"),
+    "lifestyle": os.path.join(DATA_DIR, "saved_answers_lifestyle.csv"),
+    "personality": os.path.join(DATA_DIR, "saved_answers_personality.csv"),
+    "personality_responses": os.path.join(DATA_DIR, "saved_answers_personality_responses.csv"),
+    "values": os.path.join(DATA_DIR, "saved_answers_values.csv"),
+}
+
+# Position of a row in its append-only answers file
+ROW_ID_COLUMN = "_row_id"
+
+_METADATA_KEY = b"glasshome_latest"
+
+# Embedding columns are only read by the values ANN index (from the CSV), so
+# the snapshots leave them out
+EMBEDDING_SUFFIX = "_embedding"
+
+# Seconds a changed snapshot waits before it is written to Parquet, so a burst
+# of submissions costs one write; override with LATEST_PERSIST_DELAY (0 writes
+# on every refresh)
+DEFAULT_PERSIST_DELAY = 30
+
+# Rows parsed at a time when a lookup scans an answers file (streaming mode)
+SCAN_CHUNK_SIZE = 20000
+
+# Refreshes whose changed usernames a table remembers for changes_since
+CHANGE_LOG_LENGTH = 256
+
+# -----------------------------
+# Internal helpers
+# -----------------------------
+
+def _normalize_username(username) -> str:
+    return str(username or "").strip().lower()
+
+
+def _without_embeddings(frame: pd.DataFrame) -> pd.DataFrame:
+    return frame.drop(columns=[column for column in frame.columns if column.endswith(EMBEDDING_SUFFIX)])
+
+
+class TailedTable:
+    """
+    An append-only answers CSV parsed incrementally: each refresh only reads the
+    bytes appended since the previous one. Truncated or replaced files are
+    re-read from the start.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self._reset()
+
+    def _reset(self) -> None:
+        self.offset = 0
+        self.header = b""
+        self.inode = None
+        self.n_rows = 0
+        self.frame = pd.DataFrame()
+
+    def read_appended(self, **read_csv_kwargs) -> tuple[bool, pd.DataFrame]:
+        """
+        Rows appended since the last call, numbered by their position in the
+        file (ROW_ID_COLUMN). The flag is True when the file was replaced or
+        truncated and reading restarted from the top.
+        """
+        empty = pd.DataFrame()
+        try:
+            stat = os.stat(self.path)
+        except FileNotFoundError:
+            reset = self.offset > 0
+            self._reset()
+            return reset, empty
+
+        reset = stat.st_ino != self.inode or stat.st_size < self.offset
+        if reset:
+            reset = self.offset > 0
+            self._reset()
+            self.inode = stat.st_ino
+
+        if stat.st_size == self.offset:
+            return reset, empty
+
+        with open(self.path, "rb") as file:
+            file.seek(self.offset)
+            data = file.read(stat.st_size - self.offset)
+
+        # Only consume whole lines; a row still being written is picked up next time
+        complete = data[: data.rfind(b"\n") + 1]
+        if not complete:
+            return reset, empty
+        if self.offset == 0:
+            self.header = complete[: complete.find(b"\n") + 1]
+            body = complete
+        else:
+            body = self.header + complete
+        self.offset += len(complete)
+
+        new_rows = pd.read_csv(io.BytesIO(body), on_bad_lines="skip", **read_csv_kwargs)
+        new_rows[ROW_ID_COLUMN] = range(self.n_rows, self.n_rows + len(new_rows))
+        self.n_rows += len(new_rows)
+        return reset, new_rows
+
+    def refresh(self) -> bool:
+        """Ingest newly appended rows; returns True when the frame changed."""
+        reset, new_rows = self.read_appended()
+        if reset:
+            self.frame = pd.DataFrame()
+        if new_rows.empty:
+            return reset
+        self.frame = new_rows if self.frame.empty else pd.concat([self.frame, new_rows], ignore_index=True)
+        return True
+
+
+class LatestTable(TailedTable):
+    """
+    Materialised snapshot of one survey table: exactly one row per username,
+    their most recent submission, indexed by normalised username.
+
+    It is kept current by tailing the answers file and persisted under
+    data/latest/<name>.parquet together with the file offset it reflects, so
+    a new process loads the snapshot and only parses rows appended since.
+    Every cell is kept as text, as it is in the CSV; *_embedding columns are
+    dropped. Writes are debounced: the Parquet file trails the in-memory
+    frame by up to LATEST_PERSIST_DELAY seconds and is flushed at exit. A
+    process that dies before then just re-parses the rows appended since the
+    last write.
+    """
+
+    def __init__(self, name: str, path: str, directory: str = LATEST_DIR):
+        self.name = name
+        self.directory = directory
+        self.version = 0
+        self._lock = threading.RLock()
+        self._persist_lock = threading.Lock()
+        self._persist_timer = None
+        # (version, usernames) of each refresh since version _log_start
+        self._changes = []
+        super().__init__(path)
+        self._load()
+        self._log_start = self.version
+
+    @property
+    def parquet_path(self) -> str:
+        return os.path.join(self.directory, f"{self.name}.parquet")
+
+    def _load(self) -> None:
+        if not os.path.exists(self.parquet_path):
+            return
+        try:
+            table = pq.read_table(self.parquet_path)
+            meta = json.loads(table.schema.metadata[_METADATA_KEY])
+            stat = os.stat(self.path)
+        except (OSError, KeyError, ValueError, pa.ArrowException):
+            return
+
+        # A snapshot of a replaced or truncated file is useless; rebuild from the CSV
+        if meta["inode"] != stat.st_ino or meta["offset"] > stat.st_size:
+            return
+        self.frame = _without_embeddings(table.to_pandas())
+        self.offset = meta["offset"]
+        self.header = meta["header"].encode("utf-8")
+        self.inode = meta["inode"]
+        self.n_rows = meta["n_rows"]
+        self.version += 1
+
+    def persist(self) -> None:
+        """Write the current frame to Parquet now (cancelling a scheduled write)."""
+        with self._persist_lock:
+            with self._lock:
+                if self._persist_timer is not None:
+                    self._persist_timer.cancel()
+                    self._persist_timer = None
+                # refresh() replaces the frame rather than mutating it, so the
+                # reference can be written outside the lock
+                frame = self.frame
+                meta = {
+                    "offset": self.offset,
+                    "header": self.header.decode("utf-8"),
+                    "inode": self.inode,
+                    "n_rows": self.n_rows,
+                }
+
+            os.makedirs(self.directory, exist_ok=True)
+            table = pa.Table.from_pandas(frame, preserve_index=True)
+            table = table.replace_schema_metadata({**(table.schema.metadata or {}), _METADATA_KEY: json.dumps(meta)})
+            tmp_path = f"{self.parquet_path}.{os.getpid()}.tmp"
+            with file_lock(f"{self.parquet_path}.lock"):
+                pq.write_table(table, tmp_path)
+                os.replace(tmp_path, self.parquet_path)
+
+    def flush(self) -> None:
+        """Write the frame if a debounced write is still pending."""
+        if self._persist_timer is not None:
+            self.persist()
+
+    def _schedule_persist(self) -> None:
+        delay = float(os.getenv("LATEST_PERSIST_DELAY", DEFAULT_PERSIST_DELAY))
+        if delay <= 0:
+            self.persist()
+            return
+        if self._persist_timer is None:
+            self._persist_timer = threading.Timer(delay, self.persist)
+            self._persist_timer.daemon = True
+            self._persist_timer.start()
+
+    def refresh(self) -> bool:
+        """Upsert the rows appended since the last refresh; returns True when anything changed."""
+        with self._lock:
+            # Parse every column, as the candidate pool's tail of the same file
+            # does: with usecols pandas keeps malformed lines it would otherwise
+            # skip, and the row ids of the two readers would drift apart
+            reset, new_rows = self.read_appended(dtype=str, keep_default_na=False)
+            new_rows = _without_embeddings(new_rows)
+            if reset:
+                self.frame = pd.DataFrame()
+            if new_rows.empty and not reset:
+                return False
+
+            if not new_rows.empty:
+                new_rows.index = pd.Index(new_rows["username"].map(_normalize_username), name="username_key")
+                new_rows = new_rows[~new_rows.index.duplicated(keep="last")]
+                kept = self.frame[~self.frame.index.isin(new_rows.index)] if not self.frame.empty else None
+                self.frame = new_rows if kept is None else pd.concat([kept, new_rows])
+
+            self.version += 1
+            if reset:
+                self._changes = []
+                self._log_start = self.version
+            else:
+                self._changes.append((self.version, new_rows.index))
+                if len(self._changes) > CHANGE_LOG_LENGTH:
+                    self._log_start = self._changes.pop(0)[0]
+            self._schedule_persist()
+            return True
+
+    def changes_since(self, version: int | None) -> set[str] | None:
+        """
+        Normalised usernames whose row changed after `version`, or None when
+        that is unknown: the table was reset since, or `version` is older than
+        the refreshes it remembers.
+        """
+        with self._lock:
+            if version is None or version < self._log_start:
+                return None
+            return {username for changed, usernames in self._changes if changed > version for username in usernames}
+
+    def snapshot(self) -> pd.DataFrame:
+        """The current one-row-per-user frame (refreshed first)."""
+        with self._lock:
+            self.refresh()
+            return self.frame
+
+    def row(self, username: str) -> dict | None:
+        """The user's most recent row, or None when they never submitted this step."""
+        frame = self.snapshot()
+        key = _normalize_username(username)
+        if not key or frame.empty or key not in frame.index:
+            return None
+        return frame.loc[key].drop(ROW_ID_COLUMN).to_dict()
+
+# -----------------------------
+# Public API
+# -----------------------------
+
+_TABLES = {}
+_TABLES_LOCK = threading.Lock()
+
+
+def get_latest_table(name: str) -> LatestTable:
+    """The process-wide latest-row snapshot of survey table `name` (loaded on first use)."""
+    with _TABLES_LOCK:
+        if name not in _TABLES:
+            _TABLES[name] = LatestTable(name, SURVEY_TABLES[name])
+        return _TABLES[name]
+
+
+@atexit.register
+def flush_latest() -> None:
+    """Write every snapshot with a pending debounced write."""
+    with _TABLES_LOCK:
+        tables = list(_TABLES.values())
+    for table in tables:
+        table.flush()
+
+
+def scan_rows(name: str, offset: int = 0, header: bytes = b""):
+    """
+    Rows of survey table `name` from byte `offset` on (a line boundary whose
+    file header is `header`), in chunks parsed like the snapshots: all text,
+    malformed lines skipped.
+    """
+    path = SURVEY_TABLES[name]
+    if not os.path.exists(path):
+        return
+    with open(path, "rb") as file:
+        kwargs = {}
+        if offset:
+            file.seek(offset)
+            kwargs = {"header": None, "names": next(csv.reader([header.decode("utf-8")]))}
+        try:
+            yield from pd.read_csv(
+                file, chunksize=SCAN_CHUNK_SIZE, on_bad_lines="skip", dtype=str, keep_default_na=False, **kwargs
+            )
+        except pd.errors.EmptyDataError:
+            return
+
+
+def _streaming_row(name: str, username: str) -> dict | None:
+    """
+    The user's latest row without loading the table: their row in the
+    persisted snapshot (if any), superseded by the rows appended since,
+    which are scanned in chunks.
+    """
+    key = _normalize_username(username)
+    parquet_path = os.path.join(LATEST_DIR, f"{name}.parquet")
+    row, offset, header = None, 0, b""
+    try:
+        meta = json.loads(pq.read_schema(parquet_path).metadata[_METADATA_KEY])
+        stat = os.stat(SURVEY_TABLES[name])
+        if meta["inode"] == stat.st_ino and meta["offset"] <= stat.st_size:
+            table = pq.read_table(parquet_path, filters=[("username_key", "==", key)])
+            if table.num_rows:
+                row = _without_embeddings(table.to_pandas()).iloc[-1].drop(ROW_ID_COLUMN).to_dict()
+            offset, header = meta["offset"], meta["header"].encode("utf-8")
+    except (OSError, KeyError, ValueError, pa.ArrowException):
+        pass
+
+    for chunk in scan_rows(name, offset, header):
+        rows = chunk[chunk["username"].map(_normalize_username) == key]
+        if not rows.empty:
+            row = _without_embeddings(rows).iloc[-1].to_dict()
+    return row
+
+
+def latest_row(name: str, username: str) -> dict | None:
+    """
+    The user's most recent row of table `name`. In streaming mode the table
+    is never held in memory and the row is looked up on disk instead.
+    """
+    from utils.streaming_matching import streaming_enabled
+
+    if not _normalize_username(username):
+        return None
+    if streaming_enabled():
+        return _streaming_row(name, username)
+    return get_latest_table(name).row(username)
+
+
+def refresh_latest(name: str) -> None:
+    """Fold a row just appended to table `name` into its snapshot (skipped in streaming mode)."""
+    from utils.streaming_matching import streaming_enabled
+
+    if streaming_enabled():
+        return
+    get_latest_table(name).refresh()
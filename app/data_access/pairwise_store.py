@@ -0,0 +1,226 @@
+import os
+import threading
+
+import numpy as np
+
+from utils.file_lock import file_lock
+
+
+# -----------------------------
+# Configuration
+# -----------------------------
+
+DATA_DIR = os.path.join("..", "data")
+PAIRWISE_DIR = os.path.join(DATA_DIR, "pairwise")
+
+# Neighbours kept per user
+TOP_N = 50
+
+# Rows added at once when the store runs out of capacity
+MIN_GROWTH_ROWS = 1024
+
+_EMPTY_ID = -1
+_EMPTY_SCORE = -np.inf
+
+# Stamp of a row its owner never computed; only other users' scores were offered to it
+_UNOWNED = 0
+
+
+class PairwiseStore:
+    """
+    Sparse, symmetric store of pairwise compatibility scores: each user keeps
+    their TOP_N best neighbours.
+
+    On disk (under data/pairwise/):
+      - users.txt        one username per line; line number = row id
+      - neighbours.i32   (capacity, TOP_N) neighbour row ids, -1 for empty slots
+      - scores.f32       (capacity, TOP_N) matching scores, -inf for empty slots
+      - stamps.i64       (capacity,) profile stamp the owner computed their row
+                         with, 0 while they never have
+    Only rows their owner computed are served: a row that has merely been
+    offered other users' scores is partial. The matrices are memory-mapped, so every server process shares the same
+    pages instead of holding its own copy. Writers serialise through a lock file.
+    """
+
+    def __init__(self, directory: str = PAIRWISE_DIR, top_n: int = TOP_N):
+        self.directory = directory
+        self.top_n = top_n
+        self.usernames = []
+        self._row_of = {}
+        self._users_offset = 0
+        self._neighbours = None
+        self._scores = None
+        self._stamps = None
+        self._refresh_lock = threading.RLock()
+        os.makedirs(directory, exist_ok=True)
+        self.refresh()
+
+    def _path(self, name: str) -> str:
+        return os.path.join(self.directory, name)
+
+    @property
+    def _lock_path(self) -> str:
+        return self._path(".lock")
+
+    # -----------------------------
+    # Loading
+    # -----------------------------
+
+    def _capacity_on_disk(self) -> int:
+        path = self._path("scores.f32")
+        if not os.path.exists(path):
+            return 0
+        return os.path.getsize(path) // (4 * self.top_n)
+
+    def refresh(self) -> None:
+        """Pick up users and capacity added by this or another process."""
+        with self._refresh_lock:
+            users_path = self._path("users.txt")
+            if os.path.exists(users_path) and os.path.getsize(users_path) > self._users_offset:
+                with open(users_path, "rb") as file:
+                    file.seek(self._users_offset)
+                    data = file.read()
+                complete = data[: data.rfind(b"\n") + 1]
+                self._users_offset += len(complete)
+                for username in complete.decode("utf-8").splitlines():
+                    self._row_of[username] = len(self.usernames)
+                    self.usernames.append(username)
+
+            capacity = self._capacity_on_disk()
+            if capacity and (self._scores is None or len(self._scores) != capacity):
+                shape = (capacity, self.top_n)
+                self._neighbours = np.memmap(self._path("neighbours.i32"), dtype=np.int32, mode="r+", shape=shape)
+                self._scores = np.memmap(self._path("scores.f32"), dtype=np.float32, mode="r+", shape=shape)
+
+            # Stores written before rows carried stamps have no stamp file yet;
+            # their rows are untrusted until the owner recomputes them
+            stamps_path = self._path("stamps.i64")
+            has_stamps = capacity and os.path.exists(stamps_path) and os.path.getsize(stamps_path) == 8 * capacity
+            if not has_stamps:
+                self._stamps = None
+            elif self._stamps is None or len(self._stamps) != capacity:
+                self._stamps = np.memmap(stamps_path, dtype=np.int64, mode="r+", shape=(capacity,))
+
+    # -----------------------------
+    # Writing (callers hold the file lock)
+    # -----------------------------
+
+    def _ensure_capacity(self, n_rows: int) -> None:
+        capacity = self._capacity_on_disk()
+        if n_rows > capacity:
+            extra = max(n_rows - capacity, capacity, MIN_GROWTH_ROWS)
+            with open(self._path("neighbours.i32"), "ab") as file:
+                file.write(np.full((extra, self.top_n), _EMPTY_ID, dtype=np.int32).tobytes())
+            with open(self._path("scores.f32"), "ab") as file:
+                file.write(np.full((extra, self.top_n), _EMPTY_SCORE, dtype=np.float32).tobytes())
+            capacity += extra
+        self._ensure_stamps(capacity)
+        self.refresh()
+
+    def _ensure_stamps(self, capacity: int) -> None:
+        """Grow the stamp file to `capacity` rows; new rows are unowned."""
+        path = self._path("stamps.i64")
+        stamped = os.path.getsize(path) // 8 if os.path.exists(path) else 0
+        if stamped < capacity:
+            with open(path, "ab") as file:
+                file.write(np.full(capacity - stamped, _UNOWNED, dtype=np.int64).tobytes())
+
+    def _row_ids(self, usernames: list[str]) -> np.ndarray:
+        new_usernames = [username for username in dict.fromkeys(usernames) if username not in self._row_of]
+        if new_usernames:
+            with open(self._path("users.txt"), "ab") as file:
+                file.write("".join(f"{username}\n" for username in new_usernames).encode("utf-8"))
+            self.refresh()
+            self._ensure_capacity(len(self.usernames))
+        return np.array([self._row_of[username] for username in usernames], dtype=np.int32)
+
+    def update_user(self, username: str, candidates: list[str], scores: np.ndarray, stamp: int) -> None:
+        """
+        Store `username`'s scores against every compatible candidate: their own
+        row gets the TOP_N best and is marked as computed from the profile
+        `stamp` (any non-zero int64). Each candidate who owns a row takes
+        `username` in when it beats their current worst neighbour. Candidates
+        that are no longer compatible drop `username` from their rows.
+        """
+        if stamp == _UNOWNED:
+            raise ValueError("stamp must be non-zero")
+        scores = np.asarray(scores, dtype=np.float32)
+        with file_lock(self._lock_path):
+            self.refresh()
+            user_row = self._row_ids([username])[0]
+            candidate_rows = self._row_ids(list(candidates))
+            self._ensure_capacity(len(self.usernames))
+            neighbours, stored, stamps = self._neighbours, self._scores, self._stamps
+
+            # Row: the user's own TOP_N
+            best = np.argsort(-scores, kind="stable")[: self.top_n]
+            neighbours[user_row] = _EMPTY_ID
+            stored[user_row] = _EMPTY_SCORE
+            neighbours[user_row, : len(best)] = candidate_rows[best]
+            stored[user_row, : len(best)] = scores[best]
+            stamps[user_row] = stamp
+
+            # Column: remove stale entries, then offer the user to every candidate
+            holds_user = neighbours[: len(self.usernames)] == user_row
+            holds_user[candidate_rows] = False
+            neighbours[: len(self.usernames)][holds_user] = _EMPTY_ID
+            stored[: len(self.usernames)][holds_user] = _EMPTY_SCORE
+
+            rows_neighbours = neighbours[candidate_rows]
+            rows_scores = stored[candidate_rows]
+            present = rows_neighbours == user_row
+            has_user = present.any(axis=1)
+            slot = np.where(has_user, present.argmax(axis=1), rows_scores.argmin(axis=1))
+            improves = has_user | (scores > rows_scores[np.arange(len(candidate_rows)), slot])
+            # Rows their owner never computed stay empty rather than partial
+            improves &= stamps[candidate_rows] != _UNOWNED
+
+            neighbours[candidate_rows[improves], slot[improves]] = user_row
+            stored[candidate_rows[improves], slot[improves]] = scores[improves]
+
+            neighbours.flush()
+            stored.flush()
+            stamps.flush()
+
+    # -----------------------------
+    # Reading
+    # -----------------------------
+
+    def lookup(self, username: str, stamp: int | None = None) -> list[tuple[str, float]]:
+        """
+        The stored neighbours of `username`, best first. Empty when they never
+        computed their own row or, given `stamp`, computed it from a different
+        profile.
+        """
+        self.refresh()
+        row = self._row_of.get(username)
+        if row is None or self._scores is None or self._stamps is None:
+            return []
+        row_stamp = int(self._stamps[row])
+        if row_stamp == _UNOWNED or (stamp is not None and row_stamp != stamp):
+            return []
+
+        neighbours = np.array(self._neighbours[row])
+        scores = np.array(self._scores[row])
+        filled = neighbours != _EMPTY_ID
+        order = np.argsort(-scores[filled], kind="stable")
+        return [
+            (self.usernames[neighbour], float(score))
+            for neighbour, score in zip(neighbours[filled][order], scores[filled][order])
+        ]
+
+# -----------------------------
+# Public API
+# -----------------------------
+
+_STORE = None
+_STORE_LOCK = threading.Lock()
+
+
+def get_pairwise_store() -> PairwiseStore:
+    """The process-wide handle on the memory-mapped store (opened on first use)."""
+    global _STORE
+    with _STORE_LOCK:
+        if _STORE is None:
+            _STORE = PairwiseStore()
+        return _STORE
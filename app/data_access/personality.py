@@ -1,6 +1,7 @@
 import os
 import pandas as pd
 from datetime import datetime
+from data_access.latest_answers import refresh_latest
 from data_access.postgres import append_row
 
 # -----------------------------
@@ -72,6 +73,7 @@ def save_personality_from_state(session_state) -> None:
     else:
         df_new.to_csv(PERSONALITY_PATH, index=False)
 
+    refresh_latest("personality")
     append_row("saved_answers_personality", row)
 
 
@@ -96,4 +98,5 @@ def save_personality_responses_from_state(session_state) -> None:
     else:
         df_new.to_csv(PERSONALITY_RESPONSES_PATH, index=False)
 
+    refresh_latest("personality_responses")
     append_row("saved_answers_personality_responses", row)
\ No newline at end of file
@@ -6,6 +6,7 @@ from typing import Any
 
 import psycopg2
 from psycopg2 import sql
+from psycopg2.extras import execute_values
 
 
 LOGGER = logging.getLogger(__name__)
@@ -72,13 +73,44 @@ def _ensure_table_and_columns(cur, table_name: str, columns: list[str]) -> None:
             )
 
 
+def _ensure_unique_index(cur, table_name: str, columns: list[str]) -> None:
+    index_name = _sanitize_identifier(f"{table_name}_{'_'.join(columns)}_key")
+    cur.execute(
+        sql.SQL("CREATE UNIQUE INDEX IF NOT EXISTS {} ON {} ({})").format(
+            sql.Identifier(index_name),
+            sql.Identifier(table_name),
+            sql.SQL(", ").join(sql.Identifier(column) for column in columns),
+        )
+    )
+
+
+def _normalize_row(row: dict[str, Any]) -> dict[str, Any]:
+    normalized: dict[str, Any] = {}
+    for raw_key, raw_value in row.items():
+        safe_key = _sanitize_identifier(raw_key)
+        if not safe_key:
+            continue
+        normalized[safe_key] = _normalize_value(raw_value)
+    return normalized
+
+
 def append_row(table_name: str, row: dict[str, Any]) -> None:
     """
     Append one row to Postgres if DATABASE_URL/RENDER_POSTGRES_URL/POSTGRES_URL is set.
     Silently skips when Postgres is not configured.
     """
+    append_rows(table_name, [row])
+
+
+def append_rows(table_name: str, rows: list[dict[str, Any]], unique_columns: list[str] | None = None) -> None:
+    """
+    Append many rows to Postgres through one connection and one multi-row
+    INSERT (see append_row). With `unique_columns`, the table gets a unique
+    index on them and rows that would duplicate an existing key are skipped,
+    so writing the same rows again is a no-op.
+    """
     database_url = _get_database_url()
-    if not database_url:
+    if not database_url or not rows:
         return
 
     safe_table_name = _sanitize_identifier(table_name)
@@ -86,34 +118,36 @@ def append_row(table_name: str, row: dict[str, Any]) -> None:
         LOGGER.warning("Skipping Postgres write: invalid table name '%s'", table_name)
         return
 
-    normalized_items_map: dict[str, Any] = {}
-    for raw_key, raw_value in row.items():
-        safe_key = _sanitize_identifier(raw_key)
-        if not safe_key:
-            continue
-        normalized_items_map[safe_key] = _normalize_value(raw_value)
-
-    normalized_items = list(normalized_items_map.items())
+    normalized_rows = [_normalize_row(row) for row in rows]
+    columns = list(dict.fromkeys(column for row in normalized_rows for column in row))
 
-    if not normalized_items:
+    if not columns:
         LOGGER.warning("Skipping Postgres write: row has no valid columns")
         return
 
-    columns = [column for column, _ in normalized_items]
-    values = [value for _, value in normalized_items]
+    values = [[row.get(column) for column in columns] for row in normalized_rows]
+    conflict = sql.SQL("")
+    if unique_columns:
+        unique_columns = [_sanitize_identifier(column) for column in unique_columns]
+        conflict = sql.SQL(" ON CONFLICT ({}) DO NOTHING").format(
+            sql.SQL(", ").join(sql.Identifier(column) for column in unique_columns)
+        )
 
     try:
         with psycopg2.connect(database_url) as conn:
             with conn.cursor() as cur:
                 _ensure_table_and_columns(cur, safe_table_name, columns)
+                if unique_columns:
+                    _ensure_unique_index(cur, safe_table_name, unique_columns)
 
-                cur.execute(
-                    sql.SQL("INSERT INTO {} ({}) VALUES ({})").format(
+                execute_values(
+                    cur,
+                    sql.SQL("INSERT INTO {} ({}) VALUES %s{}").format(
                         sql.Identifier(safe_table_name),
                         sql.SQL(", ").join(sql.Identifier(column) for column in columns),
-                        sql.SQL(", ").join(sql.Placeholder() for _ in columns),
+                        conflict,
                     ),
                     values,
                 )
     except Exception as exc:
-        LOGGER.exception("Failed to write row to Postgres table '%s': %s", safe_table_name, exc)
+        LOGGER.exception("Failed to write rows to Postgres table '%s': %s", safe_table_name, exc)
@@ -1,76 +1,60 @@
 from utils.embeddings import get_embeddings
 from datetime import datetime
+import logging
 import pandas as pd
 import os
+from data_access.latest_answers import refresh_latest
 from data_access.postgres import append_row
+from data_access.values_index import index_values_row
+from utils.embedding_batcher import microbatching_enabled
+from utils.embedding_executor import submit_embedding
 
 
-def save_texts_with_embeddings(profile: dict):
-    texts = [
-        profile["share_personal_feelings"],
-        profile["group_disputes"],
-        profile["group_decision"],
-        profile["giving_importance"],
-        profile["you_creative"],
-    ]
+LOGGER = logging.getLogger(__name__)
 
-    embeddings = get_embeddings(texts)
-
-    row = {
-        "timestamp": datetime.utcnow().isoformat(),
-        **profile,
-        "share_personal_feelings_embedding": embeddings[0].tolist(),
-        "group_disputes_embedding": embeddings[1].tolist(),
-        "group_decision_embedding": embeddings[2].tolist(),
-        "giving_importance_embedding": embeddings[3].tolist(),
-        "you_creative_embedding": embeddings[4].tolist(),
-    }
-
-    path = "../data/saved_answers_values.csv"
-    pd.DataFrame([row]).to_csv(
-        path,
-        mode="a",
-        header=not os.path.exists(path),
-        index=False,
-    )
-
-    append_row("saved_answers_values", row)
 
+VALUES_TEXT_FIELDS = [
+    "share_personal_feelings",
+    "group_disputes",
+    "group_decision",
+    "giving_importance",
+    "you_creative",
+]
 
 
-
-def save_texts_with_embeddings_2(profile: dict):
+def save_texts_with_embeddings(profile: dict, embedding_futures: dict | None = None):
     """
-    Memory-efficient embedding storage for 512MB instances.
+    Embed the values answers and store them with the profile.
+
+    `embedding_futures` maps fields to futures already encoding their answer
+    (see utils.embedding_executor). The remaining non-empty answers are
+    submitted to the cross-session micro-batcher, so they share forward
+    passes with other sessions' requests; with EMBEDDING_MICROBATCH=0 they
+    are encoded together in one get_embeddings call. Either way the batch
+    planner keeps the forward passes within the memory available (512 MB
+    instances included). Empty answers are stored with an empty embedding.
     """
-    fields = [
-        "share_personal_feelings",
-        "group_disputes",
-        "group_decision",
-        "giving_importance",
-        "you_creative",
-    ]
-
+    embedding_futures = embedding_futures or {}
     row = {
         "timestamp": datetime.utcnow().isoformat(),
         **profile
     }
 
-    # Process each field individually
-    for field in fields:
+    pending = [field for field in VALUES_TEXT_FIELDS if profile.get(field) and field not in embedding_futures]
+    encoded = {}
+    if microbatching_enabled():
+        embedding_futures = {**embedding_futures, **{field: submit_embedding(profile[field]) for field in pending}}
+    elif pending:
+        encoded = dict(zip(pending, get_embeddings([profile[field] for field in pending])))
+
+    for field in VALUES_TEXT_FIELDS:
         text = profile.get(field, "")
         if not text:
             row[f"{field}_embedding"] = []
-            continue
-
-        # Generate embedding for one text at a time
-        embedding = get_embeddings([text])[0]  # returns a vector
-
-        # Store immediately as list
-        row[f"{field}_embedding"] = embedding.tolist()
-
-        # Free memory
-        del embedding
+        elif field in encoded:
+            row[f"{field}_embedding"] = encoded[field].tolist()
+        else:
+            row[f"{field}_embedding"] = _field_embedding(text, embedding_futures[field]).tolist()
 
     # Save to CSV immediately
     path = "../data/saved_answers_values.csv"
@@ -81,5 +65,15 @@ def save_texts_with_embeddings_2(profile: dict):
         index=False
     )
 
+    index_values_row(row)
+    refresh_latest("values")
     append_row("saved_answers_values", row)
 
+
+def _field_embedding(text: str, future=None):
+    if future is not None:
+        try:
+            return future.result()
+        except Exception as error:
+            LOGGER.warning("Background embedding failed, encoding again: %s", error)
+    return get_embeddings([text])[0]
@@ -1,48 +1,19 @@
 import ast
-import csv
 import datetime
-import os
 from typing import Any
 
-
-DATA_DIR = os.path.join("..", "data")
-
-DEMOGRAPHICS_PATH = os.path.join(DATA_DIR, "saved_answers_demographics.csv")
-PRACTICAL_PATH = os.path.join(DATA_DIR, "saved_answers_practical.csv")
-LIFESTYLE_PATH = os.path.join(DATA_DIR, "saved_answers_lifestyle.csv")
-PERSONALITY_PATH = os.path.join(DATA_DIR, "saved_answers_personality.csv")
-PERSONALITY_RESPONSES_PATH = os.path.join(DATA_DIR, "saved_answers_personality_responses.csv")
-VALUES_PATH = os.path.join(DATA_DIR, "saved_answers_values.csv")
+from data_access.latest_answers import latest_row
 
 
 def _normalize_username(username: str) -> str:
     return (username or "").strip().lower()
 
 
-def _read_rows(path: str) -> list[dict[str, Any]]:
-    if not os.path.exists(path):
-        return []
-
-    with open(path, "r", newline="", encoding="utf-8") as file:
-        reader = csv.DictReader(file)
-        return list(reader)
-
-
-def _latest_row_for_user(path: str, username: str) -> dict[str, Any] | None:
-    target = _normalize_username(username)
-    if not target:
-        return None
-
-    rows = _read_rows(path)
-    if not rows:
+def _latest_row_for_user(table: str, username: str) -> dict[str, Any] | None:
+    # One dictionary lookup in the table's latest-row snapshot
+    if not _normalize_username(username):
         return None
-
-    for row in reversed(rows):
-        row_username = _normalize_username(str(row.get("username", "")))
-        if row_username == target:
-            return row
-
-    return None
+    return latest_row(table, username)
 
 
 def _as_date(value: Any) -> datetime.date | None:
@@ -215,13 +186,21 @@ def _compute_resume_step(
     return 2
 
 
+def profile_from_row(row: dict[str, Any]) -> dict[str, Any]:
+    """Requirements and personality state from one merged answers row (e.g. a candidate pool row)."""
+    return {
+        "requirements": _build_requirements_state(row),
+        "personality": _build_personality_state(row),
+    }
+
+
 def load_user_progress(username: str) -> dict[str, Any]:
-    demographics_row = _latest_row_for_user(DEMOGRAPHICS_PATH, username)
-    practical_row = _latest_row_for_user(PRACTICAL_PATH, username)
-    lifestyle_row = _latest_row_for_user(LIFESTYLE_PATH, username)
-    personality_row = _latest_row_for_user(PERSONALITY_PATH, username)
-    personality_responses_row = _latest_row_for_user(PERSONALITY_RESPONSES_PATH, username)
-    values_row = _latest_row_for_user(VALUES_PATH, username)
+    demographics_row = _latest_row_for_user("demographics", username)
+    practical_row = _latest_row_for_user("practical", username)
+    lifestyle_row = _latest_row_for_user("lifestyle", username)
+    personality_row = _latest_row_for_user("personality", username)
+    personality_responses_row = _latest_row_for_user("personality_responses", username)
+    values_row = _latest_row_for_user("values", username)
 
     merged_requirements_row = {}
     if practical_row:
@@ -0,0 +1,202 @@
+import json
+import logging
+import os
+import threading
+
+import pandas as pd
+
+from data_access.latest_answers import get_latest_table, scan_rows
+from utils.ann_index import IVFFlatIndex
+
+
+LOGGER = logging.getLogger(__name__)
+
+# -----------------------------
+# Configuration
+# -----------------------------
+
+DATA_DIR = os.path.join("..", "data")
+VALUES_PATH = os.path.join(DATA_DIR, "saved_answers_values.csv")
+VALUES_INDEX_DIR = os.path.join(DATA_DIR, "values_index")
+
+VALUES_EMBEDDING_FIELDS = [
+    "share_personal_feelings",
+    "group_disputes",
+    "group_decision",
+    "giving_importance",
+    "you_creative",
+]
+
+# Probed inverted lists per search; override with VALUES_INDEX_NPROBE
+DEFAULT_N_PROBE = IVFFlatIndex.DEFAULT_N_PROBE
+
+_INDEXES = None
+_INDEXES_LOCK = threading.Lock()
+
+# Questions whose index is being trained by a background thread
+_TRAINING = set()
+_TRAINING_LOCK = threading.Lock()
+
+# -----------------------------
+# Internal helpers
+# -----------------------------
+
+def _normalize_username(username) -> str:
+    return str(username or "").strip().lower()
+
+
+def _parse_embedding(value) -> list[float]:
+    if isinstance(value, (list, tuple)):
+        return list(value)
+    if not isinstance(value, str) or not value.strip():
+        return []
+    try:
+        parsed = json.loads(value)
+    except ValueError:
+        return []
+    return parsed if isinstance(parsed, list) else []
+
+
+def _answered_users() -> dict[str, set[str]]:
+    """Users whose latest values row answers each question."""
+    from utils.streaming_matching import streaming_enabled
+
+    if not streaming_enabled():
+        frame = get_latest_table("values").snapshot()
+        return {
+            field: set(frame.index[frame[field].str.strip() != ""])
+            for field in VALUES_EMBEDDING_FIELDS if field in frame.columns
+        }
+
+    # Streaming mode never loads the table; keep one answered flag per question and user
+    latest = {}
+    for chunk in scan_rows("values"):
+        fields = [field for field in VALUES_EMBEDDING_FIELDS if field in chunk.columns]
+        usernames = chunk["username"].map(_normalize_username)
+        answered = chunk[fields].apply(lambda column: column.str.strip() != "").to_numpy()
+        latest.update(zip(usernames, (dict(zip(fields, flags)) for flags in answered.tolist())))
+    return {
+        field: {username for username, flags in latest.items() if flags.get(field)}
+        for field in VALUES_EMBEDDING_FIELDS
+    }
+
+
+def _missing_users(indexes: dict[str, IVFFlatIndex]) -> set[str]:
+    """Users whose latest values row answers a question its index has no vector for."""
+    answered = _answered_users()
+    missing = set()
+    for field, index in indexes.items():
+        users = answered.get(field, set())
+        if index.size < len(users):
+            missing.update(username for username in users if username not in index)
+    return missing
+
+
+def _backfill(indexes: dict[str, IVFFlatIndex], usernames: set[str]) -> None:
+    """Add the latest stored embeddings of `usernames` from the values CSV."""
+    if not usernames or not os.path.exists(VALUES_PATH):
+        return
+
+    columns = ["username", *[f"{field}_embedding" for field in VALUES_EMBEDDING_FIELDS]]
+    df = pd.read_csv(
+        VALUES_PATH,
+        usecols=lambda column: column in columns,
+        on_bad_lines="skip",
+    )
+    df["username"] = df["username"].map(_normalize_username)
+    df = df[df["username"].isin(usernames)].drop_duplicates("username", keep="last")
+    for row in df.to_dict("records"):
+        _add_row(indexes, row)
+
+
+def _add_row(indexes: dict[str, IVFFlatIndex], row: dict) -> None:
+    username = _normalize_username(row.get("username"))
+    if not username:
+        return
+    for field, index in indexes.items():
+        embedding = _parse_embedding(row.get(f"{field}_embedding"))
+        if embedding:
+            index.add(username, embedding)
+
+def _train(field: str, index: IVFFlatIndex) -> None:
+    try:
+        index.train()
+    except Exception as error:
+        LOGGER.warning("Training the %s values index failed: %s", field, error)
+    finally:
+        with _TRAINING_LOCK:
+            _TRAINING.discard(field)
+
+
+def _train_in_background(indexes: dict[str, IVFFlatIndex]) -> None:
+    """Start one training thread per index that has outgrown its centroids (if none is running)."""
+    for field, index in indexes.items():
+        if not index.needs_training:
+            continue
+        with _TRAINING_LOCK:
+            if field in _TRAINING:
+                continue
+            _TRAINING.add(field)
+        threading.Thread(target=_train, args=(field, index), name=f"train-{field}", daemon=True).start()
+
+# -----------------------------
+# Public API
+# -----------------------------
+
+def get_values_indexes() -> dict[str, IVFFlatIndex]:
+    """
+    One persistent ANN index per values question, stored under data/values_index/.
+    Loaded once per process. An index holding fewer users than answered its
+    question in the latest values table (first run, or a save interrupted
+    between the CSV and the index) is topped up from saved_answers_values.csv.
+    """
+    global _INDEXES
+    with _INDEXES_LOCK:
+        if _INDEXES is None:
+            n_probe = int(os.getenv("VALUES_INDEX_NPROBE", DEFAULT_N_PROBE))
+            indexes = {
+                field: IVFFlatIndex(os.path.join(VALUES_INDEX_DIR, field), n_probe)
+                for field in VALUES_EMBEDDING_FIELDS
+            }
+            _backfill(indexes, _missing_users(indexes))
+            _INDEXES = indexes
+        return _INDEXES
+
+
+def index_values_row(row: dict) -> None:
+    """
+    Insert the embeddings of a freshly saved values row. Indexes that have
+    outgrown their centroids are retrained in a background thread.
+    """
+    indexes = get_values_indexes()
+    _add_row(indexes, row)
+    _train_in_background(indexes)
+
+
+def train_values_indexes() -> None:
+    """Retrain, in the calling thread, every index that has outgrown its centroids."""
+    for index in get_values_indexes().values():
+        if index.needs_training:
+            index.train()
+
+
+def values_neighbours(username: str, k: int) -> dict[str, float]:
+    """
+    Mean cosine similarity of the user's values answers to their k nearest
+    neighbours in each question's index, keyed by candidate username.
+    """
+    username = _normalize_username(username)
+    totals: dict[str, float] = {}
+    counts: dict[str, int] = {}
+
+    for index in get_values_indexes().values():
+        vector = index.vector_for(username)
+        if vector is None:
+            continue
+        for candidate, score in index.search(vector, k + 1):
+            if candidate == username:
+                continue
+            totals[candidate] = totals.get(candidate, 0.0) + score
+            counts[candidate] = counts.get(candidate, 0) + 1
+
+    return {candidate: totals[candidate] / counts[candidate] for candidate in totals}
@@ -35,6 +35,8 @@ def init_session_state():
         "you_creative": "",
         "sharing_unfinished_ideas": None,
         "working_style": None,
+        # field -> (answer, future of its embedding), see utils.embedding_executor
+        "values_embedding_futures": {},
     }
 
     if demo_mode == "sarah":
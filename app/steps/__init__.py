@@ -1,19 +1,24 @@
-from .step_0_landingpage import render as step_0
-from .step_01_authentification import render as step_01
-from .step_1_demographics import render as step_1
-from .step_2_practical import render as step_2
-from .step_3_lifestyle import render as step_3
-from .step_4_personality import render as step_4
-from .step_5_values import render as step_5
-from .step_6_matches import render as step_6
+import importlib
 
-STEP_REGISTRY = {
-    0: step_0,
-    1: step_01,
-    2: step_1,
-    3: step_2,
-    4: step_3,
-    5: step_4,
-    6: step_5,
-    7: step_6,
+# Step modules are imported the first time their step is rendered, so the
+# landing page does not pay for the heavy dependencies of later steps
+# (torch and transformers in step 5, plotly and reportlab in step 6).
+STEP_MODULES = {
+    0: "step_0_landingpage",
+    1: "step_01_authentification",
+    2: "step_1_demographics",
+    3: "step_2_practical",
+    4: "step_3_lifestyle",
+    5: "step_4_personality",
+    6: "step_5_values",
+    7: "step_6_matches",
 }
+
+
+def _lazy_render(module_name: str):
+    def render():
+        return importlib.import_module(f"{__name__}.{module_name}").render()
+    return render
+
+
+STEP_REGISTRY = {step: _lazy_render(module_name) for step, module_name in STEP_MODULES.items()}
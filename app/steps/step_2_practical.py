@@ -3,6 +3,10 @@ import csv
 import os
 import datetime
 from data_access.postgres import append_row
+from data_access.candidate_pool import get_candidate_pool
+from data_access.latest_answers import refresh_latest
+from utils.budget import normalize_budgets
+from utils.streaming_matching import streaming_enabled
 
 from state.navigation import next_step, prev_step
 from ui.layout import render_login_info, render_progress_bar
@@ -24,6 +28,8 @@ PRACTICAL_CSV_COLUMNS = [
     "available_budget_purchase",
     "monthly_budget_rent",
     "other_practical_requirements",
+    "monthly_budget_rent_eur",
+    "available_budget_purchase_eur",
 ]
 
 
@@ -293,13 +299,23 @@ def render():
                     "monthly_budget_rent": req.get("monthly_budget_rent", 0),
                     "other_practical_requirements": req.get("other_practical_requirements", ""),
                 }
+                # Budgets are also stored in the base currency so matching can compare them
+                row.update(normalize_budgets(row))
                 file_exists = os.path.isfile(csv_file_path)
+                fieldnames = PRACTICAL_CSV_COLUMNS
+                if file_exists:
+                    # Files created before a column was added keep their own header
+                    with open(csv_file_path, newline='', encoding='utf-8') as file:
+                        fieldnames = next(csv.reader(file), None) or PRACTICAL_CSV_COLUMNS
                 with open(csv_file_path, mode='a', newline='', encoding='utf-8') as file:
-                    writer = csv.DictWriter(file, fieldnames=PRACTICAL_CSV_COLUMNS, extrasaction="ignore")
+                    writer = csv.DictWriter(file, fieldnames=fieldnames, extrasaction="ignore")
                     if not file_exists:
                         writer.writeheader()
                     writer.writerow(row)
 
+                refresh_latest("practical")
+                if not streaming_enabled():
+                    get_candidate_pool().refresh_in_background()
                 append_row("saved_answers_practical", row)
                 next_step()
 
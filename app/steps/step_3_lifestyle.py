@@ -2,6 +2,7 @@ import streamlit as st
 import csv
 import os
 import datetime
+from data_access.latest_answers import refresh_latest
 from data_access.postgres import append_row
 
 from state.navigation import next_step, prev_step
@@ -260,6 +261,7 @@ def render():
                     writer.writeheader()
                 writer.writerow(row)
 
+            refresh_latest("lifestyle")
             append_row("saved_answers_lifestyle", row)
             next_step()
 
@@ -5,7 +5,9 @@ from openai import OpenAI
 from streamlit_sortables import sort_items
 
 from state.navigation import next_step, prev_step
-from data_access.profiles import save_texts_with_embeddings, save_texts_with_embeddings_2
+from data_access.profiles import save_texts_with_embeddings
+from utils.embedding_executor import current_futures, prefetch_embedding
+from utils.matching_client import store_user_matches
 # from utils.validation import min_length
 
 from ui.layout import render_login_info, render_progress_bar
@@ -126,7 +128,11 @@ def render():
                 "working_style": working_style
             }
 
-            save_texts_with_embeddings_2(profile)
+            # Answers are encoded in the background as they come in; only
+            # the ones still running are waited for here
+            futures = current_futures(st.session_state.values_embedding_futures, profile)
+            save_texts_with_embeddings(profile, futures)
+            store_user_matches(st.session_state)
             next_step()
 
     render_progress_bar()
@@ -193,6 +199,9 @@ def audio_transcription_input(question_label, session_key):
             os.remove(audio_path)
         except OSError:
             pass
+    # Start encoding the answer now rather than on submit
+    futures = st.session_state.setdefault("values_embedding_futures", {})
+    prefetch_embedding(futures, session_key, st.session_state.get(session_key, ""))
     if st.session_state.get(session_key):
         st.markdown('<span style="color:blue">Transcription: </span>', unsafe_allow_html=True)
         st.markdown(f'<span style="color:blue">{st.session_state[session_key]}</span>', unsafe_allow_html=True)
@@ -1,15 +1,55 @@
 import streamlit as st
 
+from data_access.communities import load_community
 from data_access.credentials import set_questionnaire_completed
+from data_access.pairwise_store import get_pairwise_store
 from state.reset import reset_session_state
 from ui.layout import render_header
-from utils.matching import find_matches
+from utils.matching import display_matches
+from utils.matching_client import find_matches
 import plotly.graph_objects as go
 import base64
+import numpy as np
 from PIL import Image
 from utils.pdf_report import generate_pdf_profile, generate_pdf_matches
 
 
+def _community_figure(username: str, members: list[str]) -> go.Figure:
+    """Members of the user's community on a circle, linked by their stored compatibility."""
+    angles = np.linspace(0, 2 * np.pi, len(members), endpoint=False)
+    position = {member: (np.cos(angle), np.sin(angle)) for member, angle in zip(members, angles)}
+
+    fig = go.Figure()
+    store = get_pairwise_store()
+    for member in members:
+        for neighbour, score in store.lookup(member):
+            if neighbour in position and member < neighbour:
+                (x0, y0), (x1, y1) = position[member], position[neighbour]
+                fig.add_trace(go.Scatter(
+                    x=[x0, x1], y=[y0, y1],
+                    mode="lines",
+                    line=dict(width=1 + 4 * max(score, 0), color="rgba(120, 120, 120, 0.5)"),
+                    hoverinfo="skip",
+                ))
+
+    fig.add_trace(go.Scatter(
+        x=[position[member][0] for member in members],
+        y=[position[member][1] for member in members],
+        mode="markers",
+        marker=dict(
+            size=[28 if member == username else 18 for member in members],
+            color=["#e4572e" if member == username else "#2e86ab" for member in members],
+        ),
+        hovertext=["You" if member == username else "Future neighbour" for member in members],
+        hoverinfo="text",
+    ))
+
+    fig.update_xaxes(showgrid=False, visible=False)
+    fig.update_yaxes(showgrid=False, visible=False, scaleanchor="x")
+    fig.update_layout(margin=dict(l=0, r=0, t=0, b=0), showlegend=False)
+    return fig
+
+
 def render():
     render_header()
 
@@ -172,17 +212,28 @@ def render():
     st.subheader("Your Matches")
     st.write(f"Showing matches for **{st.session_state.emailaddress}**")
 
+    # Community assigned by the last batch run of utils.communities, if any
+    username = str(st.session_state.emailaddress or "").strip().lower()
+    community = load_community(username)
+    if community:
+        st.write(f"Based on your profile, you could fit well together with the {len(community) - 1} people of this community!")
+        col1, col2, col3 = st.columns([1, 3, 1])
+        with col2:
+            st.plotly_chart(_community_figure(username, community))
+
     if matches.empty:
         if demo_mode == "dev":
             st.warning("No matches found.")
         if demo_mode == "prod":
             st.write("Your are an early bird and that means we need more people to join our database in order for you to be matched. We are continuously expanding our network of Glasshomes, so keep an eye at your inbox: you will receive an email from us when there is an update!")
     else:
+        # Only the display columns: the rest are other users' private answers
+        shown = display_matches(matches)
         st.subheader("Top 3 Compatibility Matches")
-        st.dataframe(matches)
+        st.dataframe(shown)
         st.download_button(
             label="Download My Matches PDF",
-            data=generate_pdf_matches(user_data, matches),
+            data=generate_pdf_matches(user_data, shown),
             file_name="glasshome_matches.pdf",
             mime="application/pdf"
         )
@@ -0,0 +1,157 @@
+import csv
+import json
+import os
+import shutil
+import sys
+import types
+
+import numpy as np
+import pytest
+
+APP_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+REPO_DATA_DIR = os.path.join(os.path.dirname(APP_DIR), "data")
+sys.path.insert(0, APP_DIR)
+
+SURVEY_FILES = [
+    "saved_answers_demographics.csv",
+    "saved_answers_practical.csv",
+    "saved_answers_lifestyle.csv",
+    "saved_answers_personality.csv",
+    "saved_answers_personality_responses.csv",
+    "saved_answers_values.csv",
+]
+
+
+class SurveyData:
+    """Empty survey tables (repo headers) in a scratch data folder, plus row writers."""
+
+    def __init__(self, data_dir: str):
+        self.data_dir = data_dir
+        for name in SURVEY_FILES:
+            with open(os.path.join(REPO_DATA_DIR, name), encoding="utf-8") as source:
+                header = source.readline()
+            with open(os.path.join(data_dir, name), "w", encoding="utf-8") as target:
+                target.write(header)
+
+    def append(self, name: str, row: dict) -> None:
+        path = os.path.join(self.data_dir, f"saved_answers_{name}.csv")
+        with open(path, encoding="utf-8") as file:
+            columns = file.readline().strip().split(",")
+        with open(path, "a", newline="", encoding="utf-8") as file:
+            csv.DictWriter(file, columns, extrasaction="ignore").writerow(row)
+
+    def append_malformed(self, name: str) -> None:
+        """A line with more fields than the header, which the CSV readers skip."""
+        path = os.path.join(self.data_dir, f"saved_answers_{name}.csv")
+        with open(path, encoding="utf-8") as file:
+            n_columns = len(file.readline().strip().split(","))
+        with open(path, "a", encoding="utf-8") as file:
+            file.write(",".join(["broken@x.com"] * (n_columns + 3)) + "\n")
+
+    def add_values(self, username: str, vector) -> None:
+        """A values submission answering every question with the same embedding."""
+        from data_access.values_index import VALUES_EMBEDDING_FIELDS
+
+        embedding = json.dumps([round(float(value), 4) for value in vector])
+        self.append("values", {
+            "timestamp": "2026-01-01T00:00:00",
+            "username": username,
+            **{field: "An answer" for field in VALUES_EMBEDDING_FIELDS},
+            **{f"{field}_embedding": embedding for field in VALUES_EMBEDDING_FIELDS},
+        })
+
+    def add_user(self, username: str, location: str, seed: int, practical: dict | None = None,
+                 lifestyle: dict | None = None) -> None:
+        """
+        A complete practical, lifestyle, personality and demographics
+        submission; `practical` and `lifestyle` override answers.
+        """
+        from utils.bitmask import PRACTICAL_OPTIONS
+
+        rng = np.random.default_rng(seed)
+        self.append("practical", {
+            "timestamp": "2026-01-01T00:00:00",
+            "username": username,
+            "desired_location": location,
+            **{field: list(options) for field, options in PRACTICAL_OPTIONS.items()},
+            "legal_structure": "Rental agreement",
+            "budget_currency": "EUR (€)",
+            "monthly_budget_rent": 900,
+            "available_budget_purchase": 0,
+            "monthly_budget_rent_eur": 900,
+            "available_budget_purchase_eur": 0,
+            **(practical or {}),
+        })
+        self.append("lifestyle", {
+            "timestamp": "2026-01-01T00:00:00",
+            "username": username,
+            "contact_with_neighbours": "Moderate",
+            "mix_of_household": "Neutral",
+            "frequency_shared_activities": "Once a week",
+            **(lifestyle or {}),
+        })
+        self.append("personality", {
+            "timestamp": "2026-01-01T00:00:00",
+            "username": username,
+            **{trait: round(float(value), 2) for trait, value in zip(
+                ["extraversion", "agreeableness", "conscientiousness", "neuroticism", "openness"],
+                rng.uniform(1, 5, size=5),
+            )},
+        })
+        self.append("demographics", {"timestamp": "2026-01-01T00:00:00", "username": username, "full_name": username})
+
+    def add_users(self, n: int, locations=("Sweden, Stockholm",), values_dim: int | None = None):
+        """
+        Users user0@x.com ... user{n-1}@x.com cycling through `locations`, with
+        random values embeddings of `values_dim` when given (returned, one row
+        per user).
+        """
+        vectors = None if values_dim is None else np.random.default_rng(0).normal(size=(n, values_dim))
+        for i in range(n):
+            self.add_user(f"user{i}@x.com", locations[i % len(locations)], seed=i)
+            if vectors is not None:
+                self.add_values(f"user{i}@x.com", vectors[i])
+        return vectors
+
+
+@pytest.fixture
+def survey_data(tmp_path, monkeypatch):
+    """
+    Isolated data folder with fresh process-wide singletons. The app resolves
+    ../data against the working directory, so the tests run from tmp/app.
+    """
+    from data_access import candidate_pool, latest_answers, pairwise_store, values_index
+    from utils import matching
+
+    (tmp_path / "app").mkdir()
+    (tmp_path / "data").mkdir()
+    monkeypatch.chdir(tmp_path / "app")
+    monkeypatch.setenv("LATEST_PERSIST_DELAY", "0")
+    monkeypatch.setattr(candidate_pool, "_POOL", None)
+    monkeypatch.setattr(latest_answers, "_TABLES", {})
+    monkeypatch.setattr(pairwise_store, "_STORE", None)
+    monkeypatch.setattr(values_index, "_INDEXES", None)
+    matching._MATCH_CACHE.clear()
+    yield SurveyData(str(tmp_path / "data"))
+    if candidate_pool._POOL is not None:
+        candidate_pool._POOL.wait_for_refresh()
+    matching._MATCH_CACHE.clear()
+    shutil.rmtree(tmp_path, ignore_errors=True)
+
+
+def session_state(username: str, location: str) -> types.SimpleNamespace:
+    """The st.session_state attributes matching reads, with permissive practical answers."""
+    from utils.bitmask import PRACTICAL_OPTIONS
+
+    return types.SimpleNamespace(
+        emailaddress=username,
+        user_requirements={
+            **{field: list(options) for field, options in PRACTICAL_OPTIONS.items()},
+            "desired_location": location,
+            "legal_structure": "Rental agreement",
+            "budget_currency": "EUR (€)",
+            "monthly_budget_rent": 1000,
+            "available_budget_purchase": 0,
+        },
+        user_personality={"extraversion": 3, "agreeableness": 4, "conscientiousness": 3, "neuroticism": 2, "openness": 4},
+    )
@@ -0,0 +1,41 @@
+
+from utils import batch_planner
+from utils.batch_planner import MB, activation_bytes, memory_headroom, plan_batches
+
+
+def _plan(monkeypatch, lengths, max_batch, headroom):
+    monkeypatch.setattr(batch_planner, "memory_headroom", lambda: headroom)
+    return list(plan_batches(lengths, max_batch))
+
+
+def test_batches_cover_every_text_once(monkeypatch):
+    lengths = sorted([5, 12, 12, 30, 64, 64, 100, 128, 200, 256])
+    batches = _plan(monkeypatch, lengths, 4, 512 * MB)
+    assert batches[0][0] == 0 and batches[-1][1] == len(lengths)
+    assert all(stop == next_start for (_, stop), (next_start, _) in zip(batches, batches[1:]))
+    assert all(0 < stop - start <= 4 for start, stop in batches)
+
+
+def test_less_memory_means_smaller_batches(monkeypatch):
+    lengths = [128] * 64
+    roomy = _plan(monkeypatch, lengths, 64, 4096 * MB)
+    tight = _plan(monkeypatch, lengths, 64, 64 * MB)
+    assert len(roomy) == 1
+    assert len(tight) > len(roomy)
+    assert all(activation_bytes(stop - start, 128) <= 64 * MB for start, stop in tight if stop - start > 1)
+
+
+def test_a_batch_holds_one_text_even_without_memory(monkeypatch):
+    assert _plan(monkeypatch, [512, 512, 512], 8, 0) == [(0, 1), (1, 2), (2, 3)]
+
+
+def test_activation_estimate_grows_with_batch_and_length():
+    assert activation_bytes(2, 128) == 2 * activation_bytes(1, 128)
+    assert activation_bytes(1, 256) > 2 * activation_bytes(1, 128)
+
+
+def test_the_configured_limit_caps_the_headroom(monkeypatch):
+    unlimited = memory_headroom()
+    monkeypatch.setenv("EMBEDDING_MEMORY_LIMIT_MB", "1")
+    # The process already uses more than 1 MB, so nothing is left
+    assert memory_headroom() == 0 <= unlimited
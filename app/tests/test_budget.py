@@ -0,0 +1,51 @@
+import numpy as np
+import pandas as pd
+
+from utils.budget import BUDGET_FIELDS, BudgetIndex, base_column
+
+
+def _columns(rent, purchase=None) -> dict[str, np.ndarray]:
+    purchase = np.zeros(len(rent)) if purchase is None else purchase
+    return {"monthly_budget_rent": np.asarray(rent, dtype=np.float64),
+            "available_budget_purchase": np.asarray(purchase, dtype=np.float64)}
+
+
+def _index(columns) -> BudgetIndex:
+    return BudgetIndex(pd.DataFrame({base_column(field): columns[field] for field in BUDGET_FIELDS}))
+
+
+def _expected(rent: np.ndarray, budget: float) -> np.ndarray:
+    """Brute force: within ±20% of the budget, or no rent budget given."""
+    return np.flatnonzero(((rent >= budget * 0.8) & (rent <= budget * 1.2)) | ~(rent > 0))
+
+
+def test_range_queries_match_a_brute_force_scan():
+    rent = np.random.default_rng(0).choice([0, np.nan, 500, 800, 900, 1000, 1100, 1300, 2000], size=300)
+    index = _index(_columns(rent))
+    for budget in (400, 900, 1000, 1800):
+        np.testing.assert_array_equal(index.query({"monthly_budget_rent": budget}), _expected(rent, budget))
+
+
+def test_user_budgets_are_converted_to_the_base_currency():
+    index = _index(_columns([880, 1000, 1500]))
+    # 10000 SEK is 880 EUR
+    assert set(index.query({"monthly_budget_rent": 10000, "budget_currency": "SEK (kr)"})) == {0, 1}
+
+
+def test_no_budget_means_no_filter():
+    index = _index(_columns([880, 1000]))
+    assert index.query({}) is None
+    assert index.query({"monthly_budget_rent": 0}) is None
+
+
+def test_appended_rows_are_found_before_and_after_the_tail_is_sorted(monkeypatch):
+    monkeypatch.setattr(BudgetIndex, "MIN_TAIL_ROWS", 4)
+    rng = np.random.default_rng(1)
+    rent = rng.choice([0, 700, 900, 1000, 1200], size=10).astype(np.float64)
+    index = _index(_columns(rent))
+    for _ in range(5):
+        # The extended index serves the longer columns; the old one is unchanged
+        rent = np.concatenate([rent, rng.choice([0, 700, 900, 1000, 1200], size=3)])
+        old, index = index, index.extended(_columns(rent))
+        np.testing.assert_array_equal(index.query({"monthly_budget_rent": 1000}), _expected(rent, 1000))
+        assert old.query({"monthly_budget_rent": 1000}).max() < len(rent) - 3
@@ -0,0 +1,94 @@
+from data_access.candidate_pool import NO_LOCATION_SHARD, CandidatePool, get_candidate_pool
+
+
+def _requirements(location):
+    from utils.bitmask import PRACTICAL_OPTIONS
+
+    return {**{field: list(options) for field, options in PRACTICAL_OPTIONS.items()}, "desired_location": location}
+
+
+def _usernames(snapshot, groups) -> set[str]:
+    return {username for key, positions in groups.items() for username in snapshot.shards[key].usernames[positions]}
+
+
+def _query(snapshot, location) -> set[str]:
+    return _usernames(snapshot, snapshot.query(_requirements(location)))
+
+
+def test_snapshot_serves_the_current_pool_while_a_refresh_runs(survey_data):
+    survey_data.add_users(10)
+    pool = get_candidate_pool()
+    first = pool.snapshot()
+    assert len(first.candidates) == 10
+
+    survey_data.add_user("new@x.com", "Sweden, Malmo", seed=10)
+    assert pool.snapshot() is first
+    pool.wait_for_refresh()
+    latest = pool.snapshot()
+    assert latest.version > first.version
+    assert "new@x.com" in set(latest.candidates["username"])
+
+
+def test_published_snapshots_never_change(survey_data):
+    survey_data.add_users(10)
+    pool = get_candidate_pool()
+    old = pool.refresh()
+    before = _query(old, "Sweden (all)")
+
+    survey_data.add_user("new@x.com", "Sweden, Malmo", seed=10)
+    survey_data.add_user("user0@x.com", "Norway, Oslo", seed=11)
+    new = pool.refresh()
+    assert _query(old, "Sweden (all)") == before
+    assert _query(old, "Norway (all)") == set()
+    assert _query(new, "Sweden (all)") == {f"user{i}@x.com" for i in range(1, 10)} | {"new@x.com"}
+    assert _query(new, "Norway (all)") == {"user0@x.com"}
+
+
+def test_refresh_appends_only_changed_users(survey_data):
+    survey_data.add_users(10)
+    survey_data.add_user("madrid@x.com", "Spain, Madrid", seed=10)
+    pool = get_candidate_pool()
+    old = pool.refresh()
+
+    survey_data.add_user("user3@x.com", "Sweden, Malmo", seed=3)
+    new = pool.refresh()
+    # The shard's indexes are shared, not copied, and only the resubmission was appended
+    assert new.shards["sweden"].practical_index is old.shards["sweden"].practical_index
+    assert (old.shards["sweden"].size, new.shards["sweden"].size) == (10, 11)
+    assert len(new) == 11
+    assert new.candidates.set_index("username").loc["user3@x.com", "desired_location"] == "Sweden, Malmo"
+    # Shards without changes keep their published view
+    assert new.shards["spain"] is old.shards["spain"]
+
+
+def test_queries_only_reach_their_country_and_the_no_location_shard(survey_data):
+    survey_data.add_user("stockholm@x.com", "Sweden, Stockholm", seed=0)
+    survey_data.add_user("oslo@x.com", "Norway, Oslo", seed=1)
+    survey_data.add_user("anywhere@x.com", "Other regions", seed=2)
+    snapshot = get_candidate_pool().refresh()
+
+    assert set(snapshot.query(_requirements("Sweden (all)"))) == {"sweden", NO_LOCATION_SHARD}
+    assert _query(snapshot, "Sweden (all)") == {"stockholm@x.com", "anywhere@x.com"}
+    assert _query(snapshot, "Other regions") == {"stockholm@x.com", "oslo@x.com", "anywhere@x.com"}
+
+
+def test_a_pool_can_load_a_single_shard(survey_data):
+    survey_data.add_user("stockholm@x.com", "Sweden, Stockholm", seed=0)
+    survey_data.add_user("oslo@x.com", "Norway, Oslo", seed=1)
+    survey_data.add_user("anywhere@x.com", "Other regions", seed=2)
+    snapshot = CandidatePool(["Norway"]).refresh()
+
+    assert set(snapshot.shards) == {"norway", NO_LOCATION_SHARD}
+    assert _query(snapshot, "Norway (all)") == {"oslo@x.com", "anywhere@x.com"}
+    assert _query(snapshot, "Sweden (all)") == {"anywhere@x.com"}
+
+
+def test_malformed_lines_do_not_shift_candidates(survey_data):
+    survey_data.add_user("stockholm1@x.com", "Sweden, Stockholm", seed=0)
+    survey_data.append_malformed("practical")
+    survey_data.add_user("oslo@x.com", "Norway, Oslo", seed=1)
+    survey_data.add_user("stockholm2@x.com", "Sweden, Stockholm", seed=2)
+    snapshot = get_candidate_pool().refresh()
+
+    assert _query(snapshot, "Norway (all)") == {"oslo@x.com"}
+    assert _query(snapshot, "Sweden, Stockholm") == {"stockholm1@x.com", "stockholm2@x.com"}
@@ -0,0 +1,53 @@
+import numpy as np
+
+from data_access.communities import load_community, save_communities
+from utils.communities import optimise_unit
+
+
+def _row(username, community_id, size):
+    return {"username": username, "community_id": community_id,
+            "size_of_community": "Small (<10 people)", "community_size": size}
+
+
+def test_communities_are_reloaded_when_the_file_is_replaced(survey_data):
+    assert load_community("a@x.com") == []
+    save_communities([_row("A@x.com", 0, 2), _row("b@x.com", 0, 2), _row("c@x.com", 1, 1)])
+    assert load_community("a@x.com") == ["a@x.com", "b@x.com"]
+    assert load_community("c@x.com") == ["c@x.com"]
+
+    save_communities([_row("a@x.com", 7, 2), _row("c@x.com", 7, 2)])
+    assert load_community("a@x.com") == ["a@x.com", "c@x.com"]
+    assert load_community("b@x.com") == []
+
+
+def _csr(n, edges):
+    """Symmetric CSR adjacency of weighted (i, j, weight) edges."""
+    rows, cols, weights = [], [], []
+    for i, j, weight in edges:
+        rows += [i, j]
+        cols += [j, i]
+        weights += [weight, weight]
+    order = np.argsort(rows, kind="stable")
+    indptr = np.zeros(n + 1, dtype=np.int64)
+    np.add.at(indptr, np.array(rows) + 1, 1)
+    return np.cumsum(indptr), np.array(cols)[order], np.array(weights, dtype=np.float64)[order]
+
+
+def test_units_split_into_their_tightly_knit_groups():
+    # Two cliques of four, joined by one weak edge
+    cliques = [[0, 1, 2, 3], [4, 5, 6, 7]]
+    edges = [(i, j, 0.9) for clique in cliques for a, i in enumerate(clique) for j in clique[a + 1:]]
+    edges.append((3, 4, 0.1))
+    group_of = optimise_unit(*_csr(8, edges), min_size=3, max_size=4)
+
+    groups = {tuple(np.flatnonzero(group_of == group)) for group in np.unique(group_of[group_of >= 0])}
+    assert groups == {tuple(clique) for clique in cliques}
+
+
+def test_groups_respect_the_size_bounds():
+    rng = np.random.default_rng(0)
+    edges = [(i, j, float(rng.uniform())) for i in range(20) for j in range(i + 1, 20) if rng.uniform() < 0.5]
+    group_of = optimise_unit(*_csr(20, edges), min_size=3, max_size=5)
+
+    sizes = np.bincount(group_of[group_of >= 0])
+    assert sizes.size and all(3 <= size <= 5 for size in sizes[sizes > 0])
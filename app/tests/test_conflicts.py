@@ -0,0 +1,38 @@
+import pandas as pd
+
+from utils.conflicts import lifestyle_conflicts, lifestyle_mask_matrix, lifestyle_mask_vector
+
+
+CANDIDATES = pd.DataFrame([
+    {"desired_animals": "['Dog']", "forbidden_animals": "", "smoking_tolerance": "", "dietary_restrictions": ""},
+    {"desired_animals": "", "forbidden_animals": "['cat']", "smoking_tolerance": "", "dietary_restrictions": ""},
+    {"desired_animals": "", "forbidden_animals": "", "smoking_tolerance": "['In shared spaces']", "dietary_restrictions": ""},
+    {"desired_animals": "", "forbidden_animals": "", "smoking_tolerance": "['Nowhere']", "dietary_restrictions": "['Vegan']"},
+    {"desired_animals": "", "forbidden_animals": "", "smoking_tolerance": "", "dietary_restrictions": "['No restrictions']"},
+    {"desired_animals": None, "forbidden_animals": None, "smoking_tolerance": None, "dietary_restrictions": None},
+])
+
+
+def _conflicting(requirements: dict) -> list[int]:
+    conflicts = lifestyle_conflicts(lifestyle_mask_vector(requirements), lifestyle_mask_matrix(CANDIDATES))
+    return [int(i) for i in conflicts.nonzero()[0]]
+
+
+def test_animals_conflict_both_ways_and_ignore_case():
+    assert _conflicting({"forbidden_animals": ["dog"]}) == [0]
+    assert _conflicting({"desired_animals": "Cat"}) == [1]
+
+
+def test_smoke_free_households_conflict_with_shared_smoking():
+    assert _conflicting({"smoking_tolerance": ["Nowhere"]}) == [2]
+    assert _conflicting({"smoking_tolerance": ["In outdoor spaces"]}) == [3]
+
+
+def test_vegan_households_conflict_with_unrestricted_diets():
+    assert _conflicting({"dietary_restrictions": ["Vegan"]}) == [4]
+    assert _conflicting({"dietary_restrictions": ["No restrictions"]}) == [3]
+
+
+def test_unanswered_questions_never_conflict():
+    assert _conflicting({}) == []
+    assert lifestyle_mask_matrix(CANDIDATES)[5].tolist() == [0, 0, 0, 0]
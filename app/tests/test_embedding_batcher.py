@@ -0,0 +1,60 @@
+import threading
+
+import pytest
+
+from utils import embedding_batcher
+from utils.embedding_batcher import EmbeddingBatcher
+
+
+@pytest.fixture
+def calls(monkeypatch):
+    """Batches passed to get_embeddings; each text embeds to [len(text)]."""
+    calls = []
+
+    def get_embeddings(texts):
+        calls.append(list(texts))
+        return [[float(len(text))] for text in texts]
+
+    monkeypatch.setattr(embedding_batcher, "get_embeddings", get_embeddings)
+    return calls
+
+
+def test_concurrent_submits_share_one_batch(calls):
+    batcher = EmbeddingBatcher(max_texts=8, max_wait_ms=500)
+    texts = ["a", "bb", "ccc", "dddd"]
+    futures = [None] * len(texts)
+    start = threading.Barrier(len(texts))
+
+    def submit(i):
+        start.wait()
+        futures[i] = batcher.submit(texts[i])
+
+    threads = [threading.Thread(target=submit, args=(i,)) for i in range(len(texts))]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert [future.result(timeout=5) for future in futures] == [[1.0], [2.0], [3.0], [4.0]]
+    assert len(calls) == 1
+    assert sorted(calls[0]) == texts
+
+
+def test_batches_hold_at_most_max_texts(calls):
+    batcher = EmbeddingBatcher(max_texts=3, max_wait_ms=500)
+    futures = [batcher.submit("x" * i) for i in range(1, 8)]
+    assert [future.result(timeout=5) for future in futures] == [[float(i)] for i in range(1, 8)]
+    assert all(len(batch) <= 3 for batch in calls)
+    assert sum(len(batch) for batch in calls) == 7
+
+
+def test_a_failed_batch_fails_every_future_in_it(monkeypatch):
+    def get_embeddings(texts):
+        raise RuntimeError("model unavailable")
+
+    monkeypatch.setattr(embedding_batcher, "get_embeddings", get_embeddings)
+    batcher = EmbeddingBatcher(max_texts=4, max_wait_ms=50)
+    futures = [batcher.submit("a"), batcher.submit("b")]
+    for future in futures:
+        with pytest.raises(RuntimeError, match="model unavailable"):
+            future.result(timeout=5)
@@ -0,0 +1,77 @@
+import sqlite3
+
+import numpy as np
+
+from data_access import embedding_cache
+from data_access.embedding_cache import EmbeddingCache, cache_key, cached_embeddings
+
+
+def _vector(i: int) -> np.ndarray:
+    return np.full(4, i, dtype=np.float32)
+
+
+def _stored_keys(cache: EmbeddingCache) -> set[str]:
+    return {key for key, in cache._connection.execute("SELECT key FROM embeddings")}
+
+
+def test_only_distinct_misses_are_encoded(tmp_path, monkeypatch):
+    monkeypatch.setenv("EMBEDDING_CACHE_PATH", str(tmp_path / "cache.sqlite"))
+    monkeypatch.setattr(embedding_cache, "_CACHE", None)
+    calls = []
+
+    def encode(texts):
+        calls.append(texts)
+        return np.stack([_vector(len(text)) for text in texts])
+
+    first = cached_embeddings(["a", "bb", " a  "], "model", encode)
+    second = cached_embeddings(["bb", "ccc"], "model", encode)
+    assert calls == [["a", "bb"], ["ccc"]]
+    np.testing.assert_array_equal(first[2], _vector(1))
+    np.testing.assert_array_equal(second[0], _vector(2))
+    # Keys include the model, so another model encodes again
+    assert cache_key("model", "a") != cache_key("other", "a")
+
+
+def test_eviction_keeps_the_recently_used_rows(tmp_path):
+    cache = EmbeddingCache(str(tmp_path / "cache.sqlite"), memory_entries=2, max_rows=10)
+    cache.put_many("model", {"hot": _vector(0)})
+    for i in range(12):
+        cache.put_many("model", {f"k{i}": _vector(i)})
+        # Served from memory, yet it still counts as a use on disk
+        assert "hot" in cache.get_many(["hot"])
+
+    keys = _stored_keys(cache)
+    assert "hot" in keys
+    assert len(keys) <= 10
+    assert {"k0", "k1"}.isdisjoint(keys)
+
+
+def test_the_row_count_is_kept_without_counting_on_every_put(tmp_path, monkeypatch):
+    cache = EmbeddingCache(str(tmp_path / "cache.sqlite"), max_rows=100)
+    cache.put_many("model", {"a": _vector(1), "b": _vector(2)})
+    cache.put_many("model", {"a": _vector(1), "c": _vector(3)})
+    assert cache._rows == len(_stored_keys(cache)) == 3
+
+    # Another process fills the table; the periodic recount notices
+    other = EmbeddingCache(cache.path, max_rows=100)
+    other.put_many("model", {f"x{i}": _vector(i) for i in range(97)})
+    monkeypatch.setattr(embedding_cache, "RECOUNT_SECONDS", 0)
+    cache.put_many("model", {"d": _vector(4)})
+    assert cache._rows == len(_stored_keys(cache)) == 90
+
+
+def test_caches_written_before_last_use_tracking_are_migrated(tmp_path):
+    path = str(tmp_path / "cache.sqlite")
+    connection = sqlite3.connect(path)
+    connection.execute(
+        "CREATE TABLE embeddings (key TEXT PRIMARY KEY, model TEXT NOT NULL, dim INTEGER NOT NULL, "
+        "vector BLOB NOT NULL, created REAL NOT NULL)"
+    )
+    connection.execute("INSERT INTO embeddings VALUES ('old', 'model', 4, ?, 1.0)", (_vector(7).tobytes(),))
+    connection.commit()
+    connection.close()
+
+    cache = EmbeddingCache(path)
+    np.testing.assert_array_equal(cache.get_many(["old"])["old"], _vector(7))
+    cache.put_many("model", {"new": _vector(8)})
+    assert _stored_keys(cache) == {"old", "new"}
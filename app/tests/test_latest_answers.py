@@ -0,0 +1,52 @@
+import os
+
+import numpy as np
+
+from data_access.latest_answers import LatestTable, SURVEY_TABLES, get_latest_table
+
+
+def test_values_snapshot_leaves_out_embeddings(survey_data):
+    survey_data.add_values("user0@x.com", np.ones(8))
+    frame = get_latest_table("values").snapshot()
+    assert "share_personal_feelings" in frame.columns
+    assert not [column for column in frame.columns if column.endswith("_embedding")]
+
+
+def test_parquet_writes_are_debounced(survey_data, monkeypatch):
+    monkeypatch.setenv("LATEST_PERSIST_DELAY", "60")
+    survey_data.add_user("user0@x.com", "Sweden, Stockholm", seed=0)
+    table = get_latest_table("practical")
+    table.refresh()
+    survey_data.add_user("user1@x.com", "Sweden, Stockholm", seed=1)
+    table.refresh()
+    assert not os.path.exists(table.parquet_path)
+
+    table.flush()
+    reloaded = LatestTable("practical", SURVEY_TABLES["practical"])
+    assert reloaded.offset == table.offset
+    assert sorted(reloaded.frame.index) == ["user0@x.com", "user1@x.com"]
+
+
+def test_streaming_lookups_never_load_the_tables(survey_data, monkeypatch):
+    from data_access import latest_answers
+    from data_access.values_index import get_values_indexes
+    from utils.streaming_matching import data_stamp
+
+    survey_data.add_user("user0@x.com", "Sweden, Stockholm", seed=0)
+    survey_data.add_values("user0@x.com", np.ones(8))
+    # A persisted snapshot, then rows appended after it
+    get_latest_table("practical").refresh()
+    survey_data.add_user("user1@x.com", "Norway, Oslo", seed=1)
+    survey_data.add_user("user0@x.com", "Spain, Barcelona", seed=0)
+
+    monkeypatch.setattr(latest_answers, "_TABLES", {})
+    monkeypatch.setenv("MATCH_STREAMING", "1")
+    latest_answers.refresh_latest("practical")
+    data_stamp()
+    assert latest_answers._TABLES == {}
+    assert all("user0@x.com" in index for index in get_values_indexes().values())
+
+    assert latest_answers.latest_row("practical", "User0@x.com")["desired_location"] == "Spain, Barcelona"
+    assert latest_answers.latest_row("practical", "user1@x.com")["desired_location"] == "Norway, Oslo"
+    assert latest_answers.latest_row("practical", "nobody@x.com") is None
+    assert "share_personal_feelings_embedding" not in latest_answers.latest_row("values", "user0@x.com")
@@ -0,0 +1,51 @@
+from utils.location_index import LocationIndex, parse_location
+
+
+LOCATIONS = [
+    "Sweden, Stockholm",   # 0
+    "Sweden (all)",        # 1
+    "Sweden, Malmo",       # 2
+    "Spain, Barcelona",    # 3
+    "Other regions",       # 4
+    "",                    # 5
+    "Spain (all)",         # 6
+]
+
+
+def _index() -> LocationIndex:
+    index = LocationIndex()
+    for location in LOCATIONS:
+        index.add({"desired_location": location})
+    return index
+
+
+def test_locations_parse_into_tree_paths():
+    assert parse_location("Sweden, Stockholm") == ("sweden", "stockholm")
+    assert parse_location(" Sweden (all) ") == ("sweden",)
+    assert parse_location("--Select a location--") == ()
+    assert parse_location(None) == ()
+
+
+def test_cities_match_their_country_wide_answers_and_no_location_rows():
+    index = _index()
+    assert list(index.query("Sweden, Stockholm")) == [0, 1, 4, 5]
+    assert list(index.query("Spain, Madrid")) == [4, 5, 6]
+
+
+def test_country_wide_answers_match_every_city_of_the_country():
+    assert list(_index().query("Sweden (all)")) == [0, 1, 2, 4, 5]
+
+
+def test_unknown_countries_only_match_rows_without_a_location():
+    assert list(_index().query("Norway, Oslo")) == [4, 5]
+
+
+def test_users_without_a_location_are_not_filtered():
+    assert _index().query("Other regions") is None
+
+
+def test_cached_results_follow_added_rows():
+    index = _index()
+    assert list(index.query("Spain (all)")) == [3, 4, 5, 6]
+    index.add({"desired_location": "Spain, Valencia"})
+    assert list(index.query("Spain (all)")) == [3, 4, 5, 6, 7]
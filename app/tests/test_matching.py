@@ -0,0 +1,12 @@
+from conftest import session_state
+from utils import matching
+
+
+def test_displayed_matches_hold_no_private_columns(survey_data):
+    survey_data.add_users(6)
+    matches = matching.find_matches(session_state("user0@x.com", "Sweden (all)"))
+    assert {"practical_row_id", "location_shard", "extraversion", "monthly_budget_rent_eur"} <= set(matches.columns)
+
+    shown = matching.display_matches(matches)
+    assert list(shown.columns) == matching.DISPLAY_COLUMNS
+    assert list(shown["email"]) == list(matches["email"])
@@ -0,0 +1,56 @@
+import numpy as np
+
+from conftest import session_state
+from data_access.candidate_pool import get_candidate_pool
+from data_access.pairwise_store import get_pairwise_store
+from utils import matching
+
+
+def _compatible_usernames(state) -> set[str]:
+    snapshot = get_candidate_pool().refresh()
+    groups = matching._compatible_positions(snapshot, state)
+    return {username for key, positions in groups.items() for username in snapshot.shards[key].usernames[positions]}
+
+
+def test_stored_matches_follow_changed_filters(survey_data):
+    survey_data.add_users(30, ["Sweden, Stockholm", "Spain, Barcelona"])
+    state = session_state("user0@x.com", "Sweden (all)")
+    matching.store_user_matches(state)
+    assert set(matching.find_matches(state)["username"]) <= _compatible_usernames(state)
+
+    # The user changes their location after storing their neighbours
+    state.user_requirements["desired_location"] = "Spain (all)"
+    matching._MATCH_CACHE.clear()
+    matches = matching.find_matches(state)
+    assert len(matches) == matching.TOP_K
+    assert set(matches["username"]) <= _compatible_usernames(state)
+
+
+def test_stored_matches_drop_neighbours_that_became_incompatible(survey_data):
+    survey_data.add_users(30, ["Sweden, Stockholm", "Spain, Barcelona"])
+    state = session_state("user0@x.com", "Sweden (all)")
+    matching.store_user_matches(state)
+    best = matching.find_matches(state)["username"].iloc[0]
+
+    # The best neighbour moves to another country
+    survey_data.add_user(best, "Norway, Oslo", seed=99)
+    get_candidate_pool().refresh()
+    matching._MATCH_CACHE.clear()
+    matches = matching.find_matches(state)
+    assert best not in set(matches["username"])
+    assert set(matches["username"]) <= _compatible_usernames(state)
+
+
+def test_rows_offered_by_other_users_are_not_served(survey_data):
+    survey_data.add_users(30, ["Sweden, Stockholm", "Spain, Barcelona"])
+    state = session_state("user4@x.com", "Sweden (all)")
+    expected = matching.find_matches(state)
+
+    # user0 stores their matches, offering their score to user4's row
+    matching.store_user_matches(session_state("user0@x.com", "Sweden (all)"))
+    assert get_pairwise_store().lookup("user4@x.com") == []
+
+    matching._MATCH_CACHE.clear()
+    matches = matching.find_matches(state)
+    assert list(matches["username"]) == list(expected["username"])
+    np.testing.assert_allclose(matches["compatibility_score"], expected["compatibility_score"])
@@ -0,0 +1,51 @@
+from conftest import session_state
+from utils import matching
+
+
+def _matches(state, k=matching.TOP_K):
+    matching._MATCH_CACHE.clear()
+    return matching.find_matches(state, k)
+
+
+def test_streaming_matches_agree_with_the_pool(survey_data, monkeypatch):
+    survey_data.add_users(20, ["Spain, Barcelona", "Sweden, Stockholm"])
+    state = session_state("user0@x.com", "Sweden (all)")
+    expected = _matches(state)
+
+    monkeypatch.setenv("MATCH_STREAMING", "1")
+    monkeypatch.setenv("MATCH_CHUNK_SIZE", "7")
+    streamed = _matches(state)
+    assert list(streamed["username"]) == list(expected["username"])
+    assert list(streamed["name"]) == list(expected["name"])
+
+
+def test_streaming_uses_the_latest_row_after_a_malformed_line(survey_data, monkeypatch):
+    monkeypatch.setenv("MATCH_STREAMING", "1")
+    monkeypatch.setenv("MATCH_CHUNK_SIZE", "3")
+    for i in range(6):
+        if i == 1:
+            survey_data.append_malformed("practical")
+            survey_data.append_malformed("personality")
+        survey_data.add_user(f"user{i}@x.com", "Norway, Oslo", seed=i)
+    # user1 moves to Sweden
+    survey_data.add_user("user1@x.com", "Sweden, Stockholm", seed=1)
+
+    norway = set(_matches(session_state("me@x.com", "Norway (all)"), k=10)["username"])
+    assert norway == {"user0@x.com", "user2@x.com", "user3@x.com", "user4@x.com", "user5@x.com"}
+    assert set(_matches(session_state("me@x.com", "Sweden (all)"))["username"]) == {"user1@x.com"}
+
+
+def test_streaming_applies_the_hard_filters(survey_data, monkeypatch):
+    survey_data.add_users(4)
+    survey_data.add_user("rich@x.com", "Sweden, Stockholm", seed=4,
+                         practical={"monthly_budget_rent": 3000, "monthly_budget_rent_eur": 3000})
+    survey_data.add_user("smoker@x.com", "Sweden, Stockholm", seed=5,
+                         lifestyle={"smoking_tolerance": "['In shared spaces']"})
+    state = session_state("user0@x.com", "Sweden (all)")
+    state.user_requirements["smoking_tolerance"] = ["Nowhere"]
+    expected = _matches(state, k=10)
+
+    monkeypatch.setenv("MATCH_STREAMING", "1")
+    monkeypatch.setenv("MATCH_CHUNK_SIZE", "2")
+    streamed = _matches(state, k=10)
+    assert set(streamed["username"]) == set(expected["username"]) == {"user1@x.com", "user2@x.com", "user3@x.com"}
@@ -0,0 +1,58 @@
+import numpy as np
+
+from conftest import session_state
+from data_access import values_index
+from data_access.candidate_pool import get_candidate_pool
+from utils import matching
+
+
+def test_indexes_are_topped_up_from_the_values_table(survey_data, monkeypatch):
+    survey_data.add_users(40, values_dim=8)
+    indexes = values_index.get_values_indexes()
+    assert all(index.size == 40 for index in indexes.values())
+
+    # A later submission that never reached the index (e.g. the process died)
+    survey_data.add_values("late@x.com", np.ones(8))
+    monkeypatch.setattr(values_index, "_INDEXES", None)
+    indexes = values_index.get_values_indexes()
+    assert all("late@x.com" in index for index in indexes.values())
+    assert all(index.size == 41 for index in indexes.values())
+
+
+def test_large_pools_are_prefiltered_by_values_neighbours(survey_data, monkeypatch):
+    survey_data.add_users(40, values_dim=8)
+    get_candidate_pool().refresh()
+    monkeypatch.setenv("VALUES_PREFILTER_THRESHOLD", "10")
+    monkeypatch.setenv("VALUES_PREFILTER_NEIGHBOURS", "6")
+
+    state = session_state("user0@x.com", "Sweden (all)")
+    neighbours = set(values_index.values_neighbours("user0@x.com", 6))
+    matches = matching.find_matches(state)
+    assert len(matches) == matching.TOP_K
+    assert set(matches["username"]) <= neighbours
+
+
+def test_adding_rows_never_trains_inline(survey_data, monkeypatch):
+    from utils.ann_index import IVFFlatIndex
+
+    monkeypatch.setattr(IVFFlatIndex, "MIN_TRAIN_SIZE", 16)
+    monkeypatch.setattr(values_index, "_train_in_background", lambda indexes: None)
+    survey_data.add_users(20, values_dim=8)
+    index = next(iter(values_index.get_values_indexes().values()))
+    index.add("new@x.com", np.ones(8))
+    assert index.centroids is None and index.needs_training
+
+    values_index.train_values_indexes()
+    assert index.centroids is not None and not index.needs_training
+    assert index.search(np.ones(8), 1)[0][0] == "new@x.com"
+
+
+def test_vectors_written_by_another_handle_are_visible(survey_data):
+    from utils.ann_index import IVFFlatIndex
+
+    writer = IVFFlatIndex("../data/shared_index")
+    reader = IVFFlatIndex("../data/shared_index")
+    writer.add("user0@x.com", np.ones(8))
+    vector = reader.vector_for("user0@x.com")
+    assert vector is not None
+    np.testing.assert_allclose(vector, np.ones(8) / np.sqrt(8), rtol=1e-6)
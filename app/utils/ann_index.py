@@ -0,0 +1,263 @@
+import json
+import os
+import threading
+
+import numpy as np
+
+from utils.file_lock import file_lock
+from utils.ranking import top_k
+
+
+class IVFFlatIndex:
+    """
+    Persistent IVF-flat approximate nearest-neighbour index (cosine similarity).
+
+    Vectors are L2-normalised and partitioned into inverted lists around k-means
+    centroids; a search only scores the rows of the `n_probe` lists closest to
+    the query. Until the index holds MIN_TRAIN_SIZE vectors it is a single flat
+    list, i.e. exact search.
+
+    add() only assigns new rows to the existing lists. Training is a separate,
+    slower step: callers run train() when needs_training says the index has
+    outgrown its centroids (data_access.values_index does it in a background
+    thread, the batch matching job before it starts).
+
+    Recall@10 against exact search, measured on 30k synthetic 64-d vectors
+    (173 lists), depends on how clustered the data is: 0.96 / 0.55 / 0.39
+    at n_probe=8 for tight / moderate / no clusters, and 0.99 / 0.80 / 0.68
+    at the default n_probe=32, which scores about a fifth of the rows.
+
+    On disk (one directory per index) the data is append-only:
+      - vectors.f32   raw float32 rows, memory-mapped for reading
+      - ids.txt       one id per row; a re-added id supersedes its older rows
+      - centroids.npy rewritten on (re)training
+      - meta.json     vector dimension
+    Other processes appending to the same directory are picked up by refresh().
+    """
+
+    MIN_TRAIN_SIZE = 256
+    KMEANS_ITERATIONS = 10
+    KMEANS_SAMPLE_PER_LIST = 64
+
+    DEFAULT_N_PROBE = 32
+
+    def __init__(self, directory: str, n_probe: int = DEFAULT_N_PROBE):
+        self.directory = directory
+        self.n_probe = n_probe
+        self.dim = None
+        self.ids = []
+        self._row_of = {}
+        self._live = np.zeros(0, dtype=bool)
+        self._ids_offset = 0
+        self._vectors = None
+        self.centroids = None
+        self._centroids_mtime = None
+        self._lists = []
+        self._refresh_lock = threading.RLock()
+        os.makedirs(directory, exist_ok=True)
+        self.refresh()
+
+    # -----------------------------
+    # Paths
+    # -----------------------------
+
+    def _path(self, name: str) -> str:
+        return os.path.join(self.directory, name)
+
+    @property
+    def _lock_path(self) -> str:
+        return self._path(".lock")
+
+    # -----------------------------
+    # Loading
+    # -----------------------------
+
+    @property
+    def size(self) -> int:
+        """Number of distinct ids in the index."""
+        return len(self._row_of)
+
+    def __contains__(self, row_id: str) -> bool:
+        return row_id in self._row_of
+
+    def vectors(self) -> np.ndarray:
+        """Memory-mapped (n_rows, dim) matrix of every stored row."""
+        n_rows = len(self.ids)
+        if self._vectors is None or len(self._vectors) != n_rows:
+            if n_rows == 0:
+                self._vectors = np.zeros((0, self.dim or 0), dtype=np.float32)
+            else:
+                self._vectors = np.memmap(
+                    self._path("vectors.f32"), dtype=np.float32, mode="r", shape=(n_rows, self.dim)
+                )
+        return self._vectors
+
+    def refresh(self) -> None:
+        """Pick up rows and centroids written since the last refresh."""
+        with self._refresh_lock:
+            self._refresh()
+
+    def _refresh(self) -> None:
+        if self.dim is None and os.path.exists(self._path("meta.json")):
+            with open(self._path("meta.json"), "r", encoding="utf-8") as file:
+                self.dim = int(json.load(file)["dim"])
+
+        ids_path = self._path("ids.txt")
+        if os.path.exists(ids_path) and os.path.getsize(ids_path) > self._ids_offset:
+            with open(ids_path, "rb") as file:
+                file.seek(self._ids_offset)
+                data = file.read()
+            complete = data[: data.rfind(b"\n") + 1]
+            self._ids_offset += len(complete)
+            new_ids = complete.decode("utf-8").splitlines()
+
+            first_row = len(self.ids)
+            self.ids.extend(new_ids)
+            self._live = np.concatenate([self._live, np.ones(len(new_ids), dtype=bool)])
+            for row, row_id in enumerate(new_ids, start=first_row):
+                previous = self._row_of.get(row_id)
+                if previous is not None:
+                    self._live[previous] = False
+                self._row_of[row_id] = row
+            self._assign(np.arange(first_row, len(self.ids)))
+
+        centroids_path = self._path("centroids.npy")
+        if os.path.exists(centroids_path):
+            mtime = os.path.getmtime(centroids_path)
+            if mtime != self._centroids_mtime:
+                self.centroids = np.load(centroids_path)
+                self._centroids_mtime = mtime
+                self._lists = [[] for _ in range(len(self.centroids))]
+                self._assign(np.arange(len(self.ids)))
+
+    def _assign(self, rows: np.ndarray) -> None:
+        if len(rows) == 0:
+            return
+        if self.centroids is None:
+            if not self._lists:
+                self._lists = [[]]
+            self._lists[0].extend(rows.tolist())
+            return
+
+        nearest = np.argmax(self.vectors()[rows] @ self.centroids.T, axis=1)
+        for row, list_id in zip(rows.tolist(), nearest.tolist()):
+            self._lists[list_id].append(row)
+
+    # -----------------------------
+    # Writing
+    # -----------------------------
+
+    def add(self, row_id: str, vector) -> None:
+        """Insert (or replace) the vector stored for `row_id`."""
+        vector = np.asarray(vector, dtype=np.float32).reshape(-1)
+        norm = np.linalg.norm(vector)
+        if norm == 0:
+            return
+        vector = vector / norm
+
+        with file_lock(self._lock_path):
+            self.refresh()
+            if self.dim is None:
+                self.dim = len(vector)
+                with open(self._path("meta.json"), "w", encoding="utf-8") as file:
+                    json.dump({"dim": self.dim}, file)
+            if len(vector) != self.dim:
+                raise ValueError(f"Expected a vector of dimension {self.dim}, got {len(vector)}")
+
+            # Vector first, id second: readers only trust rows whose id is written.
+            with open(self._path("vectors.f32"), "ab") as file:
+                file.write(vector.tobytes())
+            with open(self._path("ids.txt"), "ab") as file:
+                file.write(f"{row_id}\n".encode("utf-8"))
+            self.refresh()
+
+    @property
+    def needs_training(self) -> bool:
+        """True once the index is large enough to train, or has doubled since it was trained."""
+        # Training picks ~sqrt(n) lists, so lists**2 is the size it was trained at
+        trained_size = 0 if self.centroids is None else len(self.centroids) ** 2
+        return self.size >= self.MIN_TRAIN_SIZE and self.size >= 2 * trained_size
+
+    def train(self, seed: int = 0) -> None:
+        """
+        Spherical k-means over the live rows with about sqrt(n) lists. The
+        clustering runs without the file lock, so add() is never blocked by
+        it; only publishing the centroids is locked.
+        """
+        self.refresh()
+        live_rows = np.flatnonzero(self._live)
+        if len(live_rows) == 0:
+            return
+        n_lists = max(1, int(np.sqrt(len(live_rows))))
+        rng = np.random.default_rng(seed)
+
+        sample_size = min(len(live_rows), n_lists * self.KMEANS_SAMPLE_PER_LIST)
+        sample = np.asarray(self.vectors()[np.sort(rng.choice(live_rows, sample_size, replace=False))])
+        centroids = sample[rng.choice(len(sample), n_lists, replace=False)].copy()
+
+        for _ in range(self.KMEANS_ITERATIONS):
+            labels = np.argmax(sample @ centroids.T, axis=1)
+            for list_id in range(n_lists):
+                members = sample[labels == list_id]
+                if len(members) == 0:
+                    centroids[list_id] = sample[rng.integers(len(sample))]
+                    continue
+                mean = members.mean(axis=0)
+                centroids[list_id] = mean / max(np.linalg.norm(mean), 1e-12)
+
+        # Write next to the final path and rename, so readers never load partial centroids
+        tmp_path = f"{self._path('centroids.npy')}.{os.getpid()}.{threading.get_ident()}.tmp"
+        with file_lock(self._lock_path):
+            with open(tmp_path, "wb") as file:
+                np.save(file, centroids.astype(np.float32))
+            os.replace(tmp_path, self._path("centroids.npy"))
+            self.refresh()
+
+    # -----------------------------
+    # Querying
+    # -----------------------------
+
+    def vector_for(self, row_id: str) -> np.ndarray | None:
+        """The stored vector of `row_id`, including rows other processes appended."""
+        self.refresh()
+        row = self._row_of.get(row_id)
+        if row is None:
+            return None
+        return np.asarray(self.vectors()[row])
+
+    def vectors_for(self, row_ids: list[str]) -> tuple[np.ndarray, np.ndarray]:
+        """
+        Stacked vectors for many ids in one gather, plus a boolean mask of which
+        ids are present (missing ids get a zero row).
+        """
+        self.refresh()
+        rows = np.array([self._row_of.get(row_id, -1) for row_id in row_ids], dtype=np.int64)
+        present = rows >= 0
+        matrix = np.zeros((len(rows), self.dim or 0), dtype=np.float32)
+        if present.any():
+            matrix[present] = self.vectors()[rows[present]]
+        return matrix, present
+
+    def search(self, query, k: int) -> list[tuple[str, float]]:
+        """The k stored ids most similar to `query`, best first."""
+        self.refresh()
+        if self.size == 0:
+            return []
+
+        query = np.asarray(query, dtype=np.float32).reshape(-1)
+        query = query / max(np.linalg.norm(query), 1e-12)
+
+        if self.centroids is None:
+            probed = [0]
+        else:
+            probed = top_k(self.centroids @ query, self.n_probe).tolist()
+        rows = np.fromiter(
+            (row for list_id in probed for row in self._lists[list_id]), dtype=np.int64
+        )
+        rows = np.sort(rows[self._live[rows]])
+        if len(rows) == 0:
+            return []
+
+        scores = np.asarray(self.vectors()[rows] @ query)
+        best = top_k(scores, k)
+        return [(self.ids[rows[i]], float(scores[i])) for i in best]
@@ -0,0 +1,104 @@
+"""
+Compute the matches of every registered user in one offline run, e.g. to
+send the update emails promised in step 6 without scoring in the web request.
+
+Run from the app folder:
+
+    python -m utils.batch_matching [--run-id ID] [--workers N] [--shard-size S] [--restart]
+
+Results go to data/batch_matches/<run-id>.csv and the Postgres `matches`
+table (when configured). Each finished shard is checkpointed, so running the
+same run id again resumes where an interrupted run stopped.
+"""
+
+import argparse
+import datetime
+import os
+import types
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+from data_access.batch_matches import clear_run, load_checkpoint, save_batch
+from data_access.candidate_pool import get_candidate_pool
+from data_access.latest_answers import flush_latest
+from data_access.resume import profile_from_row
+from data_access.values_index import train_values_indexes
+from utils.matching import SIGNAL_COLUMNS, TOP_K, find_matches
+
+
+DEFAULT_SHARD_SIZE = 256
+
+
+def _user_state(row: dict) -> types.SimpleNamespace:
+    """The session state find_matches expects, rebuilt from a pool row."""
+    profile = profile_from_row(row)
+    return types.SimpleNamespace(
+        emailaddress=row["username"],
+        user_requirements=profile["requirements"],
+        user_personality=profile["personality"],
+    )
+
+
+def match_shard(run_id: str, usernames: list[str], k: int) -> tuple[list[str], list[dict]]:
+    """Top-k matches of each user in the shard (runs in a worker process)."""
+    snapshot = get_candidate_pool().snapshot()
+    user_rows = [
+        snapshot.shards[key].row(position)
+        for key, positions in snapshot.positions_of(usernames).items() for position in positions
+    ]
+    rows = []
+    for user_row in user_rows:
+        matches = find_matches(_user_state(user_row), k)
+        for rank, match in enumerate(matches.to_dict("records"), start=1):
+            rows.append({
+                "run_id": run_id,
+                "username": user_row["username"],
+                "rank": rank,
+                "match_username": match["username"],
+                "match_name": match.get("name", ""),
+                **{column: round(float(match[column]), 4) for column in SIGNAL_COLUMNS.values()},
+            })
+    return usernames, rows
+
+
+def run(run_id: str, workers: int | None = None, shard_size: int = DEFAULT_SHARD_SIZE,
+        k: int = TOP_K, restart: bool = False) -> int:
+    """Match every user not yet checkpointed in `run_id`; returns the number matched."""
+    if restart:
+        clear_run(run_id)
+    done = load_checkpoint(run_id)
+
+    # Trained and built before the workers start, so forked workers inherit
+    # the loaded pool and the web process never trains on a request
+    train_values_indexes()
+    snapshot = get_candidate_pool().snapshot()
+    pending = [username for username in snapshot.candidates["username"] if username not in done]
+    shards = [pending[i:i + shard_size] for i in range(0, len(pending), shard_size)]
+
+    matched = 0
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        futures = [executor.submit(match_shard, run_id, shard, k) for shard in shards]
+        for future in as_completed(futures):
+            usernames, rows = future.result()
+            save_batch(run_id, usernames, rows)
+            matched += len(usernames)
+            print(f"{len(done) + matched}/{len(done) + len(pending)} users matched")
+    return matched
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Compute the matches of every registered user.")
+    parser.add_argument("--run-id", default=datetime.datetime.utcnow().strftime("%Y-%m-%d"),
+                        help="results and checkpoint name; reuse it to resume (default: today's date)")
+    parser.add_argument("--workers", type=int, default=os.cpu_count(), help="worker processes")
+    parser.add_argument("--shard-size", type=int, default=DEFAULT_SHARD_SIZE, help="users per task")
+    parser.add_argument("--k", type=int, default=TOP_K, help="matches per user")
+    parser.add_argument("--restart", action="store_true", help="discard earlier results of this run id")
+    args = parser.parse_args()
+
+    matched = run(args.run_id, args.workers, args.shard_size, args.k, args.restart)
+    flush_latest()
+    print(f"Run {args.run_id}: matched {matched} users")
+
+
+if __name__ == "__main__":
+    main()
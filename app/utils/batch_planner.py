@@ -0,0 +1,111 @@
+"""
+Memory-aware batch sizes for the embedding model. Before each forward pass
+the planner measures how much memory is free, estimates what the next
+batch's activations would need from its size and padded length, and picks
+the largest batch that fits (never more than the configured maximum, never
+fewer than one text). Large inputs run in few passes when memory allows,
+and a 512 MB instance falls back to small batches instead of running out
+of memory.
+"""
+
+import os
+
+import psutil
+
+
+# -----------------------------
+# Configuration
+# -----------------------------
+
+# Share of the free memory one batch's activations may use
+SAFETY_FRACTION = 0.5
+
+# Multiplier on the estimate for temporaries and allocator overhead
+ACTIVATION_OVERHEAD = 2.0
+
+# BERT-base sizes, used when the model does not report its own
+DEFAULT_DIMS = (768, 12, 3072)
+
+FLOAT_BYTES = 4
+MB = 1024 * 1024
+
+_CGROUP_LIMIT = "/sys/fs/cgroup/memory.max"
+_CGROUP_USAGE = "/sys/fs/cgroup/memory.current"
+
+# -----------------------------
+# Internal helpers
+# -----------------------------
+
+def _cgroup_headroom() -> int | None:
+    """Bytes left under the container's memory limit (cgroup v2), or None when unlimited."""
+    try:
+        with open(_CGROUP_LIMIT) as file:
+            limit = file.read().strip()
+        if limit == "max":
+            return None
+        with open(_CGROUP_USAGE) as file:
+            usage = int(file.read().strip())
+    except (OSError, ValueError):
+        return None
+    return int(limit) - usage
+
+
+def memory_headroom() -> int:
+    """
+    Bytes the next batch may use. This is the free memory, reduced to the
+    tightest of the system, the container limit and EMBEDDING_MEMORY_LIMIT_MB
+    (the process's own RSS counts against the last), then scaled by
+    SAFETY_FRACTION.
+    """
+    free = psutil.virtual_memory().available
+    container = _cgroup_headroom()
+    if container is not None:
+        free = min(free, container)
+    limit_mb = os.getenv("EMBEDDING_MEMORY_LIMIT_MB")
+    if limit_mb:
+        free = min(free, int(float(limit_mb) * MB) - psutil.Process().memory_info().rss)
+    return max(0, int(free * SAFETY_FRACTION))
+
+
+def model_dims(model) -> tuple[int, int, int]:
+    """(hidden size, attention heads, feed-forward size) of a transformers model."""
+    config = getattr(model, "config", None)
+    hidden, heads, intermediate = DEFAULT_DIMS
+    return (
+        getattr(config, "hidden_size", hidden),
+        getattr(config, "num_attention_heads", heads),
+        getattr(config, "intermediate_size", intermediate),
+    )
+
+
+def activation_bytes(batch: int, sequence: int, dims: tuple[int, int, int] = DEFAULT_DIMS) -> int:
+    """
+    Estimated peak activation memory of one inference pass (no gradients). A
+    layer's inputs and outputs, query/key/value, the feed-forward expansion
+    and the attention scores and probabilities are alive at the same time.
+    """
+    hidden, heads, intermediate = dims
+    per_token = (6 * hidden + intermediate + 2 * heads * sequence) * FLOAT_BYTES
+    return int(batch * sequence * per_token * ACTIVATION_OVERHEAD)
+
+# -----------------------------
+# Public API
+# -----------------------------
+
+def plan_batches(lengths: list[int], max_batch: int, dims: tuple[int, int, int] = DEFAULT_DIMS):
+    """
+    Yield (start, stop) slices over `lengths`, which must be token counts
+    sorted ascending. Each batch is sized against the memory free when it is
+    planned, so the caller should release the previous batch before asking
+    for the next one.
+    """
+    start = 0
+    while start < len(lengths):
+        budget = memory_headroom()
+        stop = start + 1
+        # Lengths are ascending, so the next text sets the padded length
+        while (stop < len(lengths) and stop - start < max_batch
+               and activation_bytes(stop + 1 - start, lengths[stop], dims) <= budget):
+            stop += 1
+        yield start, stop
+        start = stop
@@ -0,0 +1,110 @@
+import numpy as np
+import pandas as pd
+
+
+# Options offered by the multiselects in step_2_practical. The bit position of
+# each option is its index in the list, so the order must never be reshuffled
+# (append new options at the end).
+PRACTICAL_OPTIONS = {
+    "physical_environment": [
+        "Urban / city-centre",
+        "Suburban",
+        "Rural / nature-based",
+    ],
+    "size_of_community": [
+        "Small (<10 people)",
+        "Medium (10–40)",
+        "Large (40–100)",
+    ],
+    "regime_of_sharing": [
+        "Gardens and outdoor spaces",
+        "Workshops and hobby rooms",
+        "Guest rooms",
+        "Garage and parking",
+        "Kitchen and dining areas",
+        "Laundry facilities",
+        "Living rooms and lounges",
+        "Minimal/no shared spaces",
+    ],
+    "private_dwelling": [
+        "Full kitchen",
+        "Kitchenette",
+        "Private outdoor space",
+        "Full bathroom",
+        "Guest room",
+        "Other",
+    ],
+}
+
+ANIMAL_OPTIONS = ["dog", "cat", "rabbit", "hamster", "bird", "fish", "horse", "donkey", "cow"]
+
+# Options of the step_3_lifestyle multiselects used by the conflict checks,
+# under the same append-only ordering rule
+LIFESTYLE_OPTIONS = {
+    "desired_animals": ANIMAL_OPTIONS,
+    "forbidden_animals": ANIMAL_OPTIONS,
+    "smoking_tolerance": [
+        "Nowhere",
+        "In private spaces",
+        "In outdoor spaces",
+        "In shared spaces",
+    ],
+    "dietary_restrictions": [
+        "Vegan",
+        "Vegetarian",
+        "No restrictions",
+    ],
+}
+
+
+def mask_column(field: str) -> str:
+    return f"{field}_mask"
+
+
+def encode_multiselect(values: pd.Series, options: list[str]) -> np.ndarray:
+    """
+    Encode a multiselect column (stored as a list repr or plain string) into
+    one integer bitmask per row. Bit i is set when options[i] appears in the cell.
+    """
+    text = values.fillna("").astype(str)
+    mask = np.zeros(len(text), dtype=np.int64)
+    for bit, option in enumerate(options):
+        mask |= text.str.contains(option, regex=False).to_numpy(dtype=np.int64) << bit
+    return mask
+
+
+def encode_selection(selected, options: list[str]) -> int:
+    """Encode a user's selection (list or single string) into a bitmask."""
+    if selected is None:
+        return 0
+    if isinstance(selected, str):
+        selected = [selected]
+
+    mask = 0
+    for bit, option in enumerate(options):
+        if any(option in str(value) for value in selected):
+            mask |= 1 << bit
+    return mask
+
+
+def encode_practical_masks(df: pd.DataFrame) -> pd.DataFrame:
+    """Add one `<field>_mask` integer column per practical multiselect field."""
+    df = df.copy()
+    for field, options in PRACTICAL_OPTIONS.items():
+        if field in df.columns:
+            df[mask_column(field)] = encode_multiselect(df[field], options)
+        else:
+            df[mask_column(field)] = np.zeros(len(df), dtype=np.int64)
+    return df
+
+
+def practical_filter(df: pd.DataFrame, requirements: dict) -> np.ndarray:
+    """
+    Boolean keep-mask over an encoded frame: a candidate passes when, for every
+    practical field, it shares at least one option with the user's selection.
+    """
+    keep = np.ones(len(df), dtype=bool)
+    for field, options in PRACTICAL_OPTIONS.items():
+        wanted = encode_selection(requirements.get(field), options)
+        keep &= (df[mask_column(field)].to_numpy() & wanted) != 0
+    return keep
@@ -0,0 +1,146 @@
+import json
+import os
+
+import numpy as np
+import pandas as pd
+
+
+# Every budget is also stored in this currency so budgets can be compared
+BASE_CURRENCY = "EUR (€)"
+
+# Units of the base currency per unit of each currency offered in step 2.
+# Override with the CURRENCY_RATES environment variable (JSON, e.g. '{"DKK (kr)": 0.134}').
+CURRENCY_RATES = {
+    "EUR (€)": 1.0,
+    "DKK (kr)": 0.134,
+    "SEK (kr)": 0.088,
+}
+
+BUDGET_FIELDS = ["monthly_budget_rent", "available_budget_purchase"]
+
+# Candidates are budget-compatible when their budget is within ±20% of the user's
+BUDGET_TOLERANCE = 0.2
+
+
+def base_column(field: str) -> str:
+    return f"{field}_eur"
+
+
+def load_rates() -> dict[str, float]:
+    rates = dict(CURRENCY_RATES)
+    env_rates = os.getenv("CURRENCY_RATES")
+    if env_rates:
+        rates.update(json.loads(env_rates))
+    return rates
+
+
+def to_base_currency(amount, currency) -> float:
+    """`amount` in the base currency; NaN when the amount or currency is unknown."""
+    try:
+        amount = float(amount)
+    except (TypeError, ValueError):
+        return float("nan")
+    rate = load_rates().get(currency)
+    return float("nan") if rate is None else amount * rate
+
+
+def normalize_budgets(row: dict) -> dict[str, float]:
+    """Base-currency columns for a practical answers row, stored alongside it."""
+    currency = row.get("budget_currency", BASE_CURRENCY)
+    return {base_column(field): round(to_base_currency(row.get(field, 0), currency), 2) for field in BUDGET_FIELDS}
+
+
+def base_budgets(df: pd.DataFrame) -> pd.DataFrame:
+    """
+    Base-currency budget of every row. Uses the values stored at write time and
+    converts on the fly for rows saved before they existed.
+    """
+    rates = load_rates()
+    currency = df["budget_currency"] if "budget_currency" in df.columns else pd.Series(BASE_CURRENCY, index=df.index)
+    rate = currency.map(rates).astype(float)
+
+    budgets = {}
+    for field in BUDGET_FIELDS:
+        converted = pd.to_numeric(df.get(field), errors="coerce") * rate if field in df.columns else np.nan
+        stored = pd.to_numeric(df[base_column(field)], errors="coerce") if base_column(field) in df.columns else np.nan
+        budgets[base_column(field)] = pd.Series(stored, index=df.index).fillna(pd.Series(converted, index=df.index))
+    return pd.DataFrame(budgets, index=df.index)
+
+
+class BudgetIndex:
+    """
+    Sorted arrays of the candidates' base-currency budgets, one per budget
+    field. A range query is two binary searches plus the k matching positions.
+
+    Rows appended to the budget columns later (see extended) are kept in an
+    unsorted tail that every query scans, until the tail outgrows an eighth of
+    the sorted rows and the columns are sorted again.
+    """
+
+    # The tail is merged once it holds more rows than this and an eighth of the sorted rows
+    MIN_TAIL_ROWS = 1024
+
+    def __init__(self, budgets: pd.DataFrame):
+        self._sort({field: budgets[base_column(field)].to_numpy(dtype=np.float64) for field in BUDGET_FIELDS})
+
+    def _sort(self, columns: dict[str, np.ndarray]) -> None:
+        self._columns = columns
+        self._n_sorted = len(columns[BUDGET_FIELDS[0]])
+        self._sorted = {}
+        self._unknown = {}
+        for field, values in columns.items():
+            known = np.flatnonzero(values > 0)
+            order = known[np.argsort(values[known], kind="stable")]
+            self._sorted[field] = (values[order], order)
+            self._unknown[field] = np.flatnonzero(~(values > 0))
+
+    def extended(self, columns: dict[str, np.ndarray]) -> "BudgetIndex":
+        """
+        An index over `columns` (base-currency budgets by field), which hold
+        this index's rows followed by appended ones. This index is left as is.
+        """
+        index = BudgetIndex.__new__(BudgetIndex)
+        n_tail = len(columns[BUDGET_FIELDS[0]]) - self._n_sorted
+        if n_tail > max(self.MIN_TAIL_ROWS, self._n_sorted // 8):
+            index._sort(columns)
+        else:
+            index._columns = columns
+            index._n_sorted = self._n_sorted
+            index._sorted = self._sorted
+            index._unknown = self._unknown
+        return index
+
+    def _tail(self, field: str) -> np.ndarray:
+        return self._columns[field][self._n_sorted:]
+
+    def range(self, field: str, low: float, high: float) -> np.ndarray:
+        """Sorted positions of candidates whose `field` budget lies in [low, high]."""
+        values, positions = self._sorted[field]
+        start = np.searchsorted(values, low, side="left")
+        end = np.searchsorted(values, high, side="right")
+        tail = self._tail(field)
+        in_tail = np.flatnonzero((tail >= low) & (tail <= high)) + self._n_sorted
+        return np.concatenate([np.sort(positions[start:end]), in_tail])
+
+    def unknown(self, field: str) -> np.ndarray:
+        """Sorted positions of candidates who gave no `field` budget."""
+        return np.concatenate([self._unknown[field], np.flatnonzero(~(self._tail(field) > 0)) + self._n_sorted])
+
+    def query(self, requirements: dict, tolerance: float = BUDGET_TOLERANCE) -> np.ndarray | None:
+        """
+        Sorted positions of budget-compatible candidates for the user's
+        requirements, or None when the user gave no budget. Candidates who gave
+        no budget of the same kind are kept.
+        """
+        currency = requirements.get("budget_currency", BASE_CURRENCY)
+        result = None
+        for field in BUDGET_FIELDS:
+            budget = to_base_currency(requirements.get(field), currency)
+            if not budget > 0:
+                continue
+            matched = np.union1d(
+                self.range(field, budget * (1 - tolerance), budget * (1 + tolerance)),
+                self.unknown(field),
+            )
+            result = matched if result is None else np.intersect1d(result, matched, assume_unique=True)
+        return result
@@ -0,0 +1,229 @@
+import numpy as np
+import pandas as pd
+
+from utils.bitmask import PRACTICAL_OPTIONS
+from utils.budget import BUDGET_FIELDS, BudgetIndex, base_column
+from utils.conflicts import LIFESTYLE_MASK_FIELDS, lifestyle_conflicts, lifestyle_mask_matrix, lifestyle_mask_vector
+from utils.inverted_index import InvertedIndex
+from utils.location_index import LocationIndex
+from utils.ranking import PERSONALITY_TRAITS
+from utils.scoring import LIFESTYLE_SCALES, CandidateFeatures
+
+
+# removed_at of a row that is still live
+_LIVE = np.iinfo(np.int64).max
+
+
+class AppendArray:
+    """
+    Numpy array grown by doubling its capacity. Views of the first rows stay
+    valid and unchanged while rows are appended: a reallocation copies into a
+    new buffer and leaves the old one to the views still holding it.
+    """
+
+    def __init__(self, dtype, shape: tuple = ()):
+        self._data = np.zeros((16, *shape), dtype=dtype)
+        self.size = 0
+
+    @property
+    def shape(self) -> tuple:
+        return (self.size, *self._data.shape[1:])
+
+    def extend(self, rows) -> None:
+        rows = np.asarray(rows, dtype=self._data.dtype)
+        end = self.size + len(rows)
+        if end > len(self._data):
+            grown = np.zeros((max(end, 2 * len(self._data)), *self._data.shape[1:]), dtype=self._data.dtype)
+            grown[:self.size] = self._data[:self.size]
+            self._data = grown
+        self._data[self.size:end] = rows
+        self.size = end
+
+    def __setitem__(self, row: int, value) -> None:
+        self._data[row] = value
+
+    def view(self) -> np.ndarray:
+        return self._data[:self.size]
+
+
+class CandidateStore:
+    """
+    Append-only candidate rows with their feature matrices and hard-filter
+    indexes, owned by a single writer.
+
+    A resubmission never rewrites a row: the old row is tombstoned with the
+    version that removed it and the new one is appended. view(version) then
+    publishes the first n rows without copying anything, since appended rows
+    lie beyond n and a tombstone only hides a row from later versions.
+    """
+
+    def __init__(self):
+        self.rows = []
+        self.columns = []
+        # Rows of each username, oldest first (at most one of them is live)
+        self._rows_of = {}
+        self._usernames = AppendArray(object)
+        self._masks = AppendArray(np.uint16, (len(PRACTICAL_OPTIONS),))
+        self._lifestyle = AppendArray(np.float32, (len(LIFESTYLE_SCALES),))
+        self._lifestyle_known = AppendArray(bool, (len(LIFESTYLE_SCALES),))
+        self._traits = AppendArray(np.float32, (len(PERSONALITY_TRAITS),))
+        self._values = []
+        self._conflict_masks = AppendArray(np.uint16, (len(LIFESTYLE_MASK_FIELDS),))
+        self._budgets = {field: AppendArray(np.float64) for field in BUDGET_FIELDS}
+        self._removed_at = AppendArray(np.int64)
+        self._budget_index = None
+        self.n_live = 0
+        self.location_index = LocationIndex()
+        self.practical_index = InvertedIndex(PRACTICAL_OPTIONS)
+
+    def __len__(self) -> int:
+        return len(self.rows)
+
+    def _extend_values(self, values: list[tuple[np.ndarray, np.ndarray]]) -> None:
+        if not self._values:
+            self._values = [(AppendArray(np.float32, matrix.shape[1:]), AppendArray(bool)) for matrix, _ in values]
+        for i, (matrix, present) in enumerate(values):
+            buffer, flags = self._values[i]
+            # An empty index has no dimension yet: its vectors are 0 wide until
+            # the first one is added
+            if buffer.shape[1] == 0 and matrix.shape[1] > 0:
+                buffer = AppendArray(np.float32, matrix.shape[1:])
+                buffer.extend(np.zeros((flags.size, matrix.shape[1]), dtype=np.float32))
+                self._values[i] = (buffer, flags)
+            elif matrix.shape[1] == 0:
+                matrix = np.zeros((len(matrix), buffer.shape[1]), dtype=np.float32)
+            buffer.extend(matrix)
+            flags.extend(present)
+
+    def append(self, candidates: pd.DataFrame, values: list[tuple[np.ndarray, np.ndarray]]) -> None:
+        """
+        Append candidate rows (budgets in base currency, practical masks
+        encoded) with each values question's (vectors, present) pair for them.
+        """
+        if candidates.empty:
+            return
+        candidates = candidates.reset_index(drop=True)
+        features = CandidateFeatures(candidates, values)
+        first_row = len(self.rows)
+        records = candidates.to_dict("records")
+        self.rows.extend(records)
+        self.columns.extend([column for column in candidates.columns if column not in self.columns])
+        self._masks.extend(features.masks)
+        self._lifestyle.extend(features.lifestyle)
+        self._lifestyle_known.extend(features.lifestyle_known)
+        self._traits.extend(features.traits)
+        self._extend_values(features.values)
+        self._conflict_masks.extend(lifestyle_mask_matrix(candidates))
+        for field in BUDGET_FIELDS:
+            self._budgets[field].extend(candidates[base_column(field)].to_numpy(dtype=np.float64))
+        self._removed_at.extend(np.full(len(records), _LIVE, dtype=np.int64))
+        self._usernames.extend(np.array(candidates["username"].tolist(), dtype=object))
+
+        # The views of older versions bound every index result by their row count
+        for row, record in enumerate(records, start=first_row):
+            self._rows_of.setdefault(record["username"], []).append(row)
+            self.practical_index.add(record)
+            self.location_index.add(record)
+        self.n_live += len(records)
+
+    def remove(self, username: str, version: int) -> None:
+        """Tombstone the user's live row (if any) from `version` on."""
+        for row in self._rows_of.get(username, ()):
+            if self._removed_at.view()[row] == _LIVE:
+                self._removed_at[row] = version
+                self.n_live -= 1
+
+    def view(self, version: int) -> "StoreView":
+        """The rows live at `version`, as an immutable view."""
+        budgets = {field: self._budgets[field].view() for field in BUDGET_FIELDS}
+        if self._budget_index is None:
+            self._budget_index = BudgetIndex(pd.DataFrame({base_column(field): values for field, values in budgets.items()}))
+        else:
+            self._budget_index = self._budget_index.extended(budgets)
+        return StoreView(self, version)
+
+
+class StoreView:
+    """
+    The rows of a CandidateStore live at one version. Readers keep using the
+    view they obtained while the store's writer appends and tombstones rows.
+    """
+
+    def __init__(self, store: CandidateStore, version: int):
+        self.version = version
+        self.size = len(store)
+        self.n_live = store.n_live
+        self.columns = list(store.columns)
+        self._rows = store.rows
+        self._rows_of = store._rows_of
+        self.usernames = store._usernames.view()
+        self._removed_at = store._removed_at.view()
+        self.location_index = store.location_index
+        self.practical_index = store.practical_index
+        self.budget_index = store._budget_index
+
+        self._conflict_masks = store._conflict_masks.view()
+        self.features = CandidateFeatures.__new__(CandidateFeatures)
+        self.features.masks = store._masks.view()
+        self.features.lifestyle = store._lifestyle.view()
+        self.features.lifestyle_known = store._lifestyle_known.view()
+        self.features.traits = store._traits.view()
+        self.features.values = [(matrix.view(), present.view()) for matrix, present in store._values]
+        self._candidates = None
+
+    def __len__(self) -> int:
+        return self.n_live
+
+    def _bounded(self, row_ids: np.ndarray) -> np.ndarray:
+        """Sorted row ids of the shared indexes cut to this view's rows."""
+        return row_ids[:np.searchsorted(row_ids, self.size)]
+
+    def live(self, positions: np.ndarray) -> np.ndarray:
+        """The positions whose row is live in this view."""
+        return positions[self._removed_at[positions] > self.version]
+
+    def query(self, requirements: dict) -> np.ndarray:
+        """
+        Sorted positions that pass the location, practical, budget and
+        lifestyle conflict hard filters.
+        """
+        # Location is the most selective filter, so it runs first and the
+        # practical query only intersects within its result
+        row_ids = self.location_index.query(requirements.get("desired_location"))
+        if row_ids is not None:
+            row_ids = self._bounded(row_ids)
+        positions = self.live(self._bounded(self.practical_index.query(requirements, within=row_ids)))
+
+        budget_positions = self.budget_index.query(requirements) if self.size else None
+        if budget_positions is not None:
+            positions = positions[np.isin(positions, budget_positions, assume_unique=True)]
+
+        conflicts = lifestyle_conflicts(lifestyle_mask_vector(requirements), self._conflict_masks[positions])
+        return positions[~conflicts]
+
+    def positions_of(self, usernames: list[str]) -> np.ndarray:
+        """Positions of the given users' live rows (unknown users are skipped)."""
+        positions = []
+        for username in usernames:
+            for row in reversed(self._rows_of.get(username, ())):
+                if row < self.size and self._removed_at[row] > self.version:
+                    positions.append(row)
+                    break
+        return np.array(positions, dtype=np.int64)
+
+    def row(self, position: int) -> dict:
+        """The candidate row at `position`."""
+        return self._rows[position]
+
+    def frame(self, positions: np.ndarray) -> pd.DataFrame:
+        """Candidate rows at `positions`, in that order."""
+        if len(positions) == 0:
+            return pd.DataFrame(columns=self.columns)
+        return pd.DataFrame([self._rows[position] for position in positions], columns=self.columns)
+
+    @property
+    def candidates(self) -> pd.DataFrame:
+        """Every live candidate row (built on first use; batch jobs only)."""
+        if self._candidates is None:
+            self._candidates = self.frame(self.live(np.arange(self.size)))
+        return self._candidates
@@ -0,0 +1,316 @@
+"""
+Partition the compatible pool into communities of the sizes users chose in
+step 2, maximising total intra-community compatibility.
+
+Run from the app folder: python -m utils.communities [--workers N]
+"""
+
+import argparse
+import os
+from collections import defaultdict
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+from utils.bitmask import PRACTICAL_OPTIONS, mask_column
+
+
+# Allowed (min, max) members per community for each size option of step 2
+COMMUNITY_SIZES = {
+    "Small (<10 people)": (3, 9),
+    "Medium (10–40)": (10, 40),
+    "Large (40–100)": (40, 100),
+}
+
+LOCAL_SEARCH_PASSES = 5
+
+
+# -----------------------------
+# Graph helpers
+# -----------------------------
+
+def _adjacency(indptr: np.ndarray, indices: np.ndarray, weights: np.ndarray, node: int) -> dict[int, float]:
+    start, end = indptr[node], indptr[node + 1]
+    return dict(zip(indices[start:end].tolist(), weights[start:end].tolist()))
+
+
+def _weight_to(neighbours: dict[int, float], members: set[int]) -> float:
+    if len(neighbours) < len(members):
+        return sum(weight for node, weight in neighbours.items() if node in members)
+    return sum(neighbours.get(node, 0.0) for node in members)
+
+
+# -----------------------------
+# Optimiser (runs in worker processes)
+# -----------------------------
+
+def _greedy_seed(n: int, graph: list[dict[int, float]], min_size: int, max_size: int) -> np.ndarray:
+    """Grow groups from the best-connected unassigned users."""
+    group_of = np.full(n, -1, dtype=np.int64)
+    tried = np.zeros(n, dtype=bool)
+    strength = np.array([sum(graph[node].values()) for node in range(n)])
+    n_groups = 0
+
+    for seed in np.argsort(-strength, kind="stable").tolist():
+        if group_of[seed] >= 0 or tried[seed]:
+            continue
+        members = [seed]
+        group_of[seed] = n_groups
+        gains = defaultdict(float)
+        for node, weight in graph[seed].items():
+            if group_of[node] < 0:
+                gains[node] += weight
+
+        while gains and len(members) < max_size:
+            best = max(gains, key=gains.get)
+            del gains[best]
+            members.append(best)
+            group_of[best] = n_groups
+            for node, weight in graph[best].items():
+                if group_of[node] < 0:
+                    gains[node] += weight
+
+        if len(members) < min_size:
+            group_of[members] = -1
+            tried[members] = True
+        else:
+            n_groups += 1
+
+    # Leftovers join the open group they are most compatible with
+    groups = [set() for _ in range(n_groups)]
+    for node in range(n):
+        if group_of[node] >= 0:
+            groups[group_of[node]].add(node)
+    for node in np.flatnonzero(group_of < 0).tolist():
+        best_group, best_gain = -1, 0.0
+        for group_id, members in enumerate(groups):
+            if len(members) >= max_size:
+                continue
+            gain = _weight_to(graph[node], members)
+            if gain > best_gain:
+                best_group, best_gain = group_id, gain
+        if best_group >= 0:
+            group_of[node] = best_group
+            groups[best_group].add(node)
+
+    return group_of
+
+
+def _local_search(group_of: np.ndarray, graph: list[dict[int, float]], min_size: int, max_size: int) -> np.ndarray:
+    """Improve the partition with single moves and pairwise swaps along edges."""
+    groups = defaultdict(set)
+    for node, group_id in enumerate(group_of.tolist()):
+        if group_id >= 0:
+            groups[group_id].add(node)
+
+    for _ in range(LOCAL_SEARCH_PASSES):
+        improved = False
+        for u in range(len(group_of)):
+            a = group_of[u]
+            if a < 0:
+                continue
+            weight_in_a = _weight_to(graph[u], groups[a])
+
+            for v in graph[u]:
+                b = group_of[v]
+                if b < 0 or b == a:
+                    continue
+                weight_in_b = _weight_to(graph[u], groups[b])
+
+                # Move u to b
+                if len(groups[b]) < max_size and len(groups[a]) > min_size and weight_in_b > weight_in_a:
+                    groups[a].discard(u)
+                    groups[b].add(u)
+                    group_of[u] = b
+                    improved = True
+                    break
+
+                # Swap u and v
+                w_uv = graph[u][v]
+                delta = (
+                    (weight_in_b - w_uv) - weight_in_a
+                    + (_weight_to(graph[v], groups[a]) - w_uv) - _weight_to(graph[v], groups[b])
+                )
+                if delta > 1e-9:
+                    groups[a].discard(u)
+                    groups[b].discard(v)
+                    groups[a].add(v)
+                    groups[b].add(u)
+                    group_of[u], group_of[v] = b, a
+                    improved = True
+                    break
+        if not improved:
+            break
+
+    return group_of
+
+
+def optimise_unit(indptr: np.ndarray, indices: np.ndarray, weights: np.ndarray,
+                  min_size: int, max_size: int) -> np.ndarray:
+    """
+    Partition one independent set of users (CSR adjacency, local node ids).
+    Returns the local group id of each node, -1 for users left unassigned.
+    """
+    n = len(indptr) - 1
+    graph = [_adjacency(indptr, indices, weights, node) for node in range(n)]
+    group_of = _greedy_seed(n, graph, min_size, max_size)
+    return _local_search(group_of, graph, min_size, max_size)
+
+
+# -----------------------------
+# Problem construction
+# -----------------------------
+
+def size_preferences(candidates) -> np.ndarray:
+    """
+    Index into COMMUNITY_SIZES of each candidate's preferred size (the smallest
+    one they selected), or -1 when they selected none.
+    """
+    options = PRACTICAL_OPTIONS["size_of_community"]
+    masks = candidates[mask_column("size_of_community")].to_numpy(dtype=np.int64)
+    preference = np.full(len(masks), -1, dtype=np.int64)
+    for bit in reversed(range(len(options))):
+        preference[(masks >> bit) & 1 == 1] = list(COMMUNITY_SIZES).index(options[bit])
+    return preference
+
+
+def _edges(store, usernames: list[str]) -> tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """Symmetric (i, j, weight) edges between `usernames` from the pairwise store."""
+    position = {username: i for i, username in enumerate(usernames)}
+    sources, targets, scores = [], [], []
+    for i, username in enumerate(usernames):
+        for neighbour, score in store.lookup(username):
+            j = position.get(neighbour)
+            if j is not None and j != i:
+                sources.append(i)
+                targets.append(j)
+                scores.append(score)
+
+    rows = np.array(sources + targets, dtype=np.int64)
+    cols = np.array(targets + sources, dtype=np.int64)
+    weights = np.array(scores + scores, dtype=np.float64)
+
+    # Keep the highest weight of duplicate (i, j) pairs
+    order = np.lexsort((-weights, cols, rows))
+    rows, cols, weights = rows[order], cols[order], weights[order]
+    first = np.ones(len(rows), dtype=bool)
+    first[1:] = (rows[1:] != rows[:-1]) | (cols[1:] != cols[:-1])
+    return rows[first], cols[first], weights[first]
+
+
+def _components(n: int, rows: np.ndarray, cols: np.ndarray) -> np.ndarray:
+    """Connected component label of every node (union-find)."""
+    parent = np.arange(n)
+
+    def find(node):
+        while parent[node] != node:
+            parent[node] = parent[parent[node]]
+            node = parent[node]
+        return node
+
+    for i, j in zip(rows.tolist(), cols.tolist()):
+        root_i, root_j = find(i), find(j)
+        if root_i != root_j:
+            parent[root_i] = root_j
+    return np.array([find(node) for node in range(n)], dtype=np.int64)
+
+
+def _csr(nodes: np.ndarray, rows: np.ndarray, cols: np.ndarray, weights: np.ndarray, n: int):
+    """CSR adjacency of one component in local node ids."""
+    local = np.full(n, -1, dtype=np.int64)
+    local[nodes] = np.arange(len(nodes))
+    local_rows, local_cols = local[rows], local[cols]
+    order = np.argsort(local_rows, kind="stable")
+    indptr = np.zeros(len(nodes) + 1, dtype=np.int64)
+    np.add.at(indptr, local_rows + 1, 1)
+    return np.cumsum(indptr), local_cols[order], weights[order]
+
+
+def _optimise_batch(units: list[tuple]) -> list[np.ndarray]:
+    return [optimise_unit(*unit) for unit in units]
+
+
+def form_communities(candidates, store, workers: int | None = None) -> list[dict]:
+    """
+    Partition every candidate of the pool into communities. Users are grouped
+    by preferred community size; each connected part of the compatibility graph
+    is optimised independently, in batches spread over a process pool.
+    """
+    usernames = candidates["username"].tolist()
+    n = len(usernames)
+    size_labels = list(COMMUNITY_SIZES)
+    preferences = size_preferences(candidates)
+    rows, cols, weights = _edges(store, usernames)
+
+    # Edges only count between users who want the same community size, so
+    # every connected component lies within one size
+    same_size = (preferences[rows] >= 0) & (preferences[rows] == preferences[cols])
+    rows, cols, weights = rows[same_size], cols[same_size], weights[same_size]
+    labels = _components(n, rows, cols)
+
+    edge_order = np.argsort(labels[rows], kind="stable")
+    rows, cols, weights = rows[edge_order], cols[edge_order], weights[edge_order]
+    edge_labels = labels[rows]
+    node_order = np.argsort(labels, kind="stable")
+    sorted_labels = labels[node_order]
+
+    units, unit_nodes = [], []
+    for label in np.unique(edge_labels):
+        nodes = np.sort(node_order[np.searchsorted(sorted_labels, label):np.searchsorted(sorted_labels, label, side="right")])
+        min_size, max_size = COMMUNITY_SIZES[size_labels[preferences[nodes[0]]]]
+        if len(nodes) < min_size:
+            continue
+        start, end = np.searchsorted(edge_labels, label), np.searchsorted(edge_labels, label, side="right")
+        units.append((*_csr(nodes, rows[start:end], cols[start:end], weights[start:end], n), min_size, max_size))
+        unit_nodes.append(nodes)
+
+    # Spread the units over the workers in batches of similar total size
+    n_batches = max(1, min(len(units), 4 * (workers or os.cpu_count() or 1)))
+    batches = [[] for _ in range(n_batches)]
+    loads = np.zeros(n_batches)
+    for unit_id in sorted(range(len(units)), key=lambda i: -len(unit_nodes[i])):
+        batch = int(np.argmin(loads))
+        batches[batch].append(unit_id)
+        loads[batch] += len(unit_nodes[unit_id])
+    batches = [batch for batch in batches if batch]
+
+    results = []
+    next_id = 0
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        futures = [executor.submit(_optimise_batch, [units[i] for i in batch]) for batch in batches]
+        for batch, future in zip(batches, futures):
+            for unit_id, group_of in zip(batch, future.result()):
+                nodes = unit_nodes[unit_id]
+                size_label = size_labels[preferences[nodes[0]]]
+                for local_group in np.unique(group_of[group_of >= 0]):
+                    members = nodes[group_of == local_group]
+                    for member in members.tolist():
+                        results.append({
+                            "username": usernames[member],
+                            "community_id": next_id,
+                            "size_of_community": size_label,
+                            "community_size": len(members),
+                        })
+                    next_id += 1
+    return results
+
+
+def main() -> None:
+    from data_access.candidate_pool import get_candidate_pool
+    from data_access.communities import save_communities
+    from data_access.latest_answers import flush_latest
+    from data_access.pairwise_store import get_pairwise_store
+
+    parser = argparse.ArgumentParser(description="Partition the candidate pool into communities.")
+    parser.add_argument("--workers", type=int, default=os.cpu_count(), help="worker processes")
+    args = parser.parse_args()
+
+    snapshot = get_candidate_pool().snapshot()
+    communities = form_communities(snapshot.candidates, get_pairwise_store(), args.workers)
+    save_communities(communities)
+    flush_latest()
+    print(f"Assigned {len(communities)} users to {len({row['community_id'] for row in communities})} communities")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,66 @@
+import numpy as np
+import pandas as pd
+
+from utils.bitmask import LIFESTYLE_OPTIONS, encode_multiselect, encode_selection
+
+
+# Columns of the (n, 4) lifestyle mask matrix
+LIFESTYLE_MASK_FIELDS = list(LIFESTYLE_OPTIONS)
+
+_SMOKING = LIFESTYLE_OPTIONS["smoking_tolerance"]
+_DIET = LIFESTYLE_OPTIONS["dietary_restrictions"]
+
+# Someone who accepts smoking nowhere cannot live with someone who accepts it
+# in outdoor or shared spaces
+SMOKE_FREE_BITS = encode_selection(["Nowhere"], _SMOKING)
+SHARED_SMOKING_BITS = encode_selection(["In outdoor spaces", "In shared spaces"], _SMOKING)
+
+# Vegan households cannot share meals with households without restrictions
+VEGAN_BITS = encode_selection(["Vegan"], _DIET)
+UNRESTRICTED_BITS = encode_selection(["No restrictions"], _DIET)
+
+
+def _normalize(values, field: str):
+    # Animals can be typed in as free text ("Dog, goat"), so compare lowercase
+    return values.str.lower() if field in ("desired_animals", "forbidden_animals") else values
+
+
+def lifestyle_mask_matrix(df: pd.DataFrame) -> np.ndarray:
+    """(n, 4) uint16 bitsets of the conflict-relevant lifestyle answers; 0 when unanswered."""
+    columns = []
+    for field, options in LIFESTYLE_OPTIONS.items():
+        if field in df.columns:
+            columns.append(encode_multiselect(_normalize(df[field].fillna("").astype(str), field), options))
+        else:
+            columns.append(np.zeros(len(df), dtype=np.int64))
+    return np.stack(columns, axis=1).astype(np.uint16)
+
+
+def lifestyle_mask_vector(requirements: dict) -> np.ndarray:
+    """The same bitsets for the user's own answers."""
+    masks = []
+    for field, options in LIFESTYLE_OPTIONS.items():
+        selected = requirements.get(field)
+        if field in ("desired_animals", "forbidden_animals") and selected is not None:
+            selected = [str(value).lower() for value in ([selected] if isinstance(selected, str) else selected)]
+        masks.append(encode_selection(selected, options))
+    return np.array(masks, dtype=np.uint16)
+
+
+def _both_ways(mine: np.ndarray, theirs: np.ndarray, bits_a: int, bits_b: int) -> np.ndarray:
+    return (((mine & bits_a) != 0) & ((theirs & bits_b) != 0)) | (((mine & bits_b) != 0) & ((theirs & bits_a) != 0))
+
+
+def lifestyle_conflicts(user: np.ndarray, candidates: np.ndarray) -> np.ndarray:
+    """
+    Boolean mask of candidates whose household clashes with the user's, checked
+    both ways with bitwise operations over the whole matrix:
+      - animals: one side's desired animals intersect the other's forbidden ones
+      - smoking: smoke-free on one side, smoking in outdoor/shared spaces on the other
+      - diet:    vegan on one side, no restrictions on the other
+    """
+    desired, forbidden, smoking, diet = range(len(LIFESTYLE_MASK_FIELDS))
+    animals = ((user[desired] & candidates[:, forbidden]) | (user[forbidden] & candidates[:, desired])) != 0
+    smoke = _both_ways(user[smoking], candidates[:, smoking], SMOKE_FREE_BITS, SHARED_SMOKING_BITS)
+    meals = _both_ways(user[diet], candidates[:, diet], VEGAN_BITS, UNRESTRICTED_BITS)
+    return animals | smoke | meals
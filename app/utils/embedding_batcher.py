@@ -0,0 +1,100 @@
+"""
+Cross-session micro-batching of embedding requests. Every session submits its
+texts to one queue per process. A dispatcher thread collects them until the
+batch holds EMBEDDING_MICROBATCH_SIZE texts or the oldest has waited
+EMBEDDING_MICROBATCH_WAIT_MS milliseconds. It then encodes the whole batch
+with one get_embeddings call and resolves each caller's future with its row.
+
+A request therefore waits at most the flush window plus one batched forward
+pass, and concurrent users share forward passes.
+"""
+
+import logging
+import os
+import queue
+import threading
+import time
+from concurrent.futures import Future
+
+from utils.embeddings import get_embeddings
+
+
+LOGGER = logging.getLogger(__name__)
+
+# -----------------------------
+# Configuration
+# -----------------------------
+
+DEFAULT_MAX_TEXTS = 16
+DEFAULT_MAX_WAIT_MS = 20
+
+
+def microbatching_enabled() -> bool:
+    return os.getenv("EMBEDDING_MICROBATCH", "1").strip().lower() not in ("0", "false", "no")
+
+# -----------------------------
+# Internal helpers
+# -----------------------------
+
+class EmbeddingBatcher:
+    """Queue of (text, future) pairs drained in batches by one dispatcher thread."""
+
+    def __init__(self, max_texts: int = DEFAULT_MAX_TEXTS, max_wait_ms: float = DEFAULT_MAX_WAIT_MS):
+        self.max_texts = max(1, max_texts)
+        self.max_wait = max_wait_ms / 1000
+        self._queue = queue.Queue()
+        self._thread = threading.Thread(target=self._run, name="embedding-batcher", daemon=True)
+        self._thread.start()
+
+    def submit(self, text: str) -> Future:
+        """Queue `text`; the future resolves to its embedding vector."""
+        future = Future()
+        self._queue.put((text, future))
+        return future
+
+    def _next_batch(self) -> list[tuple[str, Future]]:
+        batch = [self._queue.get()]
+        deadline = time.monotonic() + self.max_wait
+        while len(batch) < self.max_texts:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            try:
+                batch.append(self._queue.get(timeout=remaining))
+            except queue.Empty:
+                break
+        return batch
+
+    def _run(self) -> None:
+        while True:
+            batch = [(text, future) for text, future in self._next_batch() if future.set_running_or_notify_cancel()]
+            if not batch:
+                continue
+            try:
+                embeddings = get_embeddings([text for text, _ in batch])
+            except Exception as error:
+                LOGGER.warning("Embedding batch of %d texts failed: %s", len(batch), error)
+                for _, future in batch:
+                    future.set_exception(error)
+                continue
+            for (_, future), embedding in zip(batch, embeddings):
+                future.set_result(embedding)
+
+# -----------------------------
+# Public API
+# -----------------------------
+
+_BATCHER = None
+_BATCHER_LOCK = threading.Lock()
+
+
+def get_embedding_batcher() -> EmbeddingBatcher:
+    """The process-wide dispatcher (started on first use)."""
+    global _BATCHER
+    with _BATCHER_LOCK:
+        if _BATCHER is None:
+            _BATCHER = EmbeddingBatcher(
+                int(os.getenv("EMBEDDING_MICROBATCH_SIZE", DEFAULT_MAX_TEXTS)),
+                float(os.getenv("EMBEDDING_MICROBATCH_WAIT_MS", DEFAULT_MAX_WAIT_MS)),
+            )
+        return _BATCHER
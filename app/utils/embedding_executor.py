@@ -0,0 +1,62 @@
+"""
+Background encoding of values answers. Step 5 submits each answer as soon as
+it is transcribed, so by the time the user clicks "Find Matches" most
+embeddings are already computed and the submit only waits for the rest.
+
+Submissions go through the cross-session micro-batcher
+(utils.embedding_batcher) unless EMBEDDING_MICROBATCH=0, in which case each
+answer is encoded on its own by a small thread pool.
+"""
+
+import os
+import threading
+from concurrent.futures import Future, ThreadPoolExecutor
+
+from utils.embedding_batcher import get_embedding_batcher, microbatching_enabled
+from utils.embeddings import get_embeddings
+
+
+# Forward passes running at once across all sessions; override with EMBEDDING_WORKERS
+DEFAULT_WORKERS = 2
+
+_EXECUTOR = None
+_EXECUTOR_LOCK = threading.Lock()
+
+
+def _executor() -> ThreadPoolExecutor:
+    global _EXECUTOR
+    with _EXECUTOR_LOCK:
+        if _EXECUTOR is None:
+            workers = max(1, int(os.getenv("EMBEDDING_WORKERS", DEFAULT_WORKERS)))
+            _EXECUTOR = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="embedding")
+        return _EXECUTOR
+
+
+def _embed(text: str):
+    return get_embeddings([text])[0]
+
+
+def submit_embedding(text: str) -> Future:
+    """Start encoding `text` in the background; the future resolves to its vector."""
+    if microbatching_enabled():
+        return get_embedding_batcher().submit(text)
+    return _executor().submit(_embed, text)
+
+
+def prefetch_embedding(futures: dict, field: str, text: str) -> None:
+    """
+    Keep futures[field] encoding the current answer of `field`: submit it when
+    the text is new or changed, and drop the entry when the answer is empty.
+    Entries are (text, future) pairs.
+    """
+    if not text:
+        futures.pop(field, None)
+        return
+    current = futures.get(field)
+    if current is None or current[0] != text:
+        futures[field] = (text, submit_embedding(text))
+
+
+def current_futures(futures: dict, profile: dict) -> dict:
+    """The futures whose text still matches the answer in `profile`, by field."""
+    return {field: future for field, (text, future) in futures.items() if profile.get(field) == text}
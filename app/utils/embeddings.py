@@ -1,39 +1,187 @@
-import torch
+import gc
+import logging
+import os
+import threading
+
 import numpy as np
-from transformers import AutoTokenizer, AutoModel
 
-# Cache model globally to avoid reloading
+from data_access.embedding_cache import cache_enabled, cached_embeddings
+from utils.batch_planner import DEFAULT_DIMS, model_dims, plan_batches
+
+# Moral foundation scores ME2-BERT returns per text, in embedding column order
+# (care, fairness, loyalty, authority, purity)
+SCORE_LABELS = ['CH', 'FC', 'LB', 'AS', 'PD']
+
+# Texts per forward pass; override with EMBEDDING_BATCH_SIZE
+DEFAULT_BATCH_SIZE = 32
+
+# "torch" or "onnx" (quantized, see utils.onnx_embeddings); override with EMBEDDING_BACKEND
+DEFAULT_BACKEND = "torch"
+
+MODEL_NAME = "lorenzozan/ME2-BERT"
+# Hugging Face revision of the model; part of every embedding cache key
+MODEL_REVISION = os.getenv("EMBEDDING_MODEL_REVISION", "main")
+
+LOGGER = logging.getLogger(__name__)
+
+# Cache model globally to avoid reloading. Loading happens under the lock so
+# concurrent sessions wait for one copy instead of each loading their own.
 _tokenizer = None
 _model = None
+_MODEL_LOCK = threading.RLock()
+
+_warm_up_started = False
+_WARM_UP_LOCK = threading.Lock()
+
+def load_tokenizer():
+    """Load the ME2-BERT tokenizer alone (cached); the ONNX backend needs nothing else."""
+    global _tokenizer
+    with _MODEL_LOCK:
+        if _tokenizer is None:
+            from transformers import AutoTokenizer
+            _tokenizer = AutoTokenizer.from_pretrained(MODEL_NAME, revision=MODEL_REVISION, trust_remote_code=True)
+        return _tokenizer
 
 def load_model():
     """Load ME2-BERT model and tokenizer (cached)."""
-    global _tokenizer, _model
-    if _tokenizer is None or _model is None:
-        _tokenizer = AutoTokenizer.from_pretrained("lorenzozan/ME2-BERT", trust_remote_code=True)
-        _model = AutoModel.from_pretrained("lorenzozan/ME2-BERT", trust_remote_code=True)
-    return _tokenizer, _model
+    global _model
+    with _MODEL_LOCK:
+        tokenizer = load_tokenizer()
+        if _model is None:
+            from transformers import AutoModel
+            _model = AutoModel.from_pretrained(MODEL_NAME, revision=MODEL_REVISION, trust_remote_code=True)
+            _model.eval()
+        return tokenizer, _model
+
+def release_model() -> None:
+    """Drop the cached PyTorch model so its weights can be freed (the tokenizer is kept)."""
+    global _model
+    with _MODEL_LOCK:
+        _model = None
+    gc.collect()
+
+def warm_up() -> None:
+    """Load the configured backend and run one dummy forward pass (bypassing the cache)."""
+    encoder = None
+    if embedding_backend() == "onnx":
+        from utils.onnx_embeddings import get_onnx_encoder
+        encoder = get_onnx_encoder()
+    _encode(["Warm-up"], encoder, 1)
+
+
+def start_warm_up() -> None:
+    """
+    Warm the model up on a background thread, once per process, when
+    EMBEDDING_WARMUP=1. Called as the app starts so the first values
+    submission does not pay for loading the model.
+    """
+    global _warm_up_started
+    if os.getenv("EMBEDDING_WARMUP", "").strip().lower() not in ("1", "true", "yes"):
+        return
+    with _WARM_UP_LOCK:
+        if _warm_up_started:
+            return
+        _warm_up_started = True
+
+    def run():
+        try:
+            warm_up()
+            LOGGER.info("Embedding model warmed up")
+        except Exception as error:
+            LOGGER.warning("Embedding warm-up failed: %s", error)
+
+    threading.Thread(target=run, name="embedding-warm-up", daemon=True).start()
+
+
+def embedding_batch_size() -> int:
+    return max(1, int(os.getenv("EMBEDDING_BATCH_SIZE", DEFAULT_BATCH_SIZE)))
 
-def get_embeddings(texts):
+
+def embedding_backend() -> str:
+    return os.getenv("EMBEDDING_BACKEND", DEFAULT_BACKEND).strip().lower()
+
+
+def get_embeddings(texts, batch_size: int | None = None, backend: str | None = None):
     """
     Generate embeddings for a list of texts (or a single text) using ME2-BERT.
-    Returns: numpy array shape (n_texts, hidden_dim)
-    Robust to models that return either a model output object, a list/tuple of tensors,
-    or a list of dicts with label scores (e.g., {'CH':..., 'FC':..., ...}).
+    Returns: numpy array shape (n_texts, hidden_dim), rows in input order.
+
+    Each batch is padded only to its longest text rather than the model's
+    512-token maximum. Texts are sorted by token length first, so a batch
+    holds texts of similar length and short answers are not padded up to
+    the longest one in the whole input. Batches hold up to `batch_size`
+    texts (default EMBEDDING_BATCH_SIZE), fewer when memory is short.
+
+    `backend` ("torch" or "onnx", default EMBEDDING_BACKEND) selects the
+    inference engine; "onnx" falls back to PyTorch when it is unavailable.
+
+    Vectors are looked up in data_access.embedding_cache first and only the
+    texts missing from it are encoded (disable with EMBEDDING_CACHE=0).
     """
     # Normalize single-string input to list
     if isinstance(texts, str):
         texts = [texts]
     if not isinstance(texts, (list, tuple)):
         raise ValueError("texts must be a string or a list/tuple of strings")
+    if len(texts) == 0:
+        raise ValueError("texts must not be empty")
 
-    tokenizer, model = load_model()
+    encoder = None
+    if (backend or embedding_backend()) == "onnx":
+        from utils.onnx_embeddings import get_onnx_encoder
+        encoder = get_onnx_encoder()
+    batch_size = batch_size or embedding_batch_size()
 
-    inputs = tokenizer(texts, padding="max_length", truncation=True, return_tensors="pt")
-    model.eval()
+    if not cache_enabled():
+        return _encode(list(texts), encoder, batch_size)
+    # The engine is part of the key: quantized vectors differ slightly from PyTorch ones
+    model_id = f"{MODEL_NAME}@{MODEL_REVISION}:{'torch' if encoder is None else 'onnx'}"
+    return cached_embeddings(list(texts), model_id, lambda misses: _encode(misses, encoder, batch_size))
 
-    with torch.no_grad():
-        outputs = model(**inputs, return_dict=True)
+
+def _encode(texts: list[str], encoder, batch_size: int) -> np.ndarray:
+    """
+    Encode texts in length buckets with `encoder` (ONNX) or, when None,
+    PyTorch. Batches hold at most `batch_size` texts and fewer when free
+    memory is short (utils.batch_planner).
+    """
+    if encoder is None:
+        import torch
+        tokenizer, model = load_model()
+    else:
+        tokenizer = load_tokenizer()
+
+    # Bucket by token length, then put the rows back in input order
+    lengths = [len(ids) for ids in tokenizer(list(texts), truncation=True)["input_ids"]]
+    order = np.argsort(lengths, kind="stable")
+    sorted_lengths = [lengths[i] for i in order]
+    dims = model_dims(model) if encoder is None else DEFAULT_DIMS
+    batches = []
+    # Each batch is sized to the memory free at that moment, so the previous
+    # batch's tensors are dropped before the next one is planned
+    for start, stop in plan_batches(sorted_lengths, batch_size, dims):
+        batch = [texts[i] for i in order[start:stop]]
+        if encoder is not None:
+            batches.append(encoder(tokenizer(batch, padding=True, truncation=True, return_tensors="np")))
+            continue
+        inputs = tokenizer(batch, padding=True, truncation=True, return_tensors="pt")
+        with torch.no_grad():
+            outputs = model(**inputs, return_dict=True)
+        batches.append(_extract_embeddings(outputs))
+        del inputs, outputs
+
+    embeddings = np.empty((len(texts), batches[0].shape[1]), dtype=batches[0].dtype)
+    embeddings[order] = np.concatenate(batches)
+    return embeddings
+
+
+def _extract_embeddings(outputs):
+    """
+    Embeddings of one batch from the model outputs.
+    Robust to models that return either a model output object, a list/tuple of tensors,
+    or a list of dicts with label scores (e.g., {'CH':..., 'FC':..., ...}).
+    """
+    import torch
 
     # 1) Standard case: object with last_hidden_state
     if hasattr(outputs, "last_hidden_state"):
@@ -57,9 +205,8 @@ def get_embeddings(texts):
         first = outputs[0] if len(outputs) > 0 else None
         if isinstance(first, dict):
             # Use a fixed column order consistent with downstream code/notebook
-            cols = ['CH', 'FC', 'LB', 'AS', 'PD']
             try:
-                arr = np.array([[float(d.get(c, 0.0)) for c in cols] for d in outputs], dtype=float)
+                arr = np.array([[float(d.get(c, 0.0)) for c in SCORE_LABELS] for d in outputs], dtype=float)
                 return arr
             except Exception as e:
                 raise ValueError(f"Failed to convert list-of-dicts outputs to array: {e}")
@@ -0,0 +1,51 @@
+import os
+import threading
+from contextlib import contextmanager
+
+try:
+    import fcntl
+except ImportError:  # Windows: fall back to in-process locking only
+    fcntl = None
+
+
+class _PathLock:
+    def __init__(self):
+        self.lock = threading.RLock()
+        self.depth = 0
+
+
+_PATH_LOCKS = {}
+_PATH_LOCKS_GUARD = threading.Lock()
+
+
+def _path_lock(path: str) -> _PathLock:
+    key = os.path.abspath(path)
+    with _PATH_LOCKS_GUARD:
+        if key not in _PATH_LOCKS:
+            _PATH_LOCKS[key] = _PathLock()
+        return _PATH_LOCKS[key]
+
+
+@contextmanager
+def file_lock(path: str):
+    """
+    Exclusive, re-entrant lock shared by the threads of this process and, where
+    fcntl is available, by every other server process using the same lock file.
+    """
+    path_lock = _path_lock(path)
+    with path_lock.lock:
+        path_lock.depth += 1
+        try:
+            if fcntl is None or path_lock.depth > 1:
+                yield
+                return
+
+            os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+            with open(path, "a") as lock_file:
+                fcntl.flock(lock_file, fcntl.LOCK_EX)
+                try:
+                    yield
+                finally:
+                    fcntl.flock(lock_file, fcntl.LOCK_UN)
+        finally:
+            path_lock.depth -= 1
@@ -0,0 +1,81 @@
+import numpy as np
+
+
+class InvertedIndex:
+    """
+    In-memory inverted index over multiselect answers.
+
+    For every field and option it keeps the posting list of row ids whose answer
+    contains that option. Row ids are assigned in insertion order, so posting
+    lists stay sorted without ever re-sorting and only ever grow: readers of an
+    older state share them and cut each result at the row count they saw.
+    """
+
+    def __init__(self, options: dict[str, list[str]]):
+        self.options = options
+        self._postings = {
+            field: {option: [] for option in field_options}
+            for field, field_options in options.items()
+        }
+        self._arrays = {}
+        self.usernames = []
+
+    @property
+    def n_rows(self) -> int:
+        return len(self.usernames)
+
+    def add(self, row: dict) -> int:
+        """Index one answers row and return its row id."""
+        row_id = self.n_rows
+        for field, field_options in self.options.items():
+            cell = row.get(field)
+            text = "" if cell is None else str(cell)
+            for option in field_options:
+                if option in text:
+                    self._postings[field][option].append(row_id)
+        self.usernames.append(str(row.get("username", "")))
+        return row_id
+
+    def postings(self, field: str, option: str) -> np.ndarray:
+        key = (field, option)
+        postings = self._postings[field][option]
+        array = self._arrays.get(key)
+        # A reader may cache an array built just before a row was added; the
+        # length tells a stale array apart
+        if array is None or len(array) != len(postings):
+            array = np.asarray(postings, dtype=np.int64)
+            self._arrays[key] = array
+        return array
+
+    def query(self, selections: dict, within: np.ndarray | None = None) -> np.ndarray:
+        """
+        Row ids sharing at least one selected option in every indexed field:
+        union of postings within a field, intersection across fields. `within`
+        (sorted row ids) restricts the search to an already filtered set.
+        """
+        result = within
+        for field, field_options in self.options.items():
+            selected = selections.get(field)
+            if selected is None:
+                selected = []
+            elif isinstance(selected, str):
+                selected = [selected]
+
+            matched = [
+                option for option in field_options
+                if any(option in str(value) for value in selected)
+            ]
+            field_ids = np.empty(0, dtype=np.int64)
+            for option in matched:
+                field_ids = np.union1d(field_ids, self.postings(field, option))
+
+            if result is None:
+                result = field_ids
+            else:
+                result = np.intersect1d(result, field_ids, assume_unique=True)
+            if result.size == 0:
+                break
+
+        if result is None:
+            return np.arange(self.n_rows, dtype=np.int64)
+        return result
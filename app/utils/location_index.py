@@ -0,0 +1,79 @@
+import numpy as np
+
+
+# Placeholder answers that carry no location
+_NO_LOCATION = {"", "--select a location--", "other regions", "nan", "none"}
+
+
+def parse_location(location) -> tuple[str, ...]:
+    """
+    Path of a desired_location answer in the location tree, most general first:
+    "Sweden, Stockholm" -> ("sweden", "stockholm"), "Sweden (all)" -> ("sweden",).
+    Returns () when no location was given.
+    """
+    text = "" if location is None else str(location).strip().lower()
+    if text in _NO_LOCATION:
+        return ()
+    text = text.replace("(all)", "")
+    return tuple(part.strip() for part in text.split(",") if part.strip())
+
+
+class LocationIndex:
+    """
+    In-memory prefix tree over desired_location answers keyed country -> city.
+
+    Every node keeps the row ids whose answer ends exactly there and the row
+    ids of its whole subtree. Rows are added in increasing row id order, so both
+    lists stay sorted. A country-wide answer is compatible with every city of
+    that country and a city answer with its country-wide answers; rows without
+    a location are compatible with everyone. Lists only ever grow, so readers
+    of an older state share them and cut each result at the row count they saw.
+    """
+
+    def __init__(self):
+        self._root = self._node()
+        self._arrays = {}
+        self.n_rows = 0
+
+    @staticmethod
+    def _node() -> dict:
+        return {"ids": [], "subtree": [], "children": {}}
+
+    def add(self, row: dict) -> int:
+        """Index one answers row and return its row id."""
+        row_id = self.n_rows
+        node = self._root
+        node["subtree"].append(row_id)
+        for part in parse_location(row.get("desired_location")):
+            node = node["children"].setdefault(part, self._node())
+            node["subtree"].append(row_id)
+        node["ids"].append(row_id)
+        self._arrays.clear()
+        self.n_rows += 1
+        return row_id
+
+    def query(self, location) -> np.ndarray | None:
+        """
+        Sorted row ids compatible with `location` in one walk down the tree,
+        or None when the user gave no location.
+        """
+        path = parse_location(location)
+        if not path:
+            return None
+        key = (path, self.n_rows)
+        if key in self._arrays:
+            return self._arrays[key]
+
+        node = self._root
+        ids = []
+        for part in path:
+            ids.extend(node["ids"])
+            node = node["children"].get(part)
+            if node is None:
+                break
+        else:
+            ids.extend(node["subtree"])
+
+        result = np.sort(np.asarray(ids, dtype=np.int64))
+        self._arrays[key] = result
+        return result
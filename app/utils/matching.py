@@ -1,40 +1,261 @@
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
 import pandas as pd
 import numpy as np
-from sklearn.metrics.pairwise import cosine_similarity
 
+from data_access.candidate_pool import get_candidate_pool
+from data_access.pairwise_store import get_pairwise_store
+from data_access.values_index import VALUES_EMBEDDING_FIELDS, get_values_indexes, values_neighbours
+from utils.match_cache import LRUCache, profile_fingerprint
+from utils.ranking import top_k
+from utils.scoring import CandidateFeatures, UserFeatures, score_candidates
+from utils.streaming_matching import data_stamp, stream_matches, streaming_enabled
+
+
+TOP_K = 3
+
+# Output column for each signal returned by score_candidates
+SIGNAL_COLUMNS = {
+    "practical": "practical_fit",
+    "lifestyle": "lifestyle_fit",
+    "personality": "personality_similarity",
+    "values": "values_similarity",
+    "compatibility_score": "compatibility_score",
+}
+
+# Columns of a match shown to the user (on screen and in the PDF). Every other
+# column of a scored frame holds the candidate's private answers and internal
+# bookkeeping, and must not leave the server.
+DISPLAY_COLUMNS = [
+    "name",
+    "email",
+    "compatibility_score",
+    "practical_fit",
+    "lifestyle_fit",
+    "personality_similarity",
+    "values_similarity",
+]
+
+# Threads scoring location shards in parallel for queries spanning several
+# countries (numpy releases the GIL in the scoring kernels)
+DEFAULT_SHARD_WORKERS = min(8, os.cpu_count() or 1)
+
+# Compatible pools larger than this are first narrowed to the user's nearest
+# neighbours in the values ANN indexes; override with VALUES_PREFILTER_THRESHOLD
+# (0 disables the prefilter)
+DEFAULT_PREFILTER_THRESHOLD = 5000
+
+# Neighbours taken from each values question's index by the prefilter;
+# override with VALUES_PREFILTER_NEIGHBOURS
+DEFAULT_PREFILTER_NEIGHBOURS = 1000
+
+# Results of find_matches keyed by profile fingerprint and pool data version,
+# so Streamlit reruns of step 6 do not re-score an unchanged pool
+_MATCH_CACHE = LRUCache()
+
+
+def _user_features(state) -> UserFeatures:
+    username = str(state.emailaddress or "").strip().lower()
+    value_vectors = [index.vector_for(username) for index in get_values_indexes().values()]
+    return UserFeatures(state.user_requirements, state.user_personality, value_vectors)
+
+
+def rank_candidates(candidates: pd.DataFrame, features: CandidateFeatures, user: UserFeatures,
+                    k: int = TOP_K, weights: dict | None = None) -> pd.DataFrame:
+    """Score all candidates in one batched pass and keep the k most compatible."""
+    if candidates.empty:
+        return candidates.assign(**{column: pd.Series(dtype=np.float32) for column in SIGNAL_COLUMNS.values()})
+
+    signals = score_candidates(user, features, weights)
+    best = top_k(signals["compatibility_score"], k)
+    return candidates.iloc[best].assign(
+        **{column: signals[signal][best] for signal, column in SIGNAL_COLUMNS.items()}
+    )
+
+
+_SHARD_EXECUTOR = None
+_SHARD_EXECUTOR_LOCK = threading.Lock()
+
+
+def _shard_executor() -> ThreadPoolExecutor:
+    global _SHARD_EXECUTOR
+    with _SHARD_EXECUTOR_LOCK:
+        if _SHARD_EXECUTOR is None:
+            workers = int(os.getenv("MATCH_SHARD_WORKERS", DEFAULT_SHARD_WORKERS))
+            _SHARD_EXECUTOR = ThreadPoolExecutor(max_workers=max(1, workers), thread_name_prefix="match-shard")
+        return _SHARD_EXECUTOR
+
+
+def rank_sharded(snapshot, groups: dict[str, np.ndarray], user: UserFeatures,
+                 k: int = TOP_K, weights: dict | None = None) -> pd.DataFrame:
+    """
+    rank_candidates over the location shards of `groups` ({shard: positions}).
+    Each shard is scored against its own features and keeps its top k, in
+    parallel when the query spans several shards; the shard winners are then
+    merged into the overall top k.
+    """
+    def rank_shard(key, positions):
+        # Only the shard's winners are turned into rows
+        view = snapshot.shards[key]
+        signals = score_candidates(user, view.features.take(positions), weights)
+        best = top_k(signals["compatibility_score"], k)
+        return view.frame(positions[best]).assign(
+            **{column: signals[signal][best] for signal, column in SIGNAL_COLUMNS.items()}
+        )
 
-def find_matches(state):
+    if len(groups) <= 1:
+        ranked = [rank_shard(key, positions) for key, positions in groups.items()]
+    else:
+        ranked = list(_shard_executor().map(rank_shard, groups.keys(), groups.values()))
+    if not ranked:
+        return rank_candidates(pd.DataFrame(), None, user, k, weights)
 
+    winners = pd.concat(ranked, ignore_index=True) if len(ranked) > 1 else ranked[0]
+    return winners.iloc[top_k(winners["compatibility_score"].to_numpy(), k)]
+
+
+def _size(groups: dict[str, np.ndarray]) -> int:
+    return sum(len(positions) for positions in groups.values())
+
+
+def _intersect(groups: dict[str, np.ndarray], other: dict[str, np.ndarray]) -> dict[str, np.ndarray]:
+    """The positions of `groups` that `other` holds too, by shard."""
+    empty = np.empty(0, dtype=np.int64)
+    narrowed = {key: positions[np.isin(positions, other.get(key, empty))] for key, positions in groups.items()}
+    return {key: positions for key, positions in narrowed.items() if len(positions)}
+
+
+def display_matches(matches: pd.DataFrame) -> pd.DataFrame:
+    """The columns of `matches` that may be shown to the user, in display order."""
+    return matches.reindex(columns=DISPLAY_COLUMNS)
+
+
+def _username(state) -> str:
+    return str(state.emailaddress or "").strip().lower()
+
+
+def _compatible_positions(snapshot, state) -> dict[str, np.ndarray]:
     # Apply hard filters in practical
-    df_practical = pd.read_csv("../data/saved_answers_practical.csv", on_bad_lines='skip') # skip the bad lines due to inconsistent column counts across rows
+    groups = snapshot.query(state.user_requirements)
+
+    # Never match the user with themself
+    themself = snapshot.positions_of([_username(state)])
+    for key, positions in themself.items():
+        if key in groups:
+            groups[key] = groups[key][groups[key] != positions[0]]
+    return {key: positions for key, positions in groups.items() if len(positions)}
+
+
+def _prefilter_by_values(snapshot, state, groups: dict[str, np.ndarray], k: int) -> dict[str, np.ndarray]:
+    """
+    Narrow a large compatible pool to the candidates among the user's nearest
+    values neighbours (the union over questions), so only they are scored.
+    Candidates without values answers are left out of a prefiltered pool. The
+    full pool is kept when it is small, when the user has no values answers,
+    or when fewer than k compatible neighbours are found.
+    """
+    threshold = int(os.getenv("VALUES_PREFILTER_THRESHOLD", DEFAULT_PREFILTER_THRESHOLD))
+    if threshold <= 0 or _size(groups) <= threshold:
+        return groups
+
+    neighbours = values_neighbours(
+        _username(state), int(os.getenv("VALUES_PREFILTER_NEIGHBOURS", DEFAULT_PREFILTER_NEIGHBOURS))
+    )
+    if not neighbours:
+        return groups
+    narrowed = _intersect(groups, snapshot.positions_of(list(neighbours)))
+    return narrowed if _size(narrowed) >= k else groups
+
+
+def store_user_matches(state) -> None:
+    """
+    Score the user against the compatible pool once (when they finish step 5),
+    prefiltered by values similarity when it is large, and record the result
+    in the shared pairwise store. Skipped in streaming mode, where the pool is
+    never held in memory.
+    """
+    if streaming_enabled():
+        return
+    snapshot = get_candidate_pool().snapshot()
+    groups = _prefilter_by_values(snapshot, state, _compatible_positions(snapshot, state), TOP_K)
+    user = _user_features(state)
+    usernames, scores = [], []
+    for key, positions in groups.items():
+        view = snapshot.shards[key]
+        usernames.extend(view.usernames[positions].tolist())
+        scores.append(score_candidates(user, view.features.take(positions))["compatibility_score"])
+    get_pairwise_store().update_user(
+        _username(state),
+        usernames,
+        np.concatenate(scores) if scores else np.empty(0, dtype=np.float32),
+        _profile_stamp(state),
+    )
+
+
+def _profile_key(state) -> str:
+    return profile_fingerprint(
+        _username(state),
+        state.user_requirements,
+        state.user_personality,
+        [getattr(state, field, None) for field in VALUES_EMBEDDING_FIELDS],
+    )
+
+
+def _profile_stamp(state) -> int:
+    """Non-zero 60-bit stamp of the profile a stored pairwise row was computed from."""
+    return int(_profile_key(state)[:15], 16) or 1
 
 
+def _stored_positions(snapshot, state, compatible: dict[str, np.ndarray], k: int) -> dict[str, np.ndarray] | None:
+    """
+    Positions of the user's stored neighbours that still pass their hard
+    filters, or None when the row is missing, was computed from another
+    profile, or has too few neighbours left to fill the top k.
+    """
+    stored = get_pairwise_store().lookup(_username(state), _profile_stamp(state))
+    if not stored:
+        return None
+    # Neighbours whose own answers have since changed may no longer be compatible
+    groups = _intersect(compatible, snapshot.positions_of([username for username, _ in stored]))
+    if _size(groups) < min(k, _size(compatible)):
+        return None
+    return groups
 
-    # Apply hard filters in lifestyle
-    df_lifestyle = pd.read_csv("../data/saved_answers_lifestyle.csv", on_bad_lines='skip') # skip the bad lines due to inconsistent column counts across rows
 
+def _find_matches_streaming(state, k: int, weights: dict | None):
+    # The file sizes stand in for the pool version, which is never loaded here
+    cache_key = (_profile_key(state), data_stamp(), k, profile_fingerprint(weights))
+    cached = _MATCH_CACHE.get(cache_key)
+    if cached is not None:
+        return cached.copy()
 
-    requirements_physical_env = state.user_requirements["physical_environment"]
-    requirements_size_of_community = state.user_requirements["size_of_community"]
-    requirements_regime_of_sharing = state.user_requirements["regime_of_sharing"]
-    requirements_private_dwelling = state.user_requirements.get("private_dwelling")
+    matches = stream_matches(_username(state), state.user_requirements, _user_features(state), k, weights, SIGNAL_COLUMNS)
+    _MATCH_CACHE.put(cache_key, matches)
+    return matches.copy()
 
-    df = df_practical[
-        df_practical["physical_environment"]
-            .apply(lambda x: any(env in x for env in requirements_physical_env)) &
-        df_practical["size_of_community"]
-            .apply(lambda x: any(size in x for size in requirements_size_of_community)) &
-        df_practical["regime_of_sharing"]
-            .apply(lambda x: any(regime in x for regime in requirements_regime_of_sharing)) &
-        df_practical["private_dwelling"]
-            .apply(lambda x: any(dwelling in x for dwelling in requirements_private_dwelling))
-    ]
 
+def find_matches(state, k: int = TOP_K, weights: dict | None = None):
+    if streaming_enabled():
+        return _find_matches_streaming(state, k, weights)
 
-    #user_vec = np.array(list(state.user_personality.values())).reshape(1, -1)
-    #profile_vecs = df[list(state.user_personality.keys())].values
+    # The pool version bumps whenever an answers table is appended to, which
+    # invalidates every cached result at once
+    snapshot = get_candidate_pool().snapshot()
+    cache_key = (_profile_key(state), snapshot.version, k, profile_fingerprint(weights))
+    cached = _MATCH_CACHE.get(cache_key)
+    if cached is not None:
+        return cached.copy()
 
-    #df["personality_similarity"] = cosine_similarity(user_vec, profile_vecs)[0]
+    # Precomputed neighbours turn matching into a lookup; only the short list
+    # is re-scored to report the per-signal breakdown. Any row that cannot be
+    # trusted falls back to scoring the compatible pool, prefiltered by values
+    # similarity when it is large.
+    groups = _compatible_positions(snapshot, state)
+    stored = _stored_positions(snapshot, state, groups, k) if weights is None else None
+    groups = stored if stored is not None else _prefilter_by_values(snapshot, state, groups, k)
 
-    #df = df.sort_values("personality_similarity", ascending=False)
-    return df #df.head(3)
+    matches = rank_sharded(snapshot, groups, _user_features(state), k, weights).reset_index(drop=True)
+    _MATCH_CACHE.put(cache_key, matches)
+    return matches.copy()
@@ -0,0 +1,77 @@
+"""
+Thin client for utils.matching_service. When MATCHING_SERVICE_URL is set,
+matching runs in the shared service process; otherwise, or when the service
+cannot be reached in time, it runs in this process as before.
+"""
+
+import json
+import logging
+import os
+import urllib.error
+import urllib.request
+
+import pandas as pd
+
+from data_access.values_index import VALUES_EMBEDDING_FIELDS
+from utils import matching
+
+
+LOGGER = logging.getLogger(__name__)
+
+DEFAULT_TIMEOUT_SECONDS = 10.0
+
+
+def service_url() -> str | None:
+    url = os.getenv("MATCHING_SERVICE_URL", "").strip()
+    return url.rstrip("/") or None
+
+
+def _timeout() -> float:
+    return float(os.getenv("MATCHING_SERVICE_TIMEOUT", DEFAULT_TIMEOUT_SECONDS))
+
+
+def _state_payload(state) -> dict:
+    """The part of the session state matching needs, as JSON-friendly values."""
+    payload = {
+        "emailaddress": state.emailaddress,
+        "user_requirements": dict(state.user_requirements),
+        "user_personality": dict(state.user_personality),
+    }
+    for field in VALUES_EMBEDDING_FIELDS:
+        payload[field] = getattr(state, field, None)
+    return payload
+
+
+def _post(path: str, body: dict) -> dict:
+    request = urllib.request.Request(
+        f"{service_url()}{path}",
+        data=json.dumps(body, default=str).encode("utf-8"),
+        headers={"Content-Type": "application/json"},
+        method="POST",
+    )
+    with urllib.request.urlopen(request, timeout=_timeout()) as response:
+        return json.loads(response.read())
+
+
+def find_matches(state, k: int = matching.TOP_K, weights: dict | None = None) -> pd.DataFrame:
+    """utils.matching.find_matches, served by the matching service when configured."""
+    if service_url():
+        try:
+            result = _post("/matches", {"state": _state_payload(state), "k": k, "weights": weights})
+            return pd.DataFrame(result["data"], columns=result["columns"])
+        except (urllib.error.URLError, TimeoutError, ValueError, KeyError) as error:
+            LOGGER.warning("Matching service unavailable, matching locally: %s", error)
+
+    return matching.find_matches(state, k, weights)
+
+
+def store_user_matches(state) -> None:
+    """utils.matching.store_user_matches, run by the matching service when configured."""
+    if service_url():
+        try:
+            _post("/store", {"state": _state_payload(state)})
+            return
+        except (urllib.error.URLError, TimeoutError, ValueError, KeyError) as error:
+            LOGGER.warning("Matching service unavailable, storing matches locally: %s", error)
+
+    matching.store_user_matches(state)
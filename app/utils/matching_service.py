@@ -0,0 +1,107 @@
+"""
+Long-lived local matching service. One process holds the candidate pool, the
+indexes and the scoring engine; every Streamlit worker talks to it through
+utils.matching_client instead of loading its own copy.
+
+Run from the app folder:
+
+    python -m utils.matching_service [--host 127.0.0.1] [--port 8765]
+
+and point the web workers at it with MATCHING_SERVICE_URL=http://127.0.0.1:8765.
+Set CANDIDATE_POOL_SHARDS (e.g. "sweden,norway") to load and serve only
+those countries' candidates, plus the ones without a location.
+
+API (JSON bodies):
+    GET  /health   -> {"status": "ok", "version": <pool version>}
+    POST /matches  {"state": {...}, "k": 3, "weights": null} -> {"columns": [...], "data": [[...]]}
+    POST /store    {"state": {...}} -> {"status": "ok"}
+"""
+
+import argparse
+import json
+import logging
+import types
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from data_access.candidate_pool import get_candidate_pool
+from utils.matching import TOP_K, find_matches, store_user_matches
+
+
+LOGGER = logging.getLogger(__name__)
+
+DEFAULT_HOST = "127.0.0.1"
+DEFAULT_PORT = 8765
+
+
+def state_from_json(payload: dict) -> types.SimpleNamespace:
+    """The attributes of st.session_state that matching reads."""
+    return types.SimpleNamespace(**payload)
+
+
+class MatchingRequestHandler(BaseHTTPRequestHandler):
+    def _send_json(self, status: int, body: dict) -> None:
+        data = json.dumps(body).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def _read_json(self) -> dict:
+        length = int(self.headers.get("Content-Length", 0))
+        return json.loads(self.rfile.read(length) or b"{}")
+
+    def do_GET(self):
+        if self.path == "/health":
+            self._send_json(200, {"status": "ok", "version": get_candidate_pool().version})
+        else:
+            self._send_json(404, {"error": f"Unknown path {self.path}"})
+
+    def do_POST(self):
+        try:
+            payload = self._read_json()
+            state = state_from_json(payload.get("state", {}))
+            if self.path == "/matches":
+                matches = find_matches(state, int(payload.get("k", TOP_K)), payload.get("weights"))
+                self._send_json(200, json.loads(matches.to_json(orient="split", index=False)))
+            elif self.path == "/store":
+                store_user_matches(state)
+                self._send_json(200, {"status": "ok"})
+            else:
+                self._send_json(404, {"error": f"Unknown path {self.path}"})
+        except (ValueError, KeyError, AttributeError) as error:
+            self._send_json(400, {"error": str(error)})
+        except Exception as error:
+            LOGGER.exception("Matching request failed")
+            self._send_json(500, {"error": str(error)})
+
+    def log_message(self, format, *args):
+        LOGGER.info("%s - %s", self.address_string(), format % args)
+
+
+def serve(host: str = DEFAULT_HOST, port: int = DEFAULT_PORT) -> None:
+    # Build the pool and indexes before accepting requests
+    snapshot = get_candidate_pool().snapshot()
+    LOGGER.info("Candidate pool loaded: %d candidates", len(snapshot))
+
+    server = ThreadingHTTPServer((host, port), MatchingRequestHandler)
+    server.daemon_threads = True
+    LOGGER.info("Matching service listening on http://%s:%d", host, port)
+    try:
+        server.serve_forever()
+    finally:
+        server.server_close()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Serve matches to the Streamlit workers.")
+    parser.add_argument("--host", default=DEFAULT_HOST)
+    parser.add_argument("--port", type=int, default=DEFAULT_PORT)
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(levelname)s %(message)s")
+    serve(args.host, args.port)
+
+
+if __name__ == "__main__":
+    main()
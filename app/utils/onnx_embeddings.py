@@ -0,0 +1,219 @@
+"""
+Quantized ONNX Runtime backend for ME2-BERT, used by utils.embeddings when
+EMBEDDING_BACKEND=onnx. The model is exported to ONNX once, offline, its
+weights are quantized to int8 with dynamic quantization, and inference runs
+on the CPU with onnxruntime. This avoids holding the float32 PyTorch model
+in memory.
+
+The app never exports the model itself. onnxruntime is optional; without it,
+or when the quantized model has not been built, embeddings fall back to
+PyTorch with a warning.
+
+Build the model and compare it with PyTorch from the app folder:
+
+    python -m utils.onnx_embeddings export [--force]
+    python -m utils.onnx_embeddings check
+"""
+
+import argparse
+import logging
+import os
+import threading
+
+import numpy as np
+
+
+LOGGER = logging.getLogger(__name__)
+
+# -----------------------------
+# Configuration
+# -----------------------------
+
+ONNX_DIR = os.path.join("..", "data", "onnx")
+FP32_PATH = os.path.join(ONNX_DIR, "me2bert.onnx")
+INT8_PATH = os.path.join(ONNX_DIR, "me2bert-int8.onnx")
+
+# Cosine similarity every quantized embedding must keep with its PyTorch one
+MIN_PARITY_COSINE = 0.99
+
+PARITY_TEXTS = [
+    "I talk openly about how I feel, but only with people I trust.",
+    "We sit down together, listen to each side and look for a compromise.",
+    "Decisions should be made by consensus, even if it takes longer.",
+    "I value honesty, fairness and being considerate of others.",
+    "I paint and play the guitar.",
+    "Yes",
+]
+
+# -----------------------------
+# Internal helpers
+# -----------------------------
+
+def _encoder(model):
+    """
+    The model wrapped to return one embedding tensor, as get_embeddings extracts it.
+
+    Called with return_dict=True, ME2-BERT turns its (n, 5) moral foundation
+    scores into one {label: score} dict per text with Python floats, which
+    tracing would freeze into constants. With return_dict=False it returns the
+    score tensor itself, whose columns are in SCORE_LABELS order, and that is
+    what gets exported.
+    """
+    import torch
+
+    class Encoder(torch.nn.Module):
+        def __init__(self):
+            super().__init__()
+            self.model = model
+
+        def forward(self, input_ids, attention_mask):
+            outputs = self.model(input_ids=input_ids, attention_mask=attention_mask, return_dict=False)
+            if isinstance(outputs, torch.Tensor):
+                return outputs[:, 0, :] if outputs.dim() == 3 else outputs
+            if hasattr(outputs, "last_hidden_state"):
+                return outputs.last_hidden_state[:, 0, :]
+            if isinstance(outputs, dict) and "pooler_output" in outputs:
+                return outputs["pooler_output"]
+            for elem in outputs if isinstance(outputs, (list, tuple)) else []:
+                if isinstance(elem, torch.Tensor):
+                    return elem[:, 0, :] if elem.dim() == 3 else elem
+            raise ValueError(f"Cannot export model outputs of type {type(outputs)} to ONNX")
+
+    return Encoder().eval()
+
+
+def export_model(force: bool = False) -> str:
+    """
+    Export ME2-BERT to ONNX and quantize it to int8 (once); returns the
+    quantized model path. The PyTorch model loaded for the export is released
+    afterwards unless it was already loaded.
+    """
+    if os.path.exists(INT8_PATH) and not force:
+        return INT8_PATH
+
+    import torch
+    from onnxruntime.quantization import QuantType, quantize_dynamic
+
+    from utils import embeddings
+
+    was_loaded = embeddings._model is not None
+    try:
+        tokenizer, model = embeddings.load_model()
+        sample = tokenizer(PARITY_TEXTS[:2], padding=True, truncation=True, return_tensors="pt")
+        os.makedirs(ONNX_DIR, exist_ok=True)
+        with torch.no_grad():
+            torch.onnx.export(
+                _encoder(model),
+                (sample["input_ids"], sample["attention_mask"]),
+                FP32_PATH,
+                input_names=["input_ids", "attention_mask"],
+                output_names=["embedding"],
+                dynamic_axes={
+                    "input_ids": {0: "batch", 1: "sequence"},
+                    "attention_mask": {0: "batch", 1: "sequence"},
+                    "embedding": {0: "batch"},
+                },
+                opset_version=17,
+            )
+        del model
+    finally:
+        if not was_loaded:
+            embeddings.release_model()
+
+    # Write next to the final path and rename, so readers never see a partial model
+    tmp_path = f"{INT8_PATH}.{os.getpid()}.tmp"
+    quantize_dynamic(FP32_PATH, tmp_path, weight_type=QuantType.QInt8)
+    os.replace(tmp_path, INT8_PATH)
+    return INT8_PATH
+
+
+class OnnxEncoder:
+    """An onnxruntime CPU session over the quantized model."""
+
+    def __init__(self, path: str):
+        import onnxruntime as ort
+
+        options = ort.SessionOptions()
+        options.graph_optimization_level = ort.GraphOptimizationLevel.ORT_ENABLE_ALL
+        self.session = ort.InferenceSession(path, options, providers=["CPUExecutionProvider"])
+        self.input_names = {node.name for node in self.session.get_inputs()}
+
+    def __call__(self, inputs: dict) -> np.ndarray:
+        """Embeddings of one tokenized batch (numpy tensors)."""
+        feed = {name: np.asarray(value, dtype=np.int64) for name, value in inputs.items() if name in self.input_names}
+        return self.session.run(None, feed)[0]
+
+# -----------------------------
+# Public API
+# -----------------------------
+
+_ENCODER = None
+_ENCODER_FAILED = False
+_ENCODER_LOCK = threading.Lock()
+
+
+def get_onnx_encoder() -> OnnxEncoder | None:
+    """
+    The process-wide quantized encoder over the model built by `export`.
+    Returns None when the model has not been built, onnxruntime is missing or
+    the session cannot be created, and the caller falls back to PyTorch.
+    """
+    global _ENCODER, _ENCODER_FAILED
+    with _ENCODER_LOCK:
+        if _ENCODER is None and not _ENCODER_FAILED:
+            if not os.path.exists(INT8_PATH):
+                _ENCODER_FAILED = True
+                LOGGER.warning(
+                    "Quantized model %s not found, using PyTorch; build it with "
+                    "`python -m utils.onnx_embeddings export`", INT8_PATH,
+                )
+                return None
+            try:
+                _ENCODER = OnnxEncoder(INT8_PATH)
+            except Exception as error:
+                _ENCODER_FAILED = True
+                LOGGER.warning("ONNX embedding backend unavailable, using PyTorch: %s", error)
+        return _ENCODER
+
+
+def check_parity(texts: list[str] | None = None, min_cosine: float = MIN_PARITY_COSINE) -> dict:
+    """Compare the quantized embeddings of `texts` with the PyTorch ones."""
+    from utils.embeddings import _encode, embedding_batch_size
+
+    encoder = get_onnx_encoder()
+    if encoder is None:
+        raise RuntimeError("The ONNX backend is unavailable; see the warning above")
+
+    # Encode directly, the embedding cache would hand back stored vectors
+    texts = texts or PARITY_TEXTS
+    reference = _encode(texts, None, embedding_batch_size())
+    quantized = _encode(texts, encoder, embedding_batch_size())
+
+    norms = np.linalg.norm(reference, axis=1) * np.linalg.norm(quantized, axis=1)
+    cosine = np.sum(reference * quantized, axis=1) / np.maximum(norms, 1e-12)
+    return {
+        "min_cosine": float(cosine.min()),
+        "max_abs_diff": float(np.abs(reference - quantized).max()),
+        "ok": bool(cosine.min() >= min_cosine),
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Build and check the quantized ME2-BERT model.")
+    parser.add_argument("command", choices=["export", "check"])
+    parser.add_argument("--force", action="store_true", help="re-export even if the model exists")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(levelname)s %(message)s")
+    if args.command == "export":
+        print(export_model(force=args.force))
+        return
+
+    result = check_parity()
+    print(result)
+    if not result["ok"]:
+        raise SystemExit(f"Quantized embeddings drift from PyTorch (min cosine {result['min_cosine']:.4f})")
+
+
+if __name__ == "__main__":
+    main()
@@ -13,12 +13,14 @@ from reportlab.platypus import Frame, PageTemplate
 from reportlab.platypus import BaseDocTemplate
 from reportlab.pdfbase.ttfonts import TTFont
 from reportlab.pdfbase import pdfmetrics
-import matplotlib.pyplot as plt
 import numpy as np
 from io import BytesIO
 
 
 def create_radar_chart_personality_traits(user_data):
+    # matplotlib is only needed for this chart; importing it here keeps it off the startup path
+    import matplotlib.pyplot as plt
+
     labels = ["Openness", "Conscientiousness", "Extraversion", "Agreeableness", "Neuroticism"]
     values = [
         user_data["user_personality"]["openness"],
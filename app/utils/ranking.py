@@ -0,0 +1,51 @@
+import numpy as np
+import pandas as pd
+
+from utils.bfi import BFI_SCORING
+
+
+PERSONALITY_TRAITS = list(BFI_SCORING.keys())
+
+# Midpoint of the 1-5 BFI scale. Trait vectors are centred on it before the
+# cosine, otherwise every all-positive profile looks almost identical.
+BFI_SCALE_MIDPOINT = 3.0
+
+
+def _normalize_rows(matrix: np.ndarray) -> np.ndarray:
+    norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+    norms[norms == 0] = 1.0
+    return matrix / norms
+
+
+def trait_matrix(df: pd.DataFrame) -> np.ndarray:
+    """
+    Contiguous float32 matrix (n_candidates, 5) of centred, L2-normalised
+    Big Five vectors, ready to be scored with a single matrix-vector product.
+    """
+    traits = df[PERSONALITY_TRAITS].apply(pd.to_numeric, errors="coerce")
+    matrix = traits.fillna(BFI_SCALE_MIDPOINT).to_numpy(dtype=np.float32) - BFI_SCALE_MIDPOINT
+    return np.ascontiguousarray(_normalize_rows(matrix), dtype=np.float32)
+
+
+def trait_vector(personality: dict) -> np.ndarray:
+    """Centred, L2-normalised float32 vector for one user's traits."""
+    vector = np.array(
+        [float(personality.get(trait, BFI_SCALE_MIDPOINT)) for trait in PERSONALITY_TRAITS],
+        dtype=np.float32,
+    ) - BFI_SCALE_MIDPOINT
+    return _normalize_rows(vector.reshape(1, -1))[0]
+
+
+def top_k(scores: np.ndarray, k: int) -> np.ndarray:
+    """
+    Positions of the k highest scores, best first. Uses argpartition so the
+    selection is O(n); only the k winners are sorted.
+    """
+    n = len(scores)
+    if k <= 0 or n == 0:
+        return np.empty(0, dtype=np.int64)
+    if k < n:
+        candidates = np.argpartition(-scores, k - 1)[:k]
+    else:
+        candidates = np.arange(n)
+    return candidates[np.argsort(-scores[candidates], kind="stable")]
@@ -0,0 +1,169 @@
+import json
+import os
+
+import numpy as np
+import pandas as pd
+
+from utils.bitmask import PRACTICAL_OPTIONS, encode_practical_masks, encode_selection, mask_column
+from utils.ranking import trait_matrix, trait_vector
+
+
+# Default contribution of each signal to the compatibility score. Override with
+# the MATCH_WEIGHTS environment variable (JSON, e.g. '{"values": 0.5}') or by
+# passing `weights` to score_candidates.
+DEFAULT_WEIGHTS = {
+    "practical": 0.2,
+    "lifestyle": 0.2,
+    "personality": 0.3,
+    "values": 0.3,
+}
+
+# Ordered answer scales of the step_3_lifestyle sliders
+LIFESTYLE_SCALES = {
+    "contact_with_neighbours": ["Only when necessary", "Low", "Moderate", "Very high"],
+    "mix_of_household": ["Not important", "Neutral", "Important"],
+    "frequency_shared_activities": ["Rarely", "Occasionally", "Once a week", "Several times a week", "Daily"],
+}
+
+# Score given to a signal that cannot be computed (e.g. a candidate who skipped a step)
+NEUTRAL_SCORE = 0.5
+
+# Every practical field has at most 16 options, so masks fit in uint16 and a
+# single 64k-entry lookup table gives the popcount.
+_POPCOUNT_TABLE = np.array([bin(i).count("1") for i in range(1 << 16)], dtype=np.uint8)
+
+
+def load_weights(weights: dict | None = None) -> dict[str, float]:
+    """Default weights, overridden by MATCH_WEIGHTS and then `weights`, summing to 1."""
+    merged = dict(DEFAULT_WEIGHTS)
+    env_weights = os.getenv("MATCH_WEIGHTS")
+    if env_weights:
+        merged.update(json.loads(env_weights))
+    if weights:
+        merged.update(weights)
+
+    unknown = set(merged) - set(DEFAULT_WEIGHTS)
+    if unknown:
+        raise ValueError(f"Unknown match weights: {sorted(unknown)}")
+    total = sum(merged.values())
+    if total <= 0:
+        raise ValueError("Match weights must sum to a positive number")
+    return {signal: weight / total for signal, weight in merged.items()}
+
+
+def _popcount(values: np.ndarray) -> np.ndarray:
+    return _POPCOUNT_TABLE[values]
+
+
+def _scale_positions(values, scale: list[str]) -> np.ndarray:
+    """Position of each answer on its scale in [0, 1]; NaN when unknown."""
+    lookup = {option: i / (len(scale) - 1) for i, option in enumerate(scale)}
+    return np.array([lookup.get(value, np.nan) for value in values], dtype=np.float32)
+
+
+def _unit_rows(matrix: np.ndarray) -> np.ndarray:
+    norms = np.linalg.norm(matrix, axis=-1, keepdims=True)
+    norms[norms == 0] = 1.0
+    return matrix / norms
+
+
+class CandidateFeatures:
+    """Column-oriented feature matrices for a candidate pool, built once per pool."""
+
+    def __init__(self, df: pd.DataFrame, values: list[tuple[np.ndarray, np.ndarray]]):
+        if not all(mask_column(field) in df.columns for field in PRACTICAL_OPTIONS):
+            df = encode_practical_masks(df)
+        self.masks = np.stack(
+            [df[mask_column(field)].to_numpy(dtype=np.uint16) for field in PRACTICAL_OPTIONS], axis=1
+        ) if len(df) else np.zeros((0, len(PRACTICAL_OPTIONS)), dtype=np.uint16)
+
+        lifestyle = np.stack(
+            [
+                _scale_positions(df[field] if field in df.columns else [None] * len(df), scale)
+                for field, scale in LIFESTYLE_SCALES.items()
+            ],
+            axis=1,
+        ) if len(df) else np.zeros((0, len(LIFESTYLE_SCALES)), dtype=np.float32)
+        self.lifestyle_known = ~np.isnan(lifestyle)
+        self.lifestyle = np.nan_to_num(lifestyle)
+
+        self.traits = trait_matrix(df)
+        # One (unit vectors, present mask) pair per values question
+        self.values = [(_unit_rows(matrix), present) for matrix, present in values]
+
+    def __len__(self) -> int:
+        return len(self.masks)
+
+    def take(self, positions: np.ndarray) -> "CandidateFeatures":
+        """Features of the candidates at `positions`, in that order."""
+        subset = CandidateFeatures.__new__(CandidateFeatures)
+        subset.masks = self.masks[positions]
+        subset.lifestyle = self.lifestyle[positions]
+        subset.lifestyle_known = self.lifestyle_known[positions]
+        subset.traits = self.traits[positions]
+        subset.values = [(matrix[positions], present[positions]) for matrix, present in self.values]
+        return subset
+
+
+class UserFeatures:
+    """The same features for the user being matched."""
+
+    def __init__(self, requirements: dict, personality: dict, values: list[np.ndarray | None]):
+        self.masks = np.array(
+            [encode_selection(requirements.get(field), options) for field, options in PRACTICAL_OPTIONS.items()],
+            dtype=np.uint16,
+        )
+        lifestyle = np.array(
+            [_scale_positions([requirements.get(field)], scale)[0] for field, scale in LIFESTYLE_SCALES.items()],
+            dtype=np.float32,
+        )
+        self.lifestyle_known = ~np.isnan(lifestyle)
+        self.lifestyle = np.nan_to_num(lifestyle)
+        self.traits = trait_vector(personality)
+        self.values = [
+            None if vector is None else _unit_rows(np.asarray(vector, dtype=np.float32))
+            for vector in values
+        ]
+
+
+def score_candidates(user: UserFeatures, candidates: CandidateFeatures, weights: dict | None = None) -> dict[str, np.ndarray]:
+    """
+    Score every candidate against the user in one batched pass. Each signal is
+    in [0, 1] and symmetric between the two people:
+      - practical:   mean Jaccard overlap of the practical multiselect bitmasks
+      - lifestyle:   1 - mean distance between slider positions
+      - personality: cosine of the centred Big Five vectors, rescaled to [0, 1]
+      - values:      mean cosine of the values-answer embeddings, rescaled to [0, 1]
+    Returns each signal plus the weighted `compatibility_score`.
+    """
+    weights = load_weights(weights)
+    n = len(candidates)
+
+    intersection = _popcount(candidates.masks & user.masks).astype(np.float32)
+    union = _popcount(candidates.masks | user.masks).astype(np.float32)
+    practical = np.where(union > 0, intersection / np.maximum(union, 1), NEUTRAL_SCORE).mean(axis=1)
+
+    known = (candidates.lifestyle_known & user.lifestyle_known).astype(np.float32)
+    known_count = known.sum(axis=1)
+    distance = (np.abs(candidates.lifestyle - user.lifestyle) * known).sum(axis=1)
+    lifestyle = np.where(known_count > 0, 1.0 - distance / np.maximum(known_count, 1), NEUTRAL_SCORE)
+
+    personality = (candidates.traits @ user.traits + 1.0) / 2.0
+
+    values_total = np.zeros(n, dtype=np.float32)
+    values_count = np.zeros(n, dtype=np.float32)
+    for user_vector, (matrix, present) in zip(user.values, candidates.values):
+        if user_vector is None or matrix.shape[1] != len(user_vector):
+            continue
+        values_total += (matrix @ user_vector + 1.0) / 2.0 * present
+        values_count += present
+    values = np.where(values_count > 0, values_total / np.maximum(values_count, 1), NEUTRAL_SCORE)
+
+    signals = {
+        "practical": practical.astype(np.float32),
+        "lifestyle": lifestyle.astype(np.float32),
+        "personality": personality.astype(np.float32),
+        "values": values.astype(np.float32),
+    }
+    signals["compatibility_score"] = sum(weights[signal] * signals[signal] for signal in DEFAULT_WEIGHTS)
+    return signals
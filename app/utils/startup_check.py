@@ -0,0 +1,72 @@
+"""
+Measure how long the landing page takes to render in a fresh process and
+which heavy dependencies it loads on the way. Run from the app folder:
+
+    python -m utils.startup_check [--runs 3]
+
+It exits with an error if rendering the landing page imports torch.
+"""
+
+import argparse
+import statistics
+import subprocess
+import sys
+import time
+
+
+# Dependencies that should only load once a later step needs them
+HEAVY_MODULES = ["torch", "transformers", "matplotlib", "plotly", "reportlab", "sklearn", "openai"]
+
+# Runs in a child process so every measurement starts with a cold import cache
+_PROBE = """
+import json, sys, time
+start = time.perf_counter()
+from streamlit.testing.v1 import AppTest
+app = AppTest.from_file("app.py", default_timeout=120).run()
+elapsed = time.perf_counter() - start
+print(json.dumps({
+    "seconds": elapsed,
+    "errors": [str(error.value) for error in app.exception],
+    "loaded": [name for name in %r if name in sys.modules],
+}))
+"""
+
+
+def measure_once() -> dict:
+    """Render the landing page in a new interpreter and report time and loaded modules."""
+    import json
+
+    start = time.perf_counter()
+    result = subprocess.run(
+        [sys.executable, "-c", _PROBE % (HEAVY_MODULES,)],
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+    report = json.loads(result.stdout.strip().splitlines()[-1])
+    report["process_seconds"] = time.perf_counter() - start
+    return report
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Measure landing page cold-start time.")
+    parser.add_argument("--runs", type=int, default=3)
+    args = parser.parse_args()
+
+    reports = [measure_once() for _ in range(args.runs)]
+    for report in reports:
+        if report["errors"]:
+            raise SystemExit(f"Landing page failed to render: {report['errors']}")
+
+    render = [report["seconds"] for report in reports]
+    process = [report["process_seconds"] for report in reports]
+    loaded = sorted({name for report in reports for name in report["loaded"]})
+    print(f"Landing page render: median {statistics.median(render):.2f}s over {args.runs} runs")
+    print(f"Process start to render: median {statistics.median(process):.2f}s")
+    print(f"Heavy modules loaded: {', '.join(loaded) or 'none'}")
+    if "torch" in loaded:
+        raise SystemExit("The landing page imported torch")
+
+
+if __name__ == "__main__":
+    main()
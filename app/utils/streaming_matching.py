@@ -0,0 +1,244 @@
+"""
+Bounded-memory matching for instances that cannot hold the answers tables in
+memory. Enable with MATCH_STREAMING=1; MATCH_CHUNK_SIZE sets the rows read at
+a time.
+
+The practical answers file, the only wide table, is read in fixed-size chunks.
+Each chunk goes through the same hard filters and batched scoring as the
+in-memory pool, and only a running top-k heap survives between chunks. The
+other tables are reduced once per scan to a few numeric columns per user,
+keyed by a 64-bit username hash.
+"""
+
+import heapq
+import os
+
+import numpy as np
+import pandas as pd
+from pandas.api.types import union_categoricals
+
+from data_access.candidate_pool import TABLE_PATHS
+from data_access.values_index import get_values_indexes
+from utils.bitmask import LIFESTYLE_OPTIONS, encode_practical_masks, practical_filter
+from utils.budget import BudgetIndex, base_budgets
+from utils.conflicts import lifestyle_conflicts, lifestyle_mask_matrix, lifestyle_mask_vector
+from utils.location_index import LocationIndex
+from utils.ranking import PERSONALITY_TRAITS, top_k
+from utils.scoring import LIFESTYLE_SCALES, CandidateFeatures, score_candidates
+
+
+DEFAULT_CHUNK_SIZE = 20000
+
+
+def streaming_enabled() -> bool:
+    return os.getenv("MATCH_STREAMING", "").strip().lower() in ("1", "true", "yes")
+
+
+def chunk_size() -> int:
+    return int(os.getenv("MATCH_CHUNK_SIZE", DEFAULT_CHUNK_SIZE))
+
+
+def data_stamp() -> tuple:
+    """Changes whenever an answers table or values index grows (a cheap data version)."""
+    stamp = []
+    for path in TABLE_PATHS.values():
+        try:
+            stamp.append(os.path.getsize(path))
+        except OSError:
+            stamp.append(-1)
+    for index in get_values_indexes().values():
+        index.refresh()
+        stamp.append(index.size)
+    return tuple(stamp)
+
+
+# -----------------------------
+# Internal helpers
+# -----------------------------
+
+def _user_hashes(usernames: pd.Series) -> np.ndarray:
+    normalized = usernames.astype(str).str.strip().str.lower()
+    return pd.util.hash_pandas_object(normalized, index=False).to_numpy()
+
+
+def _read_chunks(path: str, columns: list[str] | None = None, size: int | None = None):
+    """
+    The file in chunks of parsed rows, optionally narrowed to `columns`. Every
+    pass parses all columns: with usecols pandas keeps malformed lines it
+    otherwise skips, and the row offsets of the passes would drift apart.
+    """
+    if not os.path.exists(path):
+        return
+    for chunk in pd.read_csv(path, chunksize=size or chunk_size(), on_bad_lines="skip"):
+        yield chunk if columns is None else chunk[[column for column in chunk.columns if column in columns]]
+
+
+def _latest_rows(path: str) -> np.ndarray:
+    """One flag per row: is this the user's most recent submission? (1 byte per row)"""
+    hashes = [_user_hashes(chunk["username"]) for chunk in _read_chunks(path, ["username"])]
+    if not hashes:
+        return np.zeros(0, dtype=bool)
+    return ~pd.Series(np.concatenate(hashes)).duplicated(keep="last").to_numpy()
+
+
+def _flags(latest: np.ndarray, offset: int, n: int) -> np.ndarray:
+    """Latest-row flags of the n rows at `offset`; rows appended since the first pass are skipped."""
+    flags = np.zeros(n, dtype=bool)
+    window = latest[offset:offset + n]
+    flags[:len(window)] = window
+    return flags
+
+
+def _mask(n: int, positions: np.ndarray) -> np.ndarray:
+    mask = np.zeros(n, dtype=bool)
+    mask[positions] = True
+    return mask
+
+
+def _side_table(name: str, columns: list[str], convert) -> pd.DataFrame:
+    """
+    The latest row per user of a secondary table, reduced to compact columns
+    and indexed by username hash.
+    """
+    path = TABLE_PATHS[name]
+    latest = _latest_rows(path)
+    parts, offset = [], 0
+    for chunk in _read_chunks(path, ["username", *columns]):
+        keep = _flags(latest, offset, len(chunk))
+        offset += len(chunk)
+        chunk = chunk[keep]
+        # Chunks whose rows were all superseded add nothing (and empty frames
+        # would blur the concatenated dtypes)
+        if chunk.empty:
+            continue
+        part = convert(chunk.reindex(columns=columns))
+        part.index = _user_hashes(chunk["username"])
+        parts.append(part)
+    if not parts:
+        return convert(pd.DataFrame(columns=columns)).set_axis(np.zeros(0, dtype=np.uint64))
+
+    # Categorical columns are merged category-wise; a plain concat of chunks
+    # with different categories would fall back to object columns
+    merged = {}
+    for column in parts[0].columns:
+        values = [part[column] for part in parts]
+        if isinstance(values[0].dtype, pd.CategoricalDtype):
+            merged[column] = union_categoricals(values)
+        else:
+            merged[column] = np.concatenate([value.to_numpy() for value in values])
+    return pd.DataFrame(merged, index=np.concatenate([part.index.to_numpy() for part in parts]))
+
+
+def _personality_table() -> pd.DataFrame:
+    return _side_table(
+        "personality",
+        PERSONALITY_TRAITS,
+        lambda df: df.apply(pd.to_numeric, errors="coerce").astype(np.float32),
+    )
+
+
+def _lifestyle_table() -> pd.DataFrame:
+    # Scale answers and multiselects have few distinct values, so categoricals
+    # keep them at about one byte each per user
+    return _side_table(
+        "lifestyle",
+        [*LIFESTYLE_SCALES, *LIFESTYLE_OPTIONS],
+        # Unanswered cells become "" so every chunk has string categories
+        lambda df: df.fillna("").astype("category"),
+    )
+
+
+def _chunk_positions(chunk: pd.DataFrame, requirements: dict, username: str) -> np.ndarray:
+    """Positions in `chunk` passing the location, practical and budget filters."""
+    keep = practical_filter(chunk, requirements)
+    keep &= chunk["username"].to_numpy() != username
+
+    location_index = LocationIndex()
+    for row in chunk[["desired_location"]].to_dict("records") if "desired_location" in chunk.columns else []:
+        location_index.add(row)
+    location_positions = location_index.query(requirements.get("desired_location"))
+    if location_positions is not None:
+        keep &= _mask(len(chunk), location_positions)
+
+    budget_positions = BudgetIndex(base_budgets(chunk)).query(requirements)
+    if budget_positions is not None:
+        keep &= _mask(len(chunk), budget_positions)
+    return np.flatnonzero(keep)
+
+
+# -----------------------------
+# Public API
+# -----------------------------
+
+def stream_matches(username: str, requirements: dict, user_features, k: int,
+                   weights: dict | None = None, signal_columns: dict | None = None) -> pd.DataFrame:
+    """
+    The k most compatible candidates, scanning the practical answers in chunks.
+    Peak memory is one chunk plus the k best rows, on top of the compact
+    per-user personality and lifestyle columns.
+    """
+    path = TABLE_PATHS["practical"]
+    latest = _latest_rows(path)
+    personality = _personality_table()
+    lifestyle = _lifestyle_table()
+    indexes = list(get_values_indexes().values())
+    user_lifestyle_masks = lifestyle_mask_vector(requirements)
+
+    heap = []
+    offset = 0
+    for chunk in _read_chunks(path):
+        keep = _flags(latest, offset, len(chunk))
+        offset += len(chunk)
+        chunk = chunk[keep].reset_index(drop=True)
+        chunk["username"] = chunk["username"].astype(str).str.strip().str.lower()
+        chunk = encode_practical_masks(chunk)
+
+        chunk = chunk.iloc[_chunk_positions(chunk, requirements, username)]
+        hashes = _user_hashes(chunk["username"])
+        has_personality = np.isin(hashes, personality.index)
+        chunk, hashes = chunk[has_personality], hashes[has_personality]
+        if chunk.empty:
+            continue
+
+        side = pd.concat([personality.reindex(hashes), lifestyle.reindex(hashes).astype(object)], axis=1)
+        chunk = pd.concat([chunk, side.set_axis(chunk.index)], axis=1)
+
+        conflicts = lifestyle_conflicts(user_lifestyle_masks, lifestyle_mask_matrix(chunk))
+        chunk = chunk[~conflicts].reset_index(drop=True)
+        if chunk.empty:
+            continue
+
+        usernames = chunk["username"].tolist()
+        features = CandidateFeatures(chunk, [index.vectors_for(usernames) for index in indexes])
+        signals = score_candidates(user_features, features, weights)
+
+        # Only the chunk's own top k can enter the global top k
+        for position in top_k(signals["compatibility_score"], k).tolist():
+            score = float(signals["compatibility_score"][position])
+            if len(heap) == k and score <= heap[0][0]:
+                continue
+            row = chunk.iloc[position].to_dict()
+            row.update({column: signals[signal][position] for signal, column in (signal_columns or {}).items()})
+            item = (score, usernames[position], row)
+            if len(heap) < k:
+                heapq.heappush(heap, item)
+            else:
+                heapq.heapreplace(heap, item)
+
+    best = [row for _, _, row in sorted(heap, key=lambda item: (-item[0], item[1]))]
+    matches = pd.DataFrame(best)
+    if matches.empty:
+        return matches
+
+    # Names are only resolved for the k winners
+    names = {}
+    winners = set(matches["username"])
+    for chunk in _read_chunks(TABLE_PATHS["demographics"], ["username", "full_name", "fullname"]):
+        chunk_usernames = chunk["username"].astype(str).str.strip().str.lower()
+        name_column = "full_name" if "full_name" in chunk.columns else "fullname"
+        for chunk_username, name in zip(chunk_usernames, chunk.get(name_column, [""] * len(chunk))):
+            if chunk_username in winners:
+                names[chunk_username] = name
+    matches["name"] = matches["username"].map(names).fillna("")
+    matches["email"] = matches["username"]
+    return matches